@@ -2,7 +2,7 @@
 """Configuration settings for the application."""
 
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -22,10 +22,102 @@ class Settings(BaseSettings):
     # OpenAI Settings
     openai_api_key: Optional[str] = None
     openai_model: str = "gpt-3.5-turbo"
+    openai_base_url: Optional[str] = None  # e.g. a local stub server for offline testing
+    
+    # Model Routing Settings (openai_model is the cheap first tier)
+    llm_routing_enabled: bool = True
+    llm_escalation_model: str = "gpt-4o"
+    llm_escalation_confidence_threshold: float = 0.6
+    llm_escalate_on_parse_error: bool = True
+    llm_strong_section_types: List[str] = ["code"]  # Sent straight to the escalation model
+    
+    # LLM Call Policy Settings
+    llm_request_timeout: float = 15.0
+    llm_retry_max_attempts: int = 3
+    llm_retry_base_delay: float = 0.5
+    llm_retry_max_delay: float = 8.0
+    llm_circuit_failure_threshold: int = 5
+    llm_circuit_recovery_timeout: float = 30.0
+    llm_hedging_enabled: bool = False
+    llm_hedging_percentile: float = 0.95
+    llm_hedging_min_samples: int = 20
+    
+    # LLM Scheduler Settings (shared by interactive and bulk work; 0 disables a rate budget)
+    llm_max_concurrency: int = 8
+    llm_requests_per_minute: int = 3500
+    llm_tokens_per_minute: int = 200000
+    llm_priority_weights: Dict[str, float] = {"interactive": 4.0, "bulk": 1.0}
+    
+    # Token Budget Settings
+    llm_context_window: Optional[int] = None  # Falls back to the model's known window
+    llm_max_input_tokens: int = 6000
+    llm_max_output_tokens: int = 2000
+    llm_min_output_tokens: int = 256
+    fast_prompt_max_content_tokens: int = 1500
+    section_context_max_tokens: int = 200  # Heading path + ancestor summaries; 0 disables
+    token_count_cache_size: int = 4096
+    
+    # Symbol Search Settings (exact identifier matches added ahead of embedding results)
+    symbol_search_enabled: bool = True
+    symbol_search_max_sections: int = 10
+    
+    # Pre-filter Settings (higher threshold skips more LLM calls, lower keeps recall)
+    prefilter_enabled: bool = True
+    prefilter_threshold: float = 0.2
+    prefilter_min_keep: int = 1
+    prefilter_verdict_log_path: Optional[str] = None  # Also records every pre-filter decision
+    prefilter_similarity_floor: float = 0.70  # Cosine similarity scored as 0
+    prefilter_similarity_ceiling: float = 0.85  # Cosine similarity scored as 1
+    
+    # Diff Settings (myers, patience, histogram or difflib)
+    diff_algorithm: str = "histogram"
+    diff_context_lines: int = 3
+    diff_cache_size: int = 512  # Suggestions whose hunks are kept after first view
+    
+    # Content Store Settings (section content shared by suggestions)
+    content_store_unreferenced_ttl: float = 600.0  # Seconds content no stored suggestion uses is kept
     
     # Storage Settings
     storage_path: str = "data"
     documents_path: str = "documents"
+    storage_stats_reconcile_interval: float = 3600.0  # Seconds before stats are re-checked against disk
+    
+    # Suggestion Store Settings (SQLite database under storage_path, written behind)
+    suggestion_store_enabled: bool = True
+    suggestion_db_file: str = "suggestions.db"
+    suggestion_flush_interval: float = 0.5  # Seconds of writes at risk on a hard crash
+    suggestion_flush_batch: int = 200  # Pending writes that trigger an early flush
+    
+    # Background Job Settings
+    job_workers: int = 2
+    job_max_queue_depth: int = 100
+    
+    # Generation deadline for /suggestions/generate; sections still running
+    # when it passes are returned as pending and finish in the background
+    suggestion_deadline_seconds: Optional[float] = 20.0
+    
+    # Semantic Cache Settings (reuse batches for near-duplicate queries)
+    semantic_cache_enabled: bool = True
+    semantic_cache_threshold: float = 0.95
+    semantic_cache_max_entries: int = 256
+    semantic_cache_ttl_seconds: float = 3600.0
+    
+    # Telemetry Settings (per-request LLM/embedding metrics, see /metrics)
+    telemetry_log_requests: bool = True  # Structured log line per provider request
+    
+    # Translation Mirror Settings (derive ja/zh/ko suggestions from English ones)
+    mirror_propagation_enabled: bool = True
+    
+    # Request Coalescing Settings (identical concurrent queries share one run)
+    coalesce_enabled: bool = True
+    coalesce_grace_period: float = 5.0  # Seconds a finished result is still shared
+    
+    # Impact Analysis Settings
+    impact_score_threshold: float = 0.35
+    impact_max_sections: int = 100
+    impact_concurrency: int = 4
+    impact_max_llm_calls: int = 100
+    impact_max_cost_usd: float = 1.0
     
     # CORS Settings
     allowed_origins: List[str] = [
@@ -0,0 +1 @@
+"""Developer tools for offline evaluation and benchmarking."""
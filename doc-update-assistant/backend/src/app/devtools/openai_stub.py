@@ -0,0 +1,392 @@
+"""Local OpenAI-compatible stub server with fault injection and record/replay.
+
+Point the backend at it with ``OPENAI_BASE_URL=http://127.0.0.1:8001/v1`` to
+exercise ``AIService`` and ``DocumentProcessor`` without the live API. It
+serves ``/v1/chat/completions`` (including ``stream=true``) and
+``/v1/embeddings``. Latency, errors and slow outliers can be changed at
+runtime through ``POST /_stub/faults``.
+
+Modes:
+    stub    Synthetic responses. Embeddings are deterministic feature-hashed
+            bag-of-words vectors, so texts sharing words are similar and the
+            same input always gives the same vector.
+    record  Forward requests to ``--upstream`` and append each response to
+            the cassette file.
+    replay  Serve responses from the cassette; unmatched requests fall back
+            to synthetic responses, or fail with ``--replay-strict``.
+
+Latency (stub and replay) is drawn from ``--latency-dist``: ``constant``,
+``uniform`` (latency + U(0, jitter)), ``exponential`` (mean latency) or
+``lognormal`` (median latency, shape ``--latency-sigma``).
+
+Note that synthetic embeddings are not comparable with real embeddings
+already cached in ``data/embeddings.pkl``; record or regenerate them with the
+same mode you benchmark with.
+
+Usage:
+    python -m src.app.devtools.openai_stub --port 8001 --error-rate 0.2 --latency-ms 200
+    python -m src.app.devtools.openai_stub --mode record --cassette data/cassette.jsonl
+    python -m src.app.devtools.openai_stub --mode replay --cassette data/cassette.jsonl
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+DEFAULT_COMPLETION = json.dumps({
+    "should_update": False,
+    "title": "No update needed",
+    "description": "Stub response",
+    "suggested_content": "",
+    "reasoning": "Generated by the local OpenAI stub",
+    "confidence": 0.5
+})
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+STUB_MODES = ("stub", "record", "replay")
+
+# Request fields that do not change the response content
+VOLATILE_REQUEST_FIELDS = ("stream", "stream_options", "user", "timeout")
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+@dataclass
+class StubConfig:
+    """Latency, fault injection and record/replay settings for the stub server."""
+    latency_ms: float = 50.0
+    latency_jitter_ms: float = 0.0
+    latency_distribution: str = "uniform"
+    latency_sigma: float = 0.5
+    error_rate: float = 0.0
+    error_status: int = 503
+    slow_rate: float = 0.0
+    slow_ms: float = 5000.0
+    completion_content: str = DEFAULT_COMPLETION
+    embedding_dim: int = 1536
+    stream_chunk_chars: int = 16
+    mode: str = "stub"
+    cassette_path: Optional[str] = None
+    upstream_base_url: str = "https://api.openai.com/v1"
+    upstream_api_key: Optional[str] = None
+    replay_strict: bool = False
+    seed: Optional[int] = None
+
+
+def request_key(endpoint: str, body: Dict[str, Any]) -> str:
+    """Stable cassette key for a request, ignoring fields that do not affect the result."""
+    relevant = {k: v for k, v in body.items() if k not in VOLATILE_REQUEST_FIELDS}
+    canonical = json.dumps({"endpoint": endpoint, "body": relevant}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def deterministic_embedding(text: str, dim: int) -> List[float]:
+    """Feature-hashed bag-of-words embedding, L2-normalized."""
+    vector = [0.0] * dim
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        digest = hashlib.md5(token.encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector))
+    if norm == 0:
+        # Empty input still gets a valid unit vector
+        vector[0] = 1.0
+        return vector
+    return [v / norm for v in vector]
+
+
+class Cassette:
+    """Append-only JSONL store of recorded responses keyed by request."""
+
+    def __init__(self, path: Optional[str]) -> None:
+        """Load previously recorded interactions from ``path`` if it exists."""
+        self.path = Path(path) if path else None
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        if self.path and self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the recorded response for a key."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["response"]
+
+    def put(self, key: str, endpoint: str, body: Dict[str, Any], response: Dict[str, Any]) -> None:
+        """Record a response, appending it to the cassette file."""
+        entry = {"key": key, "endpoint": endpoint, "request": body, "response": response}
+        self.entries[key] = entry
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def create_stub_app(config: Optional[StubConfig] = None) -> FastAPI:
+    """Create the stub FastAPI application."""
+    app = FastAPI(title="OpenAI stub")
+    app.state.config = config or StubConfig()
+    app.state.rng = random.Random(app.state.config.seed)
+    app.state.request_count = 0
+    app.state.cassette = Cassette(app.state.config.cassette_path)
+
+    def sample_latency_ms() -> float:
+        """Draw one latency sample from the configured distribution."""
+        cfg: StubConfig = app.state.config
+        rng: random.Random = app.state.rng
+        if cfg.latency_distribution == "constant":
+            delay_ms = cfg.latency_ms
+        elif cfg.latency_distribution == "exponential":
+            delay_ms = rng.expovariate(1 / cfg.latency_ms) if cfg.latency_ms > 0 else 0.0
+        elif cfg.latency_distribution == "lognormal":
+            delay_ms = rng.lognormvariate(math.log(max(cfg.latency_ms, 1e-3)), cfg.latency_sigma)
+        else:
+            delay_ms = cfg.latency_ms + rng.uniform(0, cfg.latency_jitter_ms)
+        if rng.random() < cfg.slow_rate:
+            delay_ms += cfg.slow_ms
+        return delay_ms
+
+    async def inject_faults() -> Optional[JSONResponse]:
+        """Sleep for a sampled latency and maybe return an injected error."""
+        cfg: StubConfig = app.state.config
+        app.state.request_count += 1
+        await asyncio.sleep(sample_latency_ms() / 1000)
+        if app.state.rng.random() < cfg.error_rate:
+            return JSONResponse(
+                status_code=cfg.error_status,
+                content={"error": {"message": "Injected fault", "type": "stub_error"}},
+            )
+        return None
+
+    async def forward_upstream(endpoint: str, body: Dict[str, Any]) -> Any:
+        """Send a non-streaming request to the real API; returns JSON or an error response."""
+        import httpx
+
+        cfg: StubConfig = app.state.config
+        api_key = cfg.upstream_api_key or os.getenv("OPENAI_API_KEY", "")
+        payload = {k: v for k, v in body.items() if k not in ("stream", "stream_options")}
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        try:
+            async with httpx.AsyncClient(timeout=120) as client:
+                response = await client.post(
+                    f"{cfg.upstream_base_url.rstrip('/')}/{endpoint}",
+                    json=payload,
+                    headers=headers,
+                )
+        except httpx.HTTPError as e:
+            return JSONResponse(
+                status_code=502,
+                content={"error": {"message": f"Upstream request failed: {e}", "type": "upstream_error"}},
+            )
+        if response.status_code >= 400:
+            return JSONResponse(status_code=response.status_code, content=response.json())
+        return response.json()
+
+    async def resolve(endpoint: str, body: Dict[str, Any], synthesize: Any) -> Any:
+        """Produce a full (non-streaming) response according to the current mode."""
+        cfg: StubConfig = app.state.config
+        cassette: Cassette = app.state.cassette
+        key = request_key(endpoint, body)
+        if cfg.mode == "record":
+            app.state.request_count += 1
+            result = await forward_upstream(endpoint, body)
+            if isinstance(result, dict):
+                cassette.put(key, endpoint, body, result)
+            return result
+        fault = await inject_faults()
+        if fault is not None:
+            return fault
+        if cfg.mode == "replay":
+            recorded = cassette.get(key)
+            if recorded is not None:
+                return recorded
+            if cfg.replay_strict:
+                return JSONResponse(
+                    status_code=404,
+                    content={"error": {"message": f"No recorded response for {endpoint}", "type": "replay_miss"}},
+                )
+        return synthesize(body)
+
+    def synthesize_completion(body: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a chat completion with the configured content."""
+        content = app.state.config.completion_content
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in body.get("messages", []))
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_chars // 4 + len(content) // 4,
+            },
+        }
+
+    def synthesize_embeddings(body: Dict[str, Any]) -> Dict[str, Any]:
+        """Build deterministic embeddings for a string or list of strings."""
+        inputs = body.get("input", "")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dim = body.get("dimensions") or app.state.config.embedding_dim
+        prompt_tokens = sum(len(str(text)) // 4 for text in inputs)
+        return {
+            "object": "list",
+            "model": body.get("model", "stub"),
+            "data": [
+                {"object": "embedding", "index": index, "embedding": deterministic_embedding(str(text), dim)}
+                for index, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        }
+
+    async def stream_completion(completion: Dict[str, Any], include_usage: bool) -> AsyncIterator[str]:
+        """Re-emit a full completion as server-sent chunk events."""
+        cfg: StubConfig = app.state.config
+        content = completion["choices"][0]["message"].get("content") or ""
+        chunk_size = max(cfg.stream_chunk_chars, 1)
+        # Spread part of the latency across chunks to mimic token generation
+        per_chunk_s = min(cfg.latency_ms, 20.0) / 1000 if cfg.mode != "record" else 0.0
+
+        def event(delta: Dict[str, Any], finish_reason: Optional[str] = None, usage: Any = None) -> str:
+            chunk = {
+                "id": completion.get("id", f"chatcmpl-{uuid.uuid4().hex}"),
+                "object": "chat.completion.chunk",
+                "created": completion.get("created", int(time.time())),
+                "model": completion.get("model", "stub"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if usage is None else [],
+            }
+            if usage is not None:
+                chunk["usage"] = usage
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        yield event({"role": "assistant", "content": ""})
+        for start in range(0, len(content), chunk_size):
+            await asyncio.sleep(per_chunk_s)
+            yield event({"content": content[start:start + chunk_size]})
+        yield event({}, finish_reason=completion["choices"][0].get("finish_reason", "stop"))
+        if include_usage and completion.get("usage"):
+            yield event({}, usage=completion["usage"])
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> Any:
+        """OpenAI-compatible chat completion endpoint."""
+        body = await request.json()
+        result = await resolve("chat/completions", body, synthesize_completion)
+        if isinstance(result, JSONResponse) or not body.get("stream"):
+            return result
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        return StreamingResponse(stream_completion(result, include_usage), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request) -> Any:
+        """OpenAI-compatible embeddings endpoint."""
+        body = await request.json()
+        return await resolve("embeddings", body, synthesize_embeddings)
+
+    @app.get("/_stub/faults")
+    async def get_faults() -> Dict[str, Any]:
+        """Return the current configuration, request count and cassette stats."""
+        cassette: Cassette = app.state.cassette
+        return {
+            **asdict(app.state.config),
+            "request_count": app.state.request_count,
+            "cassette_entries": len(cassette.entries),
+            "cassette_hits": cassette.hits,
+            "cassette_misses": cassette.misses,
+        }
+
+    @app.post("/_stub/faults")
+    async def set_faults(request: Request) -> Dict[str, Any]:
+        """Update settings at runtime, e.g. to simulate a provider brownout."""
+        updates = await request.json()
+        for key, value in updates.items():
+            if hasattr(app.state.config, key):
+                setattr(app.state.config, key, value)
+        if "seed" in updates:
+            app.state.rng = random.Random(app.state.config.seed)
+        if "cassette_path" in updates:
+            app.state.cassette = Cassette(app.state.config.cassette_path)
+        return asdict(app.state.config)
+
+    return app
+
+
+def main() -> None:
+    """Command-line entry point."""
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="uniform")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=5000.0)
+    parser.add_argument("--embedding-dim", type=int, default=1536)
+    parser.add_argument("--stream-chunk-chars", type=int, default=16)
+    parser.add_argument("--mode", choices=STUB_MODES, default="stub")
+    parser.add_argument("--cassette", default=None, help="JSONL file for record/replay")
+    parser.add_argument("--upstream", default="https://api.openai.com/v1", help="API base URL used in record mode")
+    parser.add_argument("--replay-strict", action="store_true", help="Fail unmatched requests in replay mode")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.mode != "stub" and not args.cassette:
+        parser.error("--cassette is required in record and replay modes")
+
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        latency_distribution=args.latency_dist,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        embedding_dim=args.embedding_dim,
+        stream_chunk_chars=args.stream_chunk_chars,
+        mode=args.mode,
+        cassette_path=args.cassette,
+        upstream_base_url=args.upstream,
+        replay_strict=args.replay_strict,
+        seed=args.seed,
+    )
+    uvicorn.run(create_stub_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
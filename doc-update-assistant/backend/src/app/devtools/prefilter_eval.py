@@ -0,0 +1,213 @@
+"""Offline evaluation of the section pre-filter against recorded LLM verdicts.
+
+Verdicts are recorded by ``AIService`` when ``PREFILTER_VERDICT_LOG_PATH`` is
+set: one JSON object per line with the query, the section and whether the
+model decided the section should be updated. This harness replays those pairs
+through ``SectionPreFilter`` for a range of thresholds and reports the
+precision/recall trade-off and how many LLM calls each threshold would skip.
+
+The same log holds the pre-filter's own decisions (``"type": "prefilter"``)
+with their combined and per-signal scores. Sections it skipped only have an
+LLM verdict when the same query also ran with the pre-filter off or at a
+lower threshold, so the production recall is reported as the observed value
+over labelled skips and a worst case that counts every unlabelled skip as a
+missed update.
+
+Usage:
+    python -m src.app.devtools.prefilter_eval --verdicts data/prefilter_verdicts.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..models.document import DocumentSection
+from ..services.document_processor import DocumentProcessor
+from ..services.prefilter import SectionPreFilter
+
+
+def load_verdicts(path: str) -> List[Dict[str, Any]]:
+    """Load recorded verdict and decision records from a JSONL file."""
+    verdicts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                verdicts.append(json.loads(line))
+    return verdicts
+
+
+def split_records(records: List[Dict[str, Any]]) -> tuple:
+    """Separate LLM verdicts from pre-filter decision records."""
+    verdicts = [record for record in records if record.get("type") != "prefilter"]
+    decisions = [record for record in records if record.get("type") == "prefilter"]
+    return verdicts, decisions
+
+
+def summarize_decisions(verdicts: List[Dict[str, Any]], decisions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Recall lost to logged pre-filter skips, labelled by any verdict for the same query and section."""
+    labels: Dict[tuple, bool] = {}
+    for verdict in verdicts:
+        key = (verdict["query"], verdict["section_id"])
+        labels[key] = labels.get(key, False) or bool(verdict["should_update"])
+
+    kept_updates = missed_updates = unlabelled = skipped = 0
+    for decision in decisions:
+        label = labels.get((decision["query"], decision["section_id"]))
+        if decision["kept"]:
+            kept_updates += bool(label)
+            continue
+        skipped += 1
+        if label is None:
+            unlabelled += 1
+        elif label:
+            missed_updates += 1
+    return {
+        "decisions": len(decisions),
+        "skipped": skipped,
+        "unlabelled_skips": unlabelled,
+        "missed_updates": missed_updates,
+        "observed_recall": (
+            kept_updates / (kept_updates + missed_updates) if kept_updates + missed_updates else 1.0
+        ),
+        "worst_case_recall": (
+            kept_updates / (kept_updates + missed_updates + unlabelled)
+            if kept_updates + missed_updates + unlabelled else 1.0
+        ),
+    }
+
+
+def print_decision_summary(summary: Dict[str, Any]) -> None:
+    """Print the recall lost to logged pre-filter skips."""
+    print(
+        f"Logged decisions: {summary['decisions']}, skipped {summary['skipped']} "
+        f"({summary['unlabelled_skips']} without a verdict, {summary['missed_updates']} missed updates)"
+    )
+    print(
+        f"Production recall: observed {summary['observed_recall']:.3f}, "
+        f"worst case {summary['worst_case_recall']:.3f}\n"
+    )
+
+
+def _resolve_section(
+    doc_processor: DocumentProcessor,
+    verdict: Dict[str, Any],
+    by_location: Dict[tuple, DocumentSection],
+) -> Optional[DocumentSection]:
+    """Find the recorded section by ID, falling back to file path and title."""
+    section = doc_processor.get_section_by_id(verdict["section_id"])
+    if section is None:
+        section = by_location.get((verdict.get("file_path"), verdict.get("title")))
+    return section
+
+
+async def evaluate(
+    doc_processor: DocumentProcessor,
+    verdicts: List[Dict[str, Any]],
+    thresholds: List[float],
+) -> List[Dict[str, Any]]:
+    """Replay verdicts through the pre-filter and compute metrics per threshold."""
+    prefilter = SectionPreFilter.default(doc_processor)
+    by_location = {(s.file_path, s.title): s for s in doc_processor.sections.values()}
+
+    # Group verdicts per query, as the pre-filter sees one query's search results at a time
+    grouped: Dict[str, List[tuple]] = defaultdict(list)
+    missing = 0
+    for verdict in verdicts:
+        section = _resolve_section(doc_processor, verdict, by_location)
+        if section is None:
+            missing += 1
+            continue
+        grouped[verdict["query"]].append((section, bool(verdict["should_update"])))
+    if missing:
+        print(f"[prefilter_eval] Skipped {missing} verdicts whose section is no longer in the corpus")
+
+    contexts = {query: await prefilter.build_context(query) for query in grouped}
+
+    report = []
+    for threshold in thresholds:
+        true_pos = false_pos = false_neg = true_neg = 0
+        for query, pairs in grouped.items():
+            sections = [section for section, _ in pairs]
+            result = prefilter.apply(sections, contexts[query], threshold=threshold)
+            kept_ids = {section.id for section in result.kept}
+            for section, should_update in pairs:
+                kept = section.id in kept_ids
+                if kept and should_update:
+                    true_pos += 1
+                elif kept:
+                    false_pos += 1
+                elif should_update:
+                    false_neg += 1
+                else:
+                    true_neg += 1
+        total = true_pos + false_pos + false_neg + true_neg
+        kept_total = true_pos + false_pos
+        report.append({
+            "threshold": threshold,
+            "precision": true_pos / kept_total if kept_total else 0.0,
+            "recall": true_pos / (true_pos + false_neg) if (true_pos + false_neg) else 1.0,
+            "skip_rate": (false_neg + true_neg) / total if total else 0.0,
+            "missed_updates": false_neg,
+            "calls_skipped": false_neg + true_neg,
+            "total": total,
+        })
+    return report
+
+
+def print_report(report: List[Dict[str, Any]], target_recall: float) -> None:
+    """Print the evaluation table and the highest threshold meeting the recall target."""
+    print(f"{'threshold':>9} {'precision':>9} {'recall':>7} {'skip%':>6} {'skipped':>7} {'missed':>6}")
+    for row in report:
+        print(
+            f"{row['threshold']:>9.2f} {row['precision']:>9.3f} {row['recall']:>7.3f} "
+            f"{row['skip_rate'] * 100:>5.1f}% {row['calls_skipped']:>7} {row['missed_updates']:>6}"
+        )
+    eligible = [row for row in report if row["recall"] >= target_recall]
+    if eligible:
+        best = max(eligible, key=lambda row: row["threshold"])
+        print(
+            f"\nHighest threshold with recall >= {target_recall:.2f}: {best['threshold']:.2f} "
+            f"(skips {best['skip_rate'] * 100:.1f}% of LLM calls)"
+        )
+    else:
+        print(f"\nNo threshold reaches recall >= {target_recall:.2f}")
+
+
+async def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verdicts", required=True, help="JSONL file of recorded verdicts")
+    parser.add_argument("--docs", default="data", help="Directory with the JSON document corpus")
+    parser.add_argument(
+        "--thresholds",
+        default="0,0.1,0.2,0.3,0.4,0.5,0.6",
+        help="Comma-separated thresholds to evaluate",
+    )
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    args = parser.parse_args()
+
+    # Load documents without generating embeddings; stored embeddings are picked up from disk
+    doc_processor = DocumentProcessor()
+    for file_path in Path(args.docs).rglob("*.json"):
+        try:
+            await doc_processor.load_documents_from_json_file(str(file_path))
+        except Exception as e:
+            print(f"[prefilter_eval] Skipping {file_path}: {e}")
+
+    verdicts, decisions = split_records(load_verdicts(args.verdicts))
+    if decisions:
+        print_decision_summary(summarize_decisions(verdicts, decisions))
+    report = await evaluate(
+        doc_processor,
+        verdicts,
+        [float(value) for value in args.thresholds.split(",")],
+    )
+    print_report(report, args.target_recall)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -6,9 +6,10 @@ import asyncio
 import traceback
 load_dotenv()
 
+from .utils.logger import app_logger
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
 
 try:
     from .config import settings
@@ -16,9 +17,17 @@ try:
     from .utils.exceptions import DocumentUpdateException
     from .services.document_processor import DocumentProcessor
     from .services.ai_service import AIService
+    from .services.prefilter import SectionPreFilter
+    from .services.suggestion_pipeline import SuggestionPipeline
+    from .services.semantic_cache import SemanticSuggestionCache
+    from .services.mirror_index import MirrorAlignmentIndex
+    from .services.job_service import SuggestionJobManager
+    from .services.impact_analysis import ImpactAnalyzer
+    from .services.storage_service import StorageService
+    from .services.suggestion_repository import SuggestionRepository
         
 except ImportError as e:
-    print(f"Import error: {e}")
+    app_logger.error(f"Import error: {e}")
     # Fallback configuration
     class Settings:
         app_name = "Documentation Update Assistant"
@@ -40,6 +49,14 @@ except ImportError as e:
         from .services.document_processor import DocumentProcessor
     except ImportError:
         DocumentProcessor = None
+    
+    SectionPreFilter = None
+    SuggestionPipeline = None
+    SemanticSuggestionCache = None
+    MirrorAlignmentIndex = None
+    SuggestionJobManager = None
+    ImpactAnalyzer = None
+    SuggestionRepository = None
 
 
 # Create FastAPI app
@@ -51,19 +68,86 @@ app = FastAPI(
 )
 
 # Initialize document processor (file-based with pickle embeddings)
-print("INFO: Using file-based document processor with pickle embeddings")
+app_logger.info("Using file-based document processor with pickle embeddings")
 if DocumentProcessor:
     app.state.doc_processor = DocumentProcessor()
-    print("SUCCESS: Document processor initialized")
+    app_logger.info("Document processor initialized")
 else:
     app.state.doc_processor = None
-    print("ERROR: DocumentProcessor unavailable")
+    app_logger.error("DocumentProcessor unavailable")
 
 if AIService:
     app.state.ai_service = AIService()
 else:
     app.state.ai_service = None
-    print("WARNING: AIService unavailable - suggestions will not work")
+    app_logger.warning("AIService unavailable - suggestions will not work")
+
+# Local pre-filter that skips LLM calls for sections unlikely to need updates
+if SectionPreFilter and app.state.doc_processor and getattr(settings, "prefilter_enabled", False):
+    app.state.prefilter = SectionPreFilter.default(app.state.doc_processor)
+else:
+    app.state.prefilter = None
+
+# Shared generation pipeline and background job workers
+if SemanticSuggestionCache and app.state.doc_processor and settings.semantic_cache_enabled:
+    app.state.suggestion_cache = SemanticSuggestionCache(app.state.doc_processor)
+else:
+    app.state.suggestion_cache = None
+
+if MirrorAlignmentIndex and app.state.doc_processor and settings.mirror_propagation_enabled:
+    app.state.mirror_index = MirrorAlignmentIndex(app.state.doc_processor)
+else:
+    app.state.mirror_index = None
+
+if SuggestionPipeline and app.state.doc_processor and app.state.ai_service:
+    app.state.suggestion_pipeline = SuggestionPipeline(
+        app.state.doc_processor,
+        app.state.ai_service,
+        prefilter=app.state.prefilter,
+        cache=app.state.suggestion_cache,
+        mirror_index=app.state.mirror_index
+    )
+else:
+    app.state.suggestion_pipeline = None
+
+# Pending-suggestion conflict index, fed by writes to the suggestions store
+if 'suggestions' in locals():
+    suggestions.conflict_index.bind(app.state.doc_processor)
+    app.state.conflict_index = suggestions.conflict_index
+else:
+    app.state.conflict_index = None
+
+# Durable suggestion store, opened on startup and attached behind the suggestions store
+if SuggestionRepository and 'suggestions' in locals() and settings.suggestion_store_enabled:
+    app.state.suggestion_repository = SuggestionRepository(
+        os.path.join(settings.storage_path, settings.suggestion_db_file),
+        flush_interval=settings.suggestion_flush_interval,
+        flush_batch=settings.suggestion_flush_batch
+    )
+else:
+    app.state.suggestion_repository = None
+
+if SuggestionJobManager and app.state.suggestion_pipeline and 'suggestions' in locals():
+    app.state.storage = StorageService(
+        settings.storage_path,
+        reconcile_interval=settings.storage_stats_reconcile_interval
+    )
+    # Applied suggestions are saved into their documents
+    app.state.doc_processor.storage = app.state.storage
+    app.state.job_manager = SuggestionJobManager(
+        app.state.suggestion_pipeline,
+        suggestions.suggestions_store,
+        storage=app.state.storage
+    )
+    app.state.impact_analyzer = ImpactAnalyzer(
+        app.state.doc_processor,
+        app.state.ai_service,
+        suggestions.suggestions_store,
+        storage=app.state.storage
+    )
+else:
+    app.state.job_manager = None
+    app.state.impact_analyzer = None
 
 # Add CORS middleware
 app.add_middleware(
@@ -90,9 +174,9 @@ try:
                     content={"error": str(exc), "type": exc.__class__.__name__}
                 )
     else:
-        print("Routers not available - running in minimal mode")
+        app_logger.warning("Routers not available - running in minimal mode")
 except Exception as e:
-    print(f"Error setting up routers: {e}")
+    app_logger.error(f"Error setting up routers: {e}")
 
 
 # Auto-load documents on startup
@@ -101,39 +185,61 @@ async def load_documents_background():
     """Load documents in the background without blocking startup."""
     try:
         if not app.state.doc_processor:
-            print("[ERROR] Document processor not available. Suggestions will not work.")
+            app_logger.error("Document processor not available. Suggestions will not work.")
             return
             
         data_path = "data"
         if os.path.exists(data_path) and os.path.isdir(data_path):
-            print(f"Auto-loading documents from {data_path}...")
+            app_logger.info(f"Auto-loading documents from {data_path}...")
             # Add timeout to prevent hanging
             documents = await asyncio.wait_for(
                 app.state.doc_processor.load_documents_from_directory(data_path),
                 timeout=120.0  # 2 minutes timeout
             )
             if not documents:
-                print("[ERROR] No documents loaded from data directory. Suggestions will not work.")
+                app_logger.error("No documents loaded from data directory. Suggestions will not work.")
             else:
-                print(f"Auto-loaded {len(documents)} documents with {sum(len(doc.sections) for doc in documents)} sections")
+                app_logger.info(f"Auto-loaded {len(documents)} documents with {sum(len(doc.sections) for doc in documents)} sections")
+                # Place recovered suggestions at their section offsets now that sections are known
+                if app.state.conflict_index is not None:
+                    suggestions.suggestions_store.reindex()
         else:
-            print(f"[ERROR] Data directory '{data_path}' not found - documents will need to be loaded manually. Suggestions will not work.")
+            app_logger.error(f"Data directory '{data_path}' not found - documents will need to be loaded manually. Suggestions will not work.")
     except asyncio.TimeoutError:
-        print("[ERROR] Document loading timed out after 2 minutes. Documents will need to be loaded manually.")
+        app_logger.error("Document loading timed out after 2 minutes. Documents will need to be loaded manually.")
     except Exception as e:
-        print(f"Could not auto-load documents: {e}")
-        print("[ERROR] Documents will need to be loaded manually. Suggestions will not work.")
+        app_logger.error(
+            f"Could not auto-load documents: {e}. Documents will need to be loaded manually; suggestions will not work."
+        )
 
 @app.on_event("startup")
 async def startup_event():
     """Fast startup - launch document loading in background with Redis."""
     # Check for OpenAI API key
     if not os.getenv("OPENAI_API_KEY"):
-        print("WARNING: OpenAI API key not configured. AI suggestions will be disabled.")
+        app_logger.warning("OpenAI API key not configured. AI suggestions will be disabled.")
+    
+    if app.state.suggestion_repository is not None:
+        app.state.suggestion_repository.open()
+        suggestions.suggestions_store.attach(app.state.suggestion_repository)
     
     # Start document loading in background (non-blocking with timeout)
     asyncio.create_task(load_documents_background())
-    print("Application started - documents loading in background with pickle embeddings...")
+    app_logger.info("Application started - documents loading in background with pickle embeddings...")
+    
+    if app.state.job_manager:
+        await app.state.job_manager.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background job workers and flush the suggestion store and storage stats."""
+    if app.state.job_manager:
+        await app.state.job_manager.stop()
+    if getattr(app.state, "storage", None) is not None:
+        await app.state.storage.close()
+    if app.state.suggestion_repository is not None:
+        app.state.suggestion_repository.close()
 
 
 # Health check endpoint
@@ -147,6 +253,14 @@ async def health_check():
     }
 
 
+# Metrics endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """LLM and embedding request metrics in the Prometheus text format."""
+    from .services.telemetry import telemetry
+    return PlainTextResponse(telemetry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 # Root endpoint
 @app.get("/")
 async def root():
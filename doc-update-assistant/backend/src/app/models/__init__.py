@@ -1,8 +1,12 @@
 """Models package."""
 
 from .document import Document, DocumentSection, DocumentType
+from .job import JobStatus, SuggestionJob
 from .suggestion import (
+    ContentEdit,
     DiffHunk,
+    DiffLineOp,
+    DiffStats,
     SuggestionBatch,
     SuggestionStatus,
     SuggestionType,
@@ -13,8 +17,13 @@ __all__ = [
     "Document",
     "DocumentSection", 
     "DocumentType",
+    "ContentEdit",
     "DiffHunk",
+    "DiffLineOp",
+    "DiffStats",
+    "JobStatus",
     "SuggestionBatch",
+    "SuggestionJob",
     "SuggestionStatus",
     "SuggestionType", 
     "UpdateSuggestion",
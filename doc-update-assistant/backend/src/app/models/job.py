@@ -0,0 +1,47 @@
+# Job model
+"""Background suggestion job models for the application."""
+
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from .suggestion import UpdateSuggestion
+
+
+class JobStatus(str, Enum):
+    """Job status enumeration."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_JOB_STATUSES = {JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+
+class SuggestionJob(BaseModel):
+    """A suggestion generation request executed by the background worker pool."""
+    id: str
+    query: str
+    status: JobStatus = JobStatus.QUEUED
+    stage: str = "queued"
+    progress: float = 0.0
+
+    # Tracking
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    # Results
+    suggestions: List[UpdateSuggestion] = []
+    message: Optional[str] = None
+    error: Optional[str] = None
+    metadata: Dict[str, Any] = {}
+
+    @property
+    def is_finished(self) -> bool:
+        """Whether the job has reached a terminal status."""
+        return self.status in FINISHED_JOB_STATUSES
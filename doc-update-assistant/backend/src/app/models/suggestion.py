@@ -5,7 +5,9 @@ from datetime import datetime
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
+
+from ..utils.content_store import content_store
 
 
 class SuggestionStatus(str, Enum):
@@ -14,6 +16,7 @@ class SuggestionStatus(str, Enum):
     APPROVED = "approved"
     REJECTED = "rejected"
     MERGED = "merged"
+    SUPERSEDED = "superseded"  # Folded into a combined suggestion
 
 
 class SuggestionType(str, Enum):
@@ -24,6 +27,13 @@ class SuggestionType(str, Enum):
     MOVE = "move"
 
 
+class DiffLineOp(str, Enum):
+    """Role of a line in a diff hunk."""
+    CONTEXT = "context"
+    ADD = "add"
+    DELETE = "delete"
+
+
 class DiffHunk(BaseModel):
     """Represents a single diff hunk (GitHub-style)."""
     old_start: int
@@ -34,10 +44,71 @@ class DiffHunk(BaseModel):
     new_lines: List[str]
     context_before: List[str] = []
     context_after: List[str] = []
+    
+    # One op per displayed line in unified-diff order: context and delete
+    # lines consume old_lines, context and add lines consume new_lines
+    line_ops: List[DiffLineOp] = []
+    
+    # Whether each side ends with a newline; None unless the hunk reaches that side's end
+    old_eof_newline: Optional[bool] = None
+    new_eof_newline: Optional[bool] = None
+
+
+class DiffStats(BaseModel):
+    """Exact line counts of a diff."""
+    additions: int = 0
+    deletions: int = 0
+    changes: int = 0  # Number of hunks
+
+
+class ContentEdit(BaseModel):
+    """Replacement of ``original[start:end]`` with ``text`` that yields the suggested content."""
+    start: int = 0
+    end: int = 0
+    text: str = ""
+    
+    @classmethod
+    def between(cls, original: str, suggested: str) -> "ContentEdit":
+        """Smallest line-aligned edit turning ``original`` into ``suggested``."""
+        limit = min(len(original), len(suggested))
+        # Longest common prefix by bisection on slice comparisons
+        low, high = 0, limit
+        while low < high:
+            middle = (low + high + 1) // 2
+            if original[:middle] == suggested[:middle]:
+                low = middle
+            else:
+                high = middle - 1
+        start = original.rfind("\n", 0, low) + 1
+        # Longest common suffix that does not overlap the prefix
+        low, high = 0, limit - start
+        while low < high:
+            middle = (low + high + 1) // 2
+            if original[len(original) - middle:] == suggested[len(suggested) - middle:]:
+                low = middle
+            else:
+                high = middle - 1
+        end = len(original) - low
+        if end > start and original[end - 1] != "\n":
+            # Extend to the end of the line so the suffix starts on a line boundary
+            newline = original.find("\n", end)
+            end = len(original) if newline < 0 else newline + 1
+        return cls(start=start, end=end, text=suggested[start:len(suggested) - (len(original) - end)])
+    
+    def apply(self, original: str) -> str:
+        """The suggested content."""
+        return original[:self.start] + self.text + original[self.end:]
 
 
 class UpdateSuggestion(BaseModel):
-    """Represents a suggestion to update documentation."""
+    """Represents a suggestion to update documentation.
+    
+    Content is stored compactly: the original is referenced by its hash in
+    the shared content store and the suggested content is one edit of it.
+    ``original_content``, ``suggested_content`` and ``diff_hunks`` are
+    derived on access (hunks through DiffService's cache), and are still
+    accepted as constructor arguments.
+    """
     id: str
     document_id: str
     section_id: str
@@ -45,9 +116,9 @@ class UpdateSuggestion(BaseModel):
     description: str
     
     # GitHub-like diff information
-    diff_hunks: List[DiffHunk]
-    original_content: str
-    suggested_content: str
+    original_hash: str
+    suggested_edit: ContentEdit
+    diff_stats: Optional[DiffStats] = None  # Filled in when the hunks are first computed
     
     # Metadata
     suggestion_type: SuggestionType
@@ -65,6 +136,37 @@ class UpdateSuggestion(BaseModel):
     reasoning: str
     affected_sections: List[str] = []
     related_suggestions: List[str] = []
+    
+    @model_validator(mode="before")
+    @classmethod
+    def _compact_content(cls, data: Any) -> Any:
+        """Turn full original/suggested content (new or stored in the old format) into a hash and an edit."""
+        if not isinstance(data, dict) or "original_content" not in data:
+            return data
+        data = dict(data)
+        original = data.pop("original_content") or ""
+        suggested = data.pop("suggested_content", None)
+        # Hunks are derived from the content, not stored
+        data.pop("diff_hunks", None)
+        data["original_hash"] = content_store.put(original)
+        data["suggested_edit"] = ContentEdit.between(original, original if suggested is None else suggested)
+        return data
+    
+    @property
+    def original_content(self) -> str:
+        """Section content the suggestion was generated from."""
+        return content_store.get(self.original_hash)
+    
+    @property
+    def suggested_content(self) -> str:
+        """Full suggested section content."""
+        return self.suggested_edit.apply(self.original_content)
+    
+    @property
+    def diff_hunks(self) -> List[DiffHunk]:
+        """Diff hunks between the original and suggested content, computed on first use."""
+        from ..services.diff_service import DiffService
+        return DiffService.suggestion_hunks(self)
 
 
 class SuggestionBatch(BaseModel):
@@ -74,4 +176,12 @@ class SuggestionBatch(BaseModel):
     suggestions: List[UpdateSuggestion]
     status: SuggestionStatus = SuggestionStatus.PENDING
     created_at: datetime
-    metadata: Dict[str, Any] = {}
\ No newline at end of file
+    metadata: Dict[str, Any] = {}
+    
+    # Batch run tracking (impact analysis)
+    run_status: str = "succeeded"
+    progress: float = 1.0
+    candidate_section_ids: List[str] = []
+    processed_section_ids: List[str] = []
+    report: Dict[str, Any] = {}
+    updated_at: Optional[datetime] = None
\ No newline at end of file
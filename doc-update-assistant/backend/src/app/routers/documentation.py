@@ -10,6 +10,7 @@ from ..models.document import Document, DocumentSection, DocumentType
 from ..schemas.document import DocumentResponse, DocumentSectionResponse, SearchRequest, SearchResponse
 from ..services.document_processor import DocumentProcessor
 from ..utils.exceptions import DocumentProcessingError
+from ..utils.helpers import extract_identifiers
 from ..utils.logger import api_logger
 
 router = APIRouter(prefix="/docs", tags=["documentation"])
@@ -154,6 +155,130 @@ async def get_section(section_id: str, request: Request) -> DocumentSectionRespo
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@router.get("/symbols")
+async def search_symbols(
+    request: Request,
+    q: str = Query(..., description="Text containing identifiers, e.g. 'Runner.run' or 'function_tool'"),
+    limit: int = Query(50, ge=1, le=500)
+) -> JSONResponse:
+    """Find sections that define or use the identifiers in a query."""
+    doc_processor = request.app.state.doc_processor
+    symbol_index = doc_processor.symbol_index
+    matches = symbol_index.search(q, limit=limit)
+    results = []
+    for match in matches:
+        section = doc_processor.get_section_by_id(match.section_id)
+        if section:
+            results.append({
+                "section_id": section.id,
+                "title": section.title,
+                "file_path": section.file_path,
+                "score": match.score,
+                "symbols": match.symbols,
+            })
+    return JSONResponse({
+        "query": q,
+        "resolved": {identifier: symbol_index.resolve(identifier) for identifier in extract_identifiers(q)},
+        "results": results,
+    })
+
+
+@router.get("/symbols/stats")
+async def get_symbol_stats(request: Request) -> JSONResponse:
+    """Get symbol index size."""
+    return JSONResponse(request.app.state.doc_processor.symbol_index.get_stats())
+
+
+@router.get("/documents/{document_id}/outline")
+async def get_document_outline(document_id: str, request: Request) -> JSONResponse:
+    """Get the nested heading outline of a document."""
+    doc_processor = request.app.state.doc_processor
+    if not doc_processor.get_document_by_id(document_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+    return JSONResponse({
+        "document_id": document_id,
+        "outline": doc_processor.section_tree.outline(document_id),
+    })
+
+
+def _node_ref(node) -> dict | None:
+    """Compact reference to a section tree node."""
+    if node is None:
+        return None
+    return {"section_id": node.section_id, "title": node.title, "level": node.level}
+
+
+@router.get("/sections/{section_id}/tree")
+async def get_section_tree(section_id: str, request: Request) -> JSONResponse:
+    """Get a section's parent, children, siblings and heading path."""
+    section_tree = request.app.state.doc_processor.section_tree
+    node = section_tree.node(section_id)
+    if not node:
+        raise HTTPException(status_code=404, detail="Section not found")
+    return JSONResponse({
+        **_node_ref(node),
+        "document_id": node.document_id,
+        "depth": node.depth,
+        "breadcrumb": section_tree.breadcrumb(section_id),
+        "parent": _node_ref(section_tree.parent(section_id)),
+        "children": [_node_ref(child) for child in section_tree.children(section_id)],
+        "prev_sibling": _node_ref(section_tree.node(node.prev_sibling_id)) if node.prev_sibling_id else None,
+        "next_sibling": _node_ref(section_tree.node(node.next_sibling_id)) if node.next_sibling_id else None,
+    })
+
+
+@router.get("/sections/{section_id}/context")
+async def get_section_context(
+    section_id: str,
+    request: Request,
+    max_tokens: int = Query(200, ge=0, le=4000, description="Token budget for the assembled context")
+) -> JSONResponse:
+    """Get the heading path and ancestor summaries that are sent with a section to the model."""
+    doc_processor = request.app.state.doc_processor
+    section = doc_processor.get_section_by_id(section_id)
+    if not section:
+        raise HTTPException(status_code=404, detail="Section not found")
+    ai_service = getattr(request.app.state, "ai_service", None)
+    if ai_service:
+        count_tokens = ai_service.token_budget.count_tokens
+    else:
+        from ..services.token_budget import TokenBudgetManager
+        count_tokens = TokenBudgetManager().count_tokens
+    context = doc_processor.section_tree.assemble_context(section, max_tokens, count_tokens)
+    return JSONResponse({
+        "section_id": section_id,
+        "breadcrumb": context.breadcrumb,
+        "context": context.text,
+        "tokens": context.tokens,
+        "ancestors_included": context.ancestors_included,
+        "ancestors_total": context.ancestors_total,
+    })
+
+
+@router.get("/sections/{section_id}/mirrors")
+async def get_section_mirrors(section_id: str, request: Request) -> JSONResponse:
+    """Get the English source and translated mirrors aligned with a section."""
+    doc_processor = request.app.state.doc_processor
+    mirror_index = getattr(request.app.state, "mirror_index", None)
+    if not doc_processor.get_section_by_id(section_id):
+        raise HTTPException(status_code=404, detail="Section not found")
+    if not mirror_index:
+        raise HTTPException(status_code=503, detail="Mirror index not available")
+    
+    source = mirror_index.source_of(section_id)
+    english_id = source.id if source else section_id
+    return JSONResponse({
+        "section_id": section_id,
+        "language": mirror_index.language_of(section_id),
+        "source_section_id": source.id if source else None,
+        "mirrors": [
+            {"section_id": mirror.id, "language": mirror_index.language_of(mirror.id), "title": mirror.title}
+            for mirror in mirror_index.mirrors_of(english_id)
+            if mirror.id != section_id
+        ],
+    })
+
+
 @router.post("/search")
 async def search_sections(request: Request, search_request: SearchRequest) -> SearchResponse:
     """Search for sections based on query."""
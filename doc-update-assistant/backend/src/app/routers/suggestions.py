@@ -1,78 +1,82 @@
 # Suggestions router
 """FastAPI router for suggestion endpoints."""
 
-from typing import List, Optional
+import asyncio
+import json
+from typing import List, Optional, Union
 
-from fastapi import APIRouter, HTTPException, Query, Request
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status as http_status
+from fastapi.responses import JSONResponse, StreamingResponse
 
+from ..config import settings
 from ..models.suggestion import SuggestionStatus, SuggestionType, UpdateSuggestion
 from ..schemas.suggestion import (
+    BatchDiffRequest,
     GenerateSuggestionsRequest, 
+    ImpactAnalysisRequest,
+    ImpactAnalysisResponse,
+    ImpactAnalysisResumeRequest,
+    MergeSuggestionsRequest,
     SuggestionResponse, 
     SuggestionBatchResponse,
+    SuggestionJobResponse,
+    SuggestionSummaryResponse,
     UpdateSuggestionRequest
 )
 from ..services.ai_service import AIService
+from ..services.conflict_index import ConflictIndex, IndexedSuggestionStore
 from ..services.document_processor import DocumentProcessor
-from ..utils.exceptions import AIServiceError, DocumentProcessingError
+from ..services.suggestion_index import SuggestionIndex, decode_cursor, encode_cursor
+from ..services.telemetry import caller_scope, telemetry
+from ..utils.exceptions import AIServiceError, DocumentProcessingError, JobQueueFullError, PatchConflictError, ValidationError
+from ..utils.logger import api_logger
 
 router = APIRouter(prefix="/suggestions", tags=["suggestions"])
 
-# In-memory storage for suggestions (in production, use a database)
-suggestions_store: dict[str, UpdateSuggestion] = {}
+# Suggestions, held in memory and made durable by attaching a SuggestionRepository
+# on startup; writes keep the conflict index of pending suggestions and the
+# listing indexes current
+conflict_index = ConflictIndex()
+suggestion_index = SuggestionIndex()
+suggestions_store: IndexedSuggestionStore = IndexedSuggestionStore(conflict_index, suggestion_index)
 
 
 @router.post("/generate", response_model=SuggestionBatchResponse, response_model_exclude_unset=True)
 async def generate_suggestions(request: GenerateSuggestionsRequest, fastapi_request: Request) -> SuggestionBatchResponse:
     """Generate update suggestions based on a query."""
     try:
-        ai_service = fastapi_request.app.state.ai_service
-        doc_processor = fastapi_request.app.state.doc_processor
-        print(f"[DEBUG] Generating suggestions for query: {request.query}")
+        pipeline = fastapi_request.app.state.suggestion_pipeline
+        api_logger.debug(f"Generating suggestions for query: {request.query}")
         
-        # Limit to 3 with fast embedding search
-        max_suggestions = 3
-        
-        # Search for relevant sections (limit to 3 for speed)
-        relevant_sections = await doc_processor.search_sections(
-            query=request.query,
-            limit=max_suggestions
+        # Search, pre-filter and generate (limited to 3 sections for speed)
+        deadline = (
+            settings.suggestion_deadline_seconds
+            if request.deadline_seconds is None else request.deadline_seconds
         )
+        with caller_scope("generate"):
+            result = await pipeline.run(request.query, deadline=deadline or None)
+        suggestions = result.suggestions
         
-        print(f"[DEBUG] Found {len(relevant_sections)} relevant sections")
+        # Sections that missed the deadline land in the store when they finish
+        for task in result.pending.values():
+            task.add_done_callback(_store_late_suggestion)
         
-        if not relevant_sections:
-            print("[DEBUG] No relevant sections found, returning empty response")
+        if not result.sections_found:
+            api_logger.debug("No relevant sections found, returning empty response")
             return SuggestionBatchResponse(
                 query=request.query,
                 suggestions=[],
                 total_suggestions=0,
-                message="No relevant sections found for the query"
+                message=result.message
             )
         
-        # Generate suggestions using AI service (only for top 3 sections)
-        print(f"[DEBUG] Starting AI suggestion generation for {len(relevant_sections)} sections")
-        try:
-            suggestions = await ai_service.generate_suggestions(
-                query=request.query,
-                relevant_sections=relevant_sections
-            )
-            print(f"[DEBUG] AI service returned {len(suggestions)} suggestions")
-        except Exception as e:
-            print(f"[ERROR] AI service failed during suggestion generation: {str(e)}")
-            raise
-        
-        # Only keep the first 3 suggestions for speed
-        suggestions = suggestions[:max_suggestions]
-        
-        print(f"[DEBUG] Generated {len(suggestions)} suggestions")
+        api_logger.debug(f"Generated {len(suggestions)} suggestions")
         
         # Store suggestions in memory
         for suggestion in suggestions:
             suggestions_store[suggestion.id] = suggestion
         
-        print(f"[DEBUG] Stored {len(suggestions)} suggestions in memory store")
+        api_logger.debug(f"Stored {len(suggestions)} suggestions in memory store")
         
         # Convert to response format
         suggestion_responses = [
@@ -89,23 +93,34 @@ async def generate_suggestions(request: GenerateSuggestionsRequest, fastapi_requ
                 updated_at=suggestion.updated_at,
                 reasoning=suggestion.reasoning,
                 diff_hunks=suggestion.diff_hunks,
+                diff_stats=suggestion.diff_stats,
                 original_content=suggestion.original_content,
                 suggested_content=suggestion.suggested_content
             ) for suggestion in suggestions
         ]
         
+        # Only include pending sections and conflicts when there are some, keeping the usual response shape
+        extra = {"pending_sections": result.pending_section_ids} if result.pending else {}
+        conflicts = {
+            suggestion.id: sorted(conflict_index.conflicts_for(suggestion.id))
+            for suggestion in suggestions if conflict_index.conflicts_for(suggestion.id)
+        }
+        if conflicts:
+            api_logger.debug(f"{len(conflicts)} new suggestions overlap pending suggestions")
+            extra["conflicts"] = conflicts
         response = SuggestionBatchResponse(
             query=request.query,
             suggestions=suggestion_responses,
             total_suggestions=len(suggestion_responses),
-            message=f"Generated {len(suggestion_responses)} suggestions"
+            message=result.message,
+            **extra
         )
         
-        print(f"[DEBUG] Returning response with {len(suggestion_responses)} suggestions")
+        api_logger.debug(f"Returning response with {len(suggestion_responses)} suggestions")
         return response
         
     except AIServiceError as e:
-        print(f"[ERROR] AI Service error: {str(e)}")
+        api_logger.error(f"AI Service error: {str(e)}")
         raise HTTPException(
             status_code=400,
             detail={
@@ -114,35 +129,181 @@ async def generate_suggestions(request: GenerateSuggestionsRequest, fastapi_requ
             }
         )
     except DocumentProcessingError as e:
-        print(f"[ERROR] Document processing error: {str(e)}")
+        api_logger.error(f"Document processing error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"[ERROR] Unexpected error: {str(e)}")
+        api_logger.error(f"Unexpected error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+def _store_late_suggestion(task: asyncio.Task) -> None:
+    """Store a suggestion that finished after its request's deadline."""
+    if task.cancelled() or task.exception() is not None:
+        return
+    suggestion = task.result()
+    if suggestion:
+        suggestions_store[suggestion.id] = suggestion
+        # A late mirror suggestion has added itself to its source's related suggestions
+        for related_id in suggestion.related_suggestions:
+            source = suggestions_store.get(related_id)
+            if source is not None and suggestion.id in source.related_suggestions:
+                suggestions_store[related_id] = source
+        api_logger.debug(f"Stored late suggestion {suggestion.id} for section {suggestion.section_id}")
+
+
+@router.post("/jobs", status_code=http_status.HTTP_202_ACCEPTED)
+async def create_suggestion_job(request: GenerateSuggestionsRequest, fastapi_request: Request) -> SuggestionJobResponse:
+    """Enqueue suggestion generation as a background job and return its ID immediately."""
+    try:
+        job_manager = fastapi_request.app.state.job_manager
+        job = await job_manager.submit(request.query)
+        return SuggestionJobResponse.from_job(job)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=http_status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.get("/jobs/{job_id}")
+async def get_suggestion_job(job_id: str, fastapi_request: Request) -> SuggestionJobResponse:
+    """Get progress and, once finished, results of a background job."""
+    try:
+        job = await fastapi_request.app.state.job_manager.get(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return SuggestionJobResponse.from_job(job)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_suggestion_job(job_id: str, fastapi_request: Request) -> SuggestionJobResponse:
+    """Cancel a queued or running background job."""
+    try:
+        job = await fastapi_request.app.state.job_manager.cancel(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return SuggestionJobResponse.from_job(job)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.post("/impact", status_code=http_status.HTTP_202_ACCEPTED)
+async def start_impact_analysis(request: ImpactAnalysisRequest, fastapi_request: Request) -> ImpactAnalysisResponse:
+    """Score the whole corpus against a change description and generate suggestions for affected sections."""
+    try:
+        analyzer = fastapi_request.app.state.impact_analyzer
+        batch = await analyzer.start(
+            request.description,
+            threshold=request.threshold,
+            max_sections=request.max_sections,
+            concurrency=request.concurrency,
+            max_llm_calls=request.max_llm_calls,
+            max_cost_usd=request.max_cost_usd
+        )
+        return ImpactAnalysisResponse.from_batch(batch, include_suggestions=False)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.get("/impact/{batch_id}")
+async def get_impact_analysis(
+    batch_id: str,
+    fastapi_request: Request,
+    include_suggestions: bool = Query(True, description="Include generated suggestions")
+) -> ImpactAnalysisResponse:
+    """Get progress, cost/latency report and results of an impact analysis."""
+    try:
+        batch = await fastapi_request.app.state.impact_analyzer.get(batch_id)
+        if not batch:
+            raise HTTPException(status_code=404, detail="Impact analysis not found")
+        return ImpactAnalysisResponse.from_batch(batch, include_suggestions=include_suggestions)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.post("/impact/{batch_id}/stop")
+async def stop_impact_analysis(batch_id: str, fastapi_request: Request) -> ImpactAnalysisResponse:
+    """Stop a running impact analysis after checkpointing it; resume it later to continue."""
+    try:
+        batch = await fastapi_request.app.state.impact_analyzer.stop(batch_id)
+        if not batch:
+            raise HTTPException(status_code=404, detail="Impact analysis not found")
+        return ImpactAnalysisResponse.from_batch(batch, include_suggestions=False)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.post("/impact/{batch_id}/resume", status_code=http_status.HTTP_202_ACCEPTED)
+async def resume_impact_analysis(
+    batch_id: str,
+    request: ImpactAnalysisResumeRequest,
+    fastapi_request: Request
+) -> ImpactAnalysisResponse:
+    """Resume an interrupted or budget-capped impact analysis, optionally with new limits."""
+    try:
+        batch = await fastapi_request.app.state.impact_analyzer.resume(
+            batch_id,
+            concurrency=request.concurrency,
+            max_llm_calls=request.max_llm_calls,
+            max_cost_usd=request.max_cost_usd
+        )
+        if not batch:
+            raise HTTPException(status_code=404, detail="Impact analysis not found")
+        return ImpactAnalysisResponse.from_batch(batch, include_suggestions=False)
+    except HTTPException:
+        raise
+    except ValidationError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
 @router.get("/")
 async def list_suggestions(
+    response: Response,
     status: Optional[SuggestionStatus] = Query(None, description="Filter by status"),
     suggestion_type: Optional[SuggestionType] = Query(None, description="Filter by type"),
-    limit: int = Query(20, ge=1, le=100, description="Number of suggestions to return")
-) -> List[SuggestionResponse]:
-    """List all suggestions with optional filtering."""
+    document_id: Optional[str] = Query(None, description="Filter by document"),
+    section_id: Optional[str] = Query(None, description="Filter by section, e.g. a pending section from /generate"),
+    limit: int = Query(20, ge=1, le=100, description="Number of suggestions to return"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="Order by creation time"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    view: str = Query("full", pattern="^(full|summary)$", description="'summary' omits content and diff bodies")
+) -> List[Union[SuggestionResponse, SuggestionSummaryResponse]]:
+    """List suggestions by creation time with optional filtering.
+    
+    Pages come from the secondary indexes without scanning the store; when
+    more results follow, the ``X-Next-Cursor`` response header holds the
+    cursor for the next page.
+    """
     try:
-        suggestions = list(suggestions_store.values())
-        print(f"[DEBUG] Total suggestions in store: {len(suggestions)}")
-        
-        # Apply filters
-        if status:
-            suggestions = [s for s in suggestions if s.status == status]
-            print(f"[DEBUG] After status filter ({status}): {len(suggestions)} suggestions")
-        if suggestion_type:
-            suggestions = [s for s in suggestions if s.suggestion_type == suggestion_type]
-            print(f"[DEBUG] After type filter ({suggestion_type}): {len(suggestions)} suggestions")
+        ids, next_key = suggestion_index.page(
+            {
+                "status": status,
+                "suggestion_type": suggestion_type,
+                "document_id": document_id,
+                "section_id": section_id,
+            },
+            limit,
+            decode_cursor(cursor) if cursor else None,
+            descending=order == "desc"
+        )
+        suggestions = [suggestions_store[suggestion_id] for suggestion_id in ids]
+        if next_key is not None:
+            response.headers["X-Next-Cursor"] = encode_cursor(next_key)
+        api_logger.debug(f"Listing {len(suggestions)} of {len(suggestions_store)} suggestions")
         
-        # Apply limit
-        suggestions = suggestions[:limit]
-        print(f"[DEBUG] After limit ({limit}): {len(suggestions)} suggestions")
+        if view == "summary":
+            return [SuggestionSummaryResponse.from_suggestion(suggestion) for suggestion in suggestions]
         
         response_suggestions = [
             SuggestionResponse(
@@ -158,19 +319,130 @@ async def list_suggestions(
                 updated_at=suggestion.updated_at,
                 reasoning=suggestion.reasoning,
                 diff_hunks=suggestion.diff_hunks,
+                diff_stats=suggestion.diff_stats,
                 original_content=suggestion.original_content,
                 suggested_content=suggestion.suggested_content
             ) for suggestion in suggestions
         ]
         
-        print(f"[DEBUG] Returning {len(response_suggestions)} suggestions")
         return response_suggestions
         
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"[ERROR] Error in list_suggestions: {str(e)}")
+        api_logger.error(f"Error in list_suggestions: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@router.get("/conflicts")
+async def list_conflicts(
+    document_id: Optional[str] = Query(None, description="Only conflicts within this document")
+) -> JSONResponse:
+    """Groups of pending suggestions whose changed line ranges overlap."""
+    groups = conflict_index.conflict_groups(document_id)
+    return JSONResponse({"groups": groups, "total": len(groups), "index": conflict_index.get_stats()})
+
+
+@router.post("/merge")
+async def merge_suggestions(request: MergeSuggestionsRequest) -> SuggestionResponse:
+    """Combine compatible pending suggestions for one section into a single suggestion.
+    
+    The merged suggestions are marked superseded and linked to the new one.
+    Suggestions whose changes overlap cannot be combined (409).
+    """
+    ids = list(dict.fromkeys(request.suggestion_ids))
+    if len(ids) < 2:
+        raise HTTPException(status_code=400, detail="At least two suggestions are needed")
+    missing = [suggestion_id for suggestion_id in ids if suggestion_id not in suggestions_store]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Suggestions not found: {', '.join(missing)}")
+    selected = [suggestions_store[suggestion_id] for suggestion_id in ids]
+    if any(suggestion.status != SuggestionStatus.PENDING for suggestion in selected):
+        raise HTTPException(status_code=409, detail="Only pending suggestions can be merged")
+    first = selected[0]
+    if any(
+        suggestion.section_id != first.section_id or suggestion.original_hash != first.original_hash
+        for suggestion in selected
+    ):
+        raise HTTPException(status_code=400, detail="Suggestions must target the same version of one section")
+    
+    from ..services.diff_service import DiffService
+    
+    try:
+        combined_content = DiffService.combine_changes(
+            first.original_content, [suggestion.diff_hunks for suggestion in selected]
+        )
+    except PatchConflictError as e:
+        raise HTTPException(status_code=409, detail={
+            "error": str(e),
+            "conflicts": [
+                {"suggestion_ids": [ids[index] for index in conflict["diffs"]], "lines": conflict["lines"]}
+                for conflict in e.conflicts
+            ],
+        })
+    
+    from datetime import datetime
+    import uuid
+    
+    now = datetime.now()
+    combined = UpdateSuggestion(
+        id=str(uuid.uuid4()),
+        document_id=first.document_id,
+        section_id=first.section_id,
+        title=request.title or f"Combined: {first.title}",
+        description="\n".join(suggestion.description for suggestion in selected if suggestion.description),
+        original_content=first.original_content,
+        suggested_content=combined_content,
+        suggestion_type=first.suggestion_type,
+        confidence_score=min(suggestion.confidence_score for suggestion in selected),
+        created_at=now,
+        updated_at=now,
+        reasoning="\n\n".join(suggestion.reasoning for suggestion in selected if suggestion.reasoning),
+        affected_sections=[first.section_id],
+        related_suggestions=ids
+    )
+    # Supersede the originals first so they do not show up as conflicting with the combination
+    for suggestion in selected:
+        suggestion.status = SuggestionStatus.SUPERSEDED
+        suggestion.related_suggestions = [*suggestion.related_suggestions, combined.id]
+        suggestion.updated_at = now
+        suggestions_store[suggestion.id] = suggestion
+    suggestions_store[combined.id] = combined
+    return SuggestionResponse.from_suggestion(combined)
+
+
+@router.post("/diff")
+async def batch_diff(request: BatchDiffRequest, fastapi_request: Request) -> StreamingResponse:
+    """Stream one combined diff per document for many suggestions, as newline-delimited JSON.
+    
+    Hunks are rebased onto whole-document line numbers and carry no full
+    section content, so a page's diff viewer needs one request instead of
+    one per suggestion. See ``DiffService.document_diff`` for the records.
+    """
+    if not request.suggestion_ids and not request.document_id:
+        raise HTTPException(status_code=400, detail="Provide suggestion_ids or document_id")
+    missing = [suggestion_id for suggestion_id in request.suggestion_ids if suggestion_id not in suggestions_store]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Suggestions not found: {', '.join(missing)}")
+    doc_processor = fastapi_request.app.state.doc_processor
+    selected = {suggestion_id: suggestions_store[suggestion_id] for suggestion_id in request.suggestion_ids}
+    if request.document_id:
+        # Suggestions reference documents by file path; accept a document id too
+        document = doc_processor.get_document_by_id(request.document_id) if doc_processor else None
+        document_id = document.file_path if document else request.document_id
+        matching = suggestion_index.matching({"document_id": document_id, "status": request.status})
+        for suggestion_id in list(matching):
+            selected.setdefault(suggestion_id, suggestions_store[suggestion_id])
+    
+    from ..services.diff_service import DiffService
+    
+    records = DiffService.document_diff(list(selected.values()), doc_processor, request.inline)
+    return StreamingResponse(
+        (json.dumps(record) + "\n" for record in records),
+        media_type="application/x-ndjson"
+    )
+
+
 @router.get("/{suggestion_id}")
 async def get_suggestion(suggestion_id: str) -> SuggestionResponse:
     """Get a specific suggestion by ID."""
@@ -192,6 +464,7 @@ async def get_suggestion(suggestion_id: str) -> SuggestionResponse:
             updated_at=suggestion.updated_at,
             reasoning=suggestion.reasoning,
             diff_hunks=suggestion.diff_hunks,
+            diff_stats=suggestion.diff_stats,
             original_content=suggestion.original_content,
             suggested_content=suggestion.suggested_content
         )
@@ -240,6 +513,7 @@ async def update_suggestion(
             updated_at=suggestion.updated_at,
             reasoning=suggestion.reasoning,
             diff_hunks=suggestion.diff_hunks,
+            diff_stats=suggestion.diff_stats,
             original_content=suggestion.original_content,
             suggested_content=suggestion.suggested_content
         )
@@ -322,8 +596,29 @@ async def reject_suggestion(suggestion_id: str) -> JSONResponse:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@router.get("/{suggestion_id}/conflicts")
+async def get_suggestion_conflicts(suggestion_id: str) -> JSONResponse:
+    """Pending suggestions whose changes overlap this one, from the interval index."""
+    suggestion = suggestions_store.get(suggestion_id)
+    if not suggestion:
+        raise HTTPException(status_code=404, detail="Suggestion not found")
+    conflicts = conflict_index.conflicts_for(suggestion_id)
+    return JSONResponse({
+        "suggestion_id": suggestion_id,
+        "status": suggestion.status,
+        "ranges": [change.to_dict() for change in conflict_index.ranges_of(suggestion_id)],
+        "conflicts": [
+            {"suggestion_id": other_id, "ranges": [change.to_dict() for change in ranges]}
+            for other_id, ranges in sorted(conflicts.items())
+        ],
+    })
+
+
 @router.get("/{suggestion_id}/diff")
-async def get_suggestion_diff(suggestion_id: str) -> JSONResponse:
+async def get_suggestion_diff(
+    suggestion_id: str,
+    inline: Optional[str] = Query(None, pattern="^(word|char)$", description="Add intra-line word or character diffs")
+) -> JSONResponse:
     """Get the diff for a specific suggestion."""
     try:
         suggestion = suggestions_store.get(suggestion_id)
@@ -332,12 +627,20 @@ async def get_suggestion_diff(suggestion_id: str) -> JSONResponse:
         
         from ..services.diff_service import DiffService
         
-        # Get diff statistics
-        diff_stats = DiffService.get_diff_stats(suggestion.diff_hunks)
+        # Stats are computed with the hunks; suggestions stored without them get them once here
+        if suggestion.diff_stats is None:
+            suggestion.diff_stats = DiffService.compute_diff_stats(suggestion.diff_hunks)
+            suggestions_store[suggestion_id] = suggestion
+        diff_stats = suggestion.diff_stats.model_dump()
+        
+        diff_hunks = [hunk.model_dump() for hunk in suggestion.diff_hunks]
+        if inline:
+            for hunk, payload in zip(suggestion.diff_hunks, diff_hunks):
+                payload["inline"] = DiffService.inline_changes(hunk, inline)
         
         return JSONResponse({
             "suggestion_id": suggestion_id,
-            "diff_hunks": [hunk.model_dump() for hunk in suggestion.diff_hunks],
+            "diff_hunks": diff_hunks,
             "stats": diff_stats,
             "original_content": suggestion.original_content,
             "suggested_content": suggestion.suggested_content
@@ -349,29 +652,148 @@ async def get_suggestion_diff(suggestion_id: str) -> JSONResponse:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@router.post("/{suggestion_id}/apply")
+async def apply_suggestion(
+    suggestion_id: str,
+    fastapi_request: Request,
+    dry_run: bool = Query(False, description="Return the patched content without changing the section")
+) -> JSONResponse:
+    """Apply a suggestion's diff hunks to the current section content and mark it merged."""
+    suggestion = suggestions_store.get(suggestion_id)
+    if not suggestion:
+        raise HTTPException(status_code=404, detail="Suggestion not found")
+    if suggestion.status == SuggestionStatus.MERGED:
+        raise HTTPException(status_code=409, detail="Suggestion is already merged")
+    doc_processor = fastapi_request.app.state.doc_processor
+    section = doc_processor.get_section_by_id(suggestion.section_id) if doc_processor else None
+    # The section may have changed since the suggestion was generated
+    current_content = section.content if section else suggestion.original_content
+    
+    from ..services.diff_service import DiffService
+    
+    try:
+        patched = DiffService.apply_diff_hunks(current_content, suggestion.diff_hunks)
+    except PatchConflictError as e:
+        raise HTTPException(status_code=409, detail={
+            "message": str(e),
+            "conflicts": [
+                {"hunk": c.index, "expected_line": c.expected_line, "reason": c.reason}
+                for c in e.conflicts
+            ]
+        })
+    
+    if not dry_run:
+        if section:
+            await doc_processor.update_section_content(section.id, patched)
+        from datetime import datetime
+        suggestion.status = SuggestionStatus.MERGED
+        suggestion.updated_at = datetime.now()
+        suggestions_store[suggestion_id] = suggestion
+    
+    return JSONResponse({
+        "suggestion_id": suggestion_id,
+        "status": suggestion.status,
+        "dry_run": dry_run,
+        "content": patched,
+        "drifted": current_content != suggestion.original_content
+    })
+
+
+@router.post("/{suggestion_id}/propagate")
+async def propagate_suggestion(suggestion_id: str, fastapi_request: Request) -> JSONResponse:
+    """Derive suggestions for the translated mirrors of a suggestion's section."""
+    suggestion = suggestions_store.get(suggestion_id)
+    if not suggestion:
+        raise HTTPException(status_code=404, detail="Suggestion not found")
+    mirror_index = getattr(fastapi_request.app.state, "mirror_index", None)
+    ai_service = fastapi_request.app.state.ai_service
+    if not mirror_index or not ai_service:
+        raise HTTPException(status_code=503, detail="Mirror propagation not available")
+    
+    try:
+        mirrors = mirror_index.mirrors_of(suggestion.section_id)
+        with caller_scope("propagate"):
+            derived = await asyncio.gather(*(
+                ai_service.derive_mirror_suggestion(suggestion, mirror, mirror_index.language_of(mirror.id))
+                for mirror in mirrors
+            ))
+    except AIServiceError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    
+    created = [s for s in derived if s]
+    for derived_suggestion in created:
+        suggestions_store[derived_suggestion.id] = derived_suggestion
+    suggestions_store[suggestion_id] = suggestion
+    
+    return JSONResponse({
+        "suggestion_id": suggestion_id,
+        "mirrors": len(mirrors),
+        "created": [s.id for s in created],
+        "failed_sections": [m.id for m, s in zip(mirrors, derived) if not s],
+    })
+
+
+@router.get("/stats/routing")
+async def get_routing_stats(fastapi_request: Request) -> JSONResponse:
+    """Get model routing configuration and per-tier latency, cost and escalation metrics."""
+    ai_service = fastapi_request.app.state.ai_service
+    if not ai_service:
+        raise HTTPException(status_code=503, detail="AI service not available")
+    return JSONResponse(ai_service.model_router.get_stats())
+
+
+@router.get("/stats/scheduler")
+async def get_scheduler_stats(fastapi_request: Request) -> JSONResponse:
+    """Get LLM scheduler budgets, occupancy and per-priority queue waits."""
+    ai_service = fastapi_request.app.state.ai_service
+    if not ai_service:
+        raise HTTPException(status_code=503, detail="AI service not available")
+    return JSONResponse(ai_service.scheduler.get_stats())
+
+
+@router.get("/stats/cache")
+async def get_cache_stats(fastapi_request: Request) -> JSONResponse:
+    """Get semantic suggestion cache hit/miss statistics."""
+    cache = getattr(fastapi_request.app.state, "suggestion_cache", None)
+    if not cache:
+        return JSONResponse({"enabled": False})
+    return JSONResponse({"enabled": True, **cache.get_stats()})
+
+
+@router.get("/stats/mirrors")
+async def get_mirror_stats(fastapi_request: Request) -> JSONResponse:
+    """Get English/translation page and section alignment counts."""
+    mirror_index = getattr(fastapi_request.app.state, "mirror_index", None)
+    if not mirror_index:
+        return JSONResponse({"enabled": False})
+    return JSONResponse({"enabled": True, **mirror_index.get_stats()})
+
+
+@router.get("/stats/store")
+async def get_store_stats(fastapi_request: Request) -> JSONResponse:
+    """Get durable suggestion store size, pending writes and flush metrics."""
+    repository = getattr(fastapi_request.app.state, "suggestion_repository", None)
+    if repository is None:
+        return JSONResponse({"enabled": False})
+    return JSONResponse({"enabled": True, **repository.get_stats()})
+
+
+@router.get("/stats/storage")
+async def get_storage_stats(fastapi_request: Request) -> JSONResponse:
+    """Get stored object counts and sizes from the storage service's incremental counters."""
+    storage = getattr(fastapi_request.app.state, "storage", None)
+    if storage is None:
+        return JSONResponse({"enabled": False})
+    return JSONResponse({"enabled": True, **(await storage.get_storage_stats())})
+
+
+@router.get("/stats/telemetry")
+async def get_telemetry_stats() -> JSONResponse:
+    """Get per-request LLM and embedding token, latency, retry and cost metrics by model, template and caller."""
+    return JSONResponse(telemetry.get_stats())
+
+
 @router.get("/stats/overview")
 async def get_suggestions_stats() -> JSONResponse:
-    """Get overview statistics for all suggestions."""
-    try:
-        suggestions = list(suggestions_store.values())
-        
-        stats = {
-            "total_suggestions": len(suggestions),
-            "by_status": {},
-            "by_type": {},
-            "average_confidence": 0.0
-        }
-        
-        for status in SuggestionStatus:
-            stats["by_status"][status.value] = len([s for s in suggestions if s.status == status])
-        
-        for suggestion_type in SuggestionType:
-            stats["by_type"][suggestion_type.value] = len([s for s in suggestions if s.suggestion_type == suggestion_type])
-        
-        if suggestions:
-            stats["average_confidence"] = sum(s.confidence_score for s in suggestions) / len(suggestions)
-        
-        return JSONResponse(stats)
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    """Get overview statistics for all suggestions, from the index counters."""
+    return JSONResponse(suggestion_index.get_stats())
@@ -9,11 +9,18 @@ from .document import (
     SearchResponse,
 )
 from .suggestion import (
+    BatchDiffRequest,
     DiffHunkResponse,
     GenerateSuggestionsRequest,
+    ImpactAnalysisRequest,
+    ImpactAnalysisResponse,
+    ImpactAnalysisResumeRequest,
+    MergeSuggestionsRequest,
     SuggestionBatchResponse,
+    SuggestionJobResponse,
     SuggestionListResponse,
     SuggestionResponse,
+    SuggestionSummaryResponse,
     UpdateSuggestionRequest,
 )
 
@@ -24,10 +31,17 @@ __all__ = [
     "DocumentSectionResponse",
     "SearchRequest",
     "SearchResponse",
+    "BatchDiffRequest",
     "DiffHunkResponse",
     "GenerateSuggestionsRequest",
+    "ImpactAnalysisRequest",
+    "ImpactAnalysisResponse",
+    "ImpactAnalysisResumeRequest",
+    "MergeSuggestionsRequest",
     "SuggestionBatchResponse",
+    "SuggestionJobResponse",
     "SuggestionListResponse",
     "SuggestionResponse", 
+    "SuggestionSummaryResponse",
     "UpdateSuggestionRequest",
 ]
\ No newline at end of file
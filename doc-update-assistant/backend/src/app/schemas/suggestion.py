@@ -3,10 +3,13 @@
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
+from ..models.job import JobStatus, SuggestionJob
 from ..models.suggestion import (
     DiffHunk,
+    DiffLineOp,
+    DiffStats,
     SuggestionBatch,
     SuggestionStatus,
     SuggestionType,
@@ -21,6 +24,7 @@ class GenerateSuggestionsRequest(BaseModel):
     limit: int = 10
     context: Optional[str] = None
     target_sections: Optional[List[str]] = None
+    deadline_seconds: Optional[float] = None  # Server default when omitted; 0 waits for all sections
 
 
 class UpdateSuggestionRequest(BaseModel):
@@ -39,6 +43,7 @@ class DiffHunkResponse(BaseModel):
     new_lines: List[str]
     context_before: List[str] = []
     context_after: List[str] = []
+    line_ops: List[DiffLineOp] = []
 
 
 class SuggestionResponse(BaseModel):
@@ -54,6 +59,7 @@ class SuggestionResponse(BaseModel):
     
     # Diff information
     diff_hunks: List[DiffHunk]
+    diff_stats: Optional[DiffStats] = None
     original_content: str
     suggested_content: str
     
@@ -81,6 +87,7 @@ class SuggestionResponse(BaseModel):
             status=suggestion.status,
             confidence_score=suggestion.confidence_score,
             diff_hunks=suggestion.diff_hunks,
+            diff_stats=suggestion.diff_stats,
             original_content=suggestion.original_content,
             suggested_content=suggestion.suggested_content,
             created_at=suggestion.created_at,
@@ -93,6 +100,54 @@ class SuggestionResponse(BaseModel):
         )
 
 
+class SuggestionSummaryResponse(BaseModel):
+    """Suggestion list entry without content or diff bodies."""
+    id: str
+    document_id: str
+    section_id: str
+    title: str
+    description: str
+    suggestion_type: SuggestionType
+    status: SuggestionStatus
+    confidence_score: float
+    diff_stats: Optional[DiffStats] = None  # Known once the diff has been viewed
+    created_at: datetime
+    updated_at: datetime
+    reviewed_by: Optional[str] = None
+    
+    @classmethod
+    def from_suggestion(cls, suggestion: UpdateSuggestion) -> "SuggestionSummaryResponse":
+        """Create a summary from a suggestion without touching its content."""
+        return cls(
+            id=suggestion.id,
+            document_id=suggestion.document_id,
+            section_id=suggestion.section_id,
+            title=suggestion.title,
+            description=suggestion.description,
+            suggestion_type=suggestion.suggestion_type,
+            status=suggestion.status,
+            confidence_score=suggestion.confidence_score,
+            diff_stats=suggestion.diff_stats,
+            created_at=suggestion.created_at,
+            updated_at=suggestion.updated_at,
+            reviewed_by=suggestion.reviewed_by
+        )
+
+
+class MergeSuggestionsRequest(BaseModel):
+    """Request to combine pending suggestions for one section into a single suggestion."""
+    suggestion_ids: List[str]
+    title: Optional[str] = None
+
+
+class BatchDiffRequest(BaseModel):
+    """Request for one combined document-level diff of many suggestions."""
+    suggestion_ids: List[str] = []
+    document_id: Optional[str] = None  # Document id or file path; adds its suggestions with ``status``
+    status: Optional[SuggestionStatus] = SuggestionStatus.PENDING
+    inline: Optional[str] = Field(None, pattern="^(word|char)$")
+
+
 class SuggestionUpdateRequest(BaseModel):
     """Suggestion update request schema."""
     status: Optional[SuggestionStatus] = None
@@ -107,6 +162,8 @@ class SuggestionBatchResponse(BaseModel):
     suggestions: List[SuggestionResponse]
     total_suggestions: int
     message: Optional[str] = None
+    pending_sections: List[str] = []
+    conflicts: Dict[str, List[str]] = {}  # Suggestion id -> overlapping pending suggestion ids
     
     @classmethod
     def from_batch(cls, batch: SuggestionBatch) -> "SuggestionBatchResponse":
@@ -125,4 +182,94 @@ class SuggestionListResponse(BaseModel):
     """Suggestion list response schema."""
     suggestions: List[SuggestionResponse]
     total: int
-    filter_status: Optional[SuggestionStatus] = None
\ No newline at end of file
+    filter_status: Optional[SuggestionStatus] = None
+
+
+class SuggestionJobResponse(BaseModel):
+    """Background suggestion job response schema."""
+    job_id: str
+    query: str
+    status: JobStatus
+    stage: str
+    progress: float
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    status_url: str
+    suggestions: List[SuggestionResponse] = []
+    total_suggestions: int = 0
+    message: Optional[str] = None
+    error: Optional[str] = None
+    
+    @classmethod
+    def from_job(cls, job: SuggestionJob) -> "SuggestionJobResponse":
+        """Create response from job model."""
+        suggestions = [SuggestionResponse.from_suggestion(s) for s in job.suggestions]
+        return cls(
+            job_id=job.id,
+            query=job.query,
+            status=job.status,
+            stage=job.stage,
+            progress=job.progress,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+            status_url=f"/suggestions/jobs/{job.id}",
+            suggestions=suggestions,
+            total_suggestions=len(suggestions),
+            message=job.message,
+            error=job.error
+        )
+
+
+class ImpactAnalysisRequest(BaseModel):
+    """Impact analysis request schema."""
+    description: str
+    threshold: Optional[float] = None
+    max_sections: Optional[int] = None
+    concurrency: Optional[int] = None
+    max_llm_calls: Optional[int] = None
+    max_cost_usd: Optional[float] = None
+
+
+class ImpactAnalysisResumeRequest(BaseModel):
+    """Impact analysis resume request schema."""
+    concurrency: Optional[int] = None
+    max_llm_calls: Optional[int] = None
+    max_cost_usd: Optional[float] = None
+
+
+class ImpactAnalysisResponse(BaseModel):
+    """Impact analysis batch response schema."""
+    batch_id: str
+    description: str
+    run_status: str
+    progress: float
+    candidates: int
+    processed: int
+    total_suggestions: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    status_url: str
+    report: Dict[str, Any] = {}
+    suggestions: List[SuggestionResponse] = []
+    
+    @classmethod
+    def from_batch(cls, batch: SuggestionBatch, include_suggestions: bool = True) -> "ImpactAnalysisResponse":
+        """Create response from an impact analysis batch."""
+        return cls(
+            batch_id=batch.id,
+            description=batch.query,
+            run_status=batch.run_status,
+            progress=batch.progress,
+            candidates=len(batch.candidate_section_ids),
+            processed=len(batch.processed_section_ids),
+            total_suggestions=len(batch.suggestions),
+            created_at=batch.created_at,
+            updated_at=batch.updated_at,
+            status_url=f"/suggestions/impact/{batch.id}",
+            report=batch.report,
+            suggestions=[
+                SuggestionResponse.from_suggestion(s) for s in batch.suggestions
+            ] if include_suggestions else []
+        )
\ No newline at end of file
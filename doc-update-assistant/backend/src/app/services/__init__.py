@@ -1,13 +1,43 @@
 """Services package."""
 
 from .ai_service import AIService
+from .call_policy import LLMCallPolicy
 from .diff_service import DiffService
 from .document_processor import DocumentProcessor
+from .impact_analysis import ImpactAnalyzer
+from .job_service import SuggestionJobManager
+from .llm_scheduler import LLMScheduler
+from .mirror_index import MirrorAlignmentIndex
+from .model_router import ModelRouter
+from .prefilter import SectionPreFilter
+from .section_tree import SectionTreeIndex
+from .semantic_cache import SemanticSuggestionCache
 from .storage_service import StorageService
+from .suggestion_index import SuggestionIndex
+from .suggestion_pipeline import SuggestionPipeline
+from .suggestion_repository import SuggestionRepository
+from .symbol_index import SymbolIndex
+from .telemetry import LLMTelemetry
+from .token_budget import TokenBudgetManager
 
 __all__ = [
     "AIService",
     "DiffService", 
     "DocumentProcessor",
+    "ImpactAnalyzer",
+    "LLMCallPolicy",
+    "LLMScheduler",
+    "LLMTelemetry",
+    "MirrorAlignmentIndex",
+    "ModelRouter",
+    "SectionPreFilter",
+    "SectionTreeIndex",
+    "SemanticSuggestionCache",
     "StorageService",
+    "SuggestionJobManager",
+    "SuggestionIndex",
+    "SuggestionPipeline",
+    "SuggestionRepository",
+    "SymbolIndex",
+    "TokenBudgetManager",
 ]
\ No newline at end of file
@@ -1,21 +1,40 @@
 # AI service
 """AI service for generating documentation update suggestions."""
 
+import asyncio
 import json
 import os
+import time
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 from ..models.document import DocumentSection, DocumentType
 from ..models.suggestion import SuggestionType, UpdateSuggestion
+from ..services.call_policy import LLMCallPolicy
 from ..services.diff_service import DiffService
-from ..utils.exceptions import AIServiceError
+from ..services.llm_scheduler import LLMScheduler
+from ..services.model_router import ModelRouter
+from ..services.token_budget import PromptBudget, TokenBudgetManager
+from ..services.telemetry import KIND_CHAT, OUTCOME_CANCELLED, OUTCOME_ERROR, telemetry
+from ..services.usage import record_usage, track_usage
+from ..utils.exceptions import AIServiceError, CircuitOpenError
+from ..utils.logger import ai_logger, line_file_logger, log_event
 from ..config import settings
 
 
+# SDK concepts and the query keywords that signal them
+CONCEPT_KEYWORDS: dict[str, list[str]] = {
+    "agent": ["agent", "llm"],
+    "handoff": ["handoff", "delegate", "transfer"],
+    "tool": ["tool", "function", "call"],
+    "guardrail": ["guardrail", "validation", "check"],
+    "runner": ["runner", "execute", "run"]
+}
+
+
 class AIService:
     """Enhanced AI service for OpenAI Agents SDK documentation updates. Handles all AI-based suggestion generation and context analysis."""
     
@@ -27,31 +46,187 @@ class AIService:
                 "OpenAI API key is missing. Please set OPENAI_API_KEY in your environment or .env file. "
                 "Suggestions cannot be generated without it."
             )
-        self.client = OpenAI(api_key=api_key, timeout=30)
+        # Retries are handled by the call policy rather than the SDK
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=settings.openai_base_url,
+            timeout=30,
+            max_retries=0
+        )
+        self.call_policy = LLMCallPolicy()
+        self.scheduler = LLMScheduler()
+        self.model_router = ModelRouter()
         self.diff_service = DiffService()
+        # Budget for the fast tier, which has the smallest context window
+        self.token_budget = TokenBudgetManager(model=settings.openai_model)
         
     async def generate_suggestions(
         self, 
         query: str, 
-        relevant_sections: list[DocumentSection]
+        relevant_sections: list[DocumentSection],
+        progress_callback: Callable[[int, int], None] | None = None
     ) -> list[UpdateSuggestion]:
-        """Generate update suggestions based on query and relevant sections. Optimized for speed with parallel processing."""
-        import asyncio
-        
-        # Skip context analysis for speed - derive context from query directly
-        change_context = self._quick_analyze_query_context(query)
+        """Generate update suggestions based on query and relevant sections. Optimized for speed with parallel processing.
         
+        ``progress_callback(done, total)`` is called as each section finishes.
+        """
         # Parallelize suggestion generation for all relevant sections
-        tasks = [
-            self._generate_section_suggestion_fast(query, section, change_context)
-            for section in relevant_sections
-        ]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        tasks = self.start_section_suggestions(query, relevant_sections, progress_callback)
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
         
         # Filter out None results and exceptions
         suggestions = [s for s in results if s and not isinstance(s, Exception)]
         return suggestions
     
+    def start_section_suggestions(
+        self, 
+        query: str, 
+        relevant_sections: list[DocumentSection],
+        progress_callback: Callable[[int, int], None] | None = None,
+        section_contexts: dict[str, str] | None = None
+    ) -> dict[str, asyncio.Task]:
+        """Start generating a suggestion for each section concurrently and return the task per section id.
+        
+        Callers decide how long to wait; tasks not awaited keep running in the background.
+        ``section_contexts`` maps section ids to surrounding heading context for the prompt.
+        """
+        section_contexts = section_contexts or {}
+        # Skip context analysis for speed - derive context from query directly
+        change_context = self._quick_analyze_query_context(query)
+        total = len(relevant_sections)
+        completed = 0
+        
+        async def generate(section: DocumentSection) -> UpdateSuggestion | None:
+            nonlocal completed
+            try:
+                return await self._generate_section_suggestion_fast(
+                    query, section, change_context, section_contexts.get(section.id, "")
+                )
+            finally:
+                completed += 1
+                if progress_callback:
+                    progress_callback(completed, total)
+        
+        return {
+            section.id: asyncio.ensure_future(generate(section))
+            for section in relevant_sections
+        }
+    
+    async def generate_section_suggestion(
+        self, 
+        query: str, 
+        section: DocumentSection,
+        change_context: dict[str, Any] | None = None,
+        section_context: str = ""
+    ) -> UpdateSuggestion | None:
+        """Generate a suggestion for a single section, deriving the change context from the query if not given."""
+        if change_context is None:
+            change_context = self._quick_analyze_query_context(query)
+        return await self._generate_section_suggestion_fast(query, section, change_context, section_context)
+    
+    async def derive_mirror_suggestion(
+        self, 
+        source: UpdateSuggestion,
+        target: DocumentSection,
+        language: str
+    ) -> UpdateSuggestion | None:
+        """Derive a suggestion for a translated mirror section by translating the source suggestion's diff.
+        
+        Only the English diff and the mirror section are sent, and the model
+        returns find/replace edits instead of rewriting the whole section.
+        """
+        if not source.diff_hunks or not target.content:
+            return None
+        diff_text = self._format_diff_for_prompt(source.diff_hunks)
+        system_prompt = self._get_mirror_system_prompt(language)
+        budget = self.token_budget.allocate(
+            system_prompt,
+            self._get_mirror_user_prompt(diff_text, "", language),
+            target.content,
+            max_content_tokens=settings.fast_prompt_max_content_tokens
+        )
+        user_prompt = self._get_mirror_user_prompt(diff_text, budget.content, language)
+        # Edits are about the size of the diff, far less than a full rewrite
+        max_tokens = min(
+            self.token_budget.count_tokens(diff_text) * 3 + 200,
+            budget.max_output_tokens
+        )
+        try:
+            response = await self._call_openai_api(
+                system_prompt, user_prompt, max_tokens=max_tokens, template="mirror_edit"
+            )
+        except AIServiceError as e:
+            ai_logger.error(f"Failed to derive {language} suggestion for section {target.id}: {str(e)}")
+            return None
+        data = self._try_parse_ai_response(response) if response else None
+        if not data or not data.get('edits'):
+            return None
+        suggested_content = self._apply_mirror_edits(target.content, data['edits'])
+        if not suggested_content or suggested_content == target.content:
+            return None
+        suggestion = UpdateSuggestion(
+            id=self._generate_suggestion_id(),
+            document_id=target.file_path,
+            section_id=target.id,
+            title=f"[{language}] {source.title}",
+            description=source.description,
+            original_content=target.content,
+            suggested_content=suggested_content,
+            suggestion_type=source.suggestion_type,
+            confidence_score=min(source.confidence_score, float(data.get('confidence', source.confidence_score))),
+            created_at=datetime.now(),
+            updated_at=datetime.now(),
+            reasoning=f"Translated from suggestion {source.id} on the English section {source.section_id}",
+            affected_sections=[target.id],
+            related_suggestions=[source.id]
+        )
+        source.related_suggestions.append(suggestion.id)
+        return suggestion
+    
+    def _format_diff_for_prompt(self, hunks: list) -> str:
+        """Render diff hunks as compact unified-diff text."""
+        return self.diff_service.format_unified(hunks)
+    
+    def _get_mirror_system_prompt(self, language: str) -> str:
+        """System prompt for translating an English documentation diff onto a mirror page."""
+        return f"""You keep translated OpenAI Agents SDK documentation in sync with the English original.
+        
+        You get a diff of an English section and the current {language} translation of that section.
+        Apply the equivalent change to the translation: translate added prose into {language}, keep code,
+        identifiers and URLs exactly as in the diff, and do not touch unrelated text.
+        
+        Respond in JSON:
+        {{
+            "edits": [{{"find": "exact text from the translation", "replace": "new text"}}],
+            "confidence": 0.8
+        }}
+        
+        Each "find" must appear verbatim in the translation. Use an empty list if nothing applies."""
+    
+    def _get_mirror_user_prompt(self, diff_text: str, content: str, language: str) -> str:
+        """User prompt with the English diff and the budgeted mirror section content."""
+        return f"""ENGLISH DIFF:
+        {diff_text}
+        
+        CURRENT {language.upper()} SECTION:
+        {content}"""
+    
+    def _apply_mirror_edits(self, content: str, edits: list) -> str | None:
+        """Apply find/replace edits in order; returns None if any edit does not match."""
+        for edit in edits:
+            if not isinstance(edit, dict):
+                return None
+            find = edit.get('find', '')
+            replace = edit.get('replace', '')
+            if not find:
+                # Pure addition; append to the section
+                content = f"{content.rstrip()}\n\n{replace}" if replace else content
+                continue
+            if find not in content:
+                return None
+            content = content.replace(find, replace, 1)
+        return content
+    
     def _quick_analyze_query_context(self, query: str) -> dict[str, Any]:
         """Quick local analysis of query context without API calls for speed."""
         query_lower = query.lower()
@@ -67,15 +242,7 @@ class AIService:
         
         # Quick concept detection
         affected_concepts = []
-        concept_map = {
-            "agent": ["agent", "llm"],
-            "handoff": ["handoff", "delegate", "transfer"],
-            "tool": ["tool", "function", "call"],
-            "guardrail": ["guardrail", "validation", "check"],
-            "runner": ["runner", "execute", "run"]
-        }
-        
-        for concept, keywords in concept_map.items():
+        for concept, keywords in CONCEPT_KEYWORDS.items():
             if any(keyword in query_lower for keyword in keywords):
                 affected_concepts.append(concept)
         
@@ -125,21 +292,29 @@ class AIService:
         """Generate a suggestion for a specific section using the AI model and context."""
         try:
             system_prompt = self._get_specialized_system_prompt(section, change_context)
-            user_prompt = self._get_specialized_user_prompt(query, section, change_context)
-            response = await self._call_openai_api(system_prompt, user_prompt)
-            if not response:
+            budget = self.token_budget.allocate(
+                system_prompt,
+                self._get_specialized_user_prompt(query, section, change_context, ""),
+                section.content
+            )
+            user_prompt = self._get_specialized_user_prompt(
+                query, section, change_context, budget.content, budget.truncated
+            )
+            suggestion_data = await self._call_routed(
+                section, system_prompt, user_prompt, max_tokens=budget.max_output_tokens,
+                template="specialized_suggestion"
+            )
+            if suggestion_data is None:
                 return None
-            suggestion_data = self._parse_ai_response(response)
+            self._record_verdict(query, section, suggestion_data)
             if not suggestion_data.get('should_update', False):
                 return None
             original_content = section.content
-            suggested_content = suggestion_data.get('suggested_content', '')
+            suggested_content = self._restore_trimmed_content(
+                suggestion_data.get('suggested_content', ''), budget
+            )
             if not suggested_content or suggested_content == original_content:
                 return None
-            diff_hunks = self.diff_service.generate_diff_hunks(
-                original_content, 
-                suggested_content
-            )
             suggestion_type = self._determine_suggestion_type(
                 suggestion_data, change_context
             )
@@ -149,7 +324,6 @@ class AIService:
                 section_id=section.id,
                 title=suggestion_data.get('title', f"Update {section.title}"),
                 description=suggestion_data.get('description', ''),
-                diff_hunks=diff_hunks,
                 original_content=original_content,
                 suggested_content=suggested_content,
                 suggestion_type=suggestion_type,
@@ -161,7 +335,7 @@ class AIService:
                 related_suggestions=suggestion_data.get('related_sections', [])
             )
         except AIServiceError as e:
-            print(f"[ERROR] Failed to generate suggestion for section {section.id}: {str(e)}")
+            ai_logger.error(f"Failed to generate suggestion for section {section.id}: {str(e)}")
             return None
     
     def _get_specialized_system_prompt(
@@ -234,9 +408,11 @@ class AIService:
         self, 
         query: str, 
         section: DocumentSection,
-        change_context: dict[str, Any]
+        change_context: dict[str, Any],
+        content: str,
+        truncated: bool = False
     ) -> str:
-        """Generate specialized user prompt for the AI model."""
+        """Generate specialized user prompt for the AI model from budgeted section content."""
         
         prompt = f"""
         UPDATE REQUEST: {query}
@@ -254,12 +430,14 @@ class AIService:
         
         Current Content:
         ```
-        {section.content}
+        {content}
         ```
         
         Based on the update request and change context, should this section be updated?
         If yes, provide the complete updated content maintaining the same format and style.
         """
+        if truncated:
+            prompt += self._get_truncation_note()
         
         return prompt
     
@@ -267,26 +445,36 @@ class AIService:
         self, 
         query: str, 
         section: DocumentSection,
-        change_context: dict[str, Any]
+        change_context: dict[str, Any],
+        section_context: str = ""
     ) -> UpdateSuggestion | None:
         """Fast version of section suggestion generation with optimized prompts."""
         try:
             system_prompt = self._get_fast_system_prompt()
-            user_prompt = self._get_fast_user_prompt(query, section, change_context)
-            response = await self._call_openai_api(system_prompt, user_prompt)
-            if not response:
+            budget = self.token_budget.allocate(
+                system_prompt,
+                self._get_fast_user_prompt(query, section, change_context, "", section_context=section_context),
+                section.content,
+                max_content_tokens=settings.fast_prompt_max_content_tokens
+            )
+            user_prompt = self._get_fast_user_prompt(
+                query, section, change_context, budget.content, budget.truncated, section_context
+            )
+            suggestion_data = await self._call_routed(
+                section, system_prompt, user_prompt, max_tokens=budget.max_output_tokens,
+                template="fast_suggestion"
+            )
+            if suggestion_data is None:
                 return None
-            suggestion_data = self._parse_ai_response(response)
+            self._record_verdict(query, section, suggestion_data)
             if not suggestion_data.get('should_update', False):
                 return None
             original_content = section.content
-            suggested_content = suggestion_data.get('suggested_content', '')
+            suggested_content = self._restore_trimmed_content(
+                suggestion_data.get('suggested_content', ''), budget
+            )
             if not suggested_content or suggested_content == original_content:
                 return None
-            diff_hunks = self.diff_service.generate_diff_hunks(
-                original_content, 
-                suggested_content
-            )
             suggestion_type = self._determine_suggestion_type(
                 suggestion_data, change_context
             )
@@ -296,7 +484,6 @@ class AIService:
                 section_id=section.id,
                 title=suggestion_data.get('title', f"Update {section.title}"),
                 description=suggestion_data.get('description', ''),
-                diff_hunks=diff_hunks,
                 original_content=original_content,
                 suggested_content=suggested_content,
                 suggestion_type=suggestion_type,
@@ -308,7 +495,7 @@ class AIService:
                 related_suggestions=suggestion_data.get('related_sections', [])
             )
         except Exception as e:
-            print(f"[ERROR] Failed to generate fast suggestion for section {section.id}: {str(e)}")
+            ai_logger.error(f"Failed to generate fast suggestion for section {section.id}: {str(e)}")
             return None
     
     def _get_fast_system_prompt(self) -> str:
@@ -333,18 +520,49 @@ class AIService:
         self, 
         query: str, 
         section: DocumentSection,
-        change_context: dict[str, Any]
+        change_context: dict[str, Any],
+        content: str,
+        truncated: bool = False,
+        section_context: str = ""
     ) -> str:
-        """Fast user prompt with minimal context."""
-        return f"""UPDATE: {query}
+        """Fast user prompt with minimal context and budgeted section content.
+        
+        ``section_context`` (heading path and parent summaries) is shown for
+        orientation only; the model rewrites just the section content.
+        """
+        context_block = f"""
+        
+        SURROUNDING CONTEXT (do not rewrite):
+        {section_context}""" if section_context else ""
+        prompt = f"""UPDATE: {query}
         
         SECTION: {section.title}
-        TYPE: {change_context.get('change_type', 'update')}
+        TYPE: {change_context.get('change_type', 'update')}{context_block}
         
         CONTENT:
-        {section.content[:500]}{'...' if len(section.content) > 500 else ''}
+        {content}
         
         Should this be updated? If yes, provide the complete updated content."""
+        if truncated:
+            prompt += self._get_truncation_note()
+        return prompt
+    
+    def _get_truncation_note(self) -> str:
+        """Note appended to prompts when the section was trimmed to fit the token budget."""
+        return (
+            "\n\nNOTE: Only the beginning of this section is shown. Rewrite only the "
+            "content shown; the rest of the section is kept unchanged."
+        )
+    
+    def _restore_trimmed_content(self, suggested_content: str, budget: PromptBudget) -> str:
+        """Re-attach the part of the section that was trimmed out of the prompt.
+
+        The remainder carries the original separator after the kept part, so
+        it is appended verbatim and the untouched tail stays byte-identical.
+        """
+        if not suggested_content or not budget.truncated:
+            return suggested_content
+        return suggested_content.rstrip("\n") + budget.remainder
     
     def _determine_suggestion_type(
         self, 
@@ -362,32 +580,111 @@ class AIService:
         else:
             return SuggestionType.UPDATE
     
-    async def _call_openai_api(self, system_prompt: str, user_prompt: str) -> str | None:
-        """Call OpenAI API with enhanced error handling and timeout. Returns the raw response or None on error."""
+    async def _call_routed(
+        self, 
+        section: DocumentSection,
+        system_prompt: str, 
+        user_prompt: str,
+        max_tokens: int = 1000,
+        template: str = "chat"
+    ) -> dict[str, Any] | None:
+        """Run the prompt on the routed model tiers, escalating until a tier's answer is accepted. Returns the parsed response."""
+        tiers = self.model_router.route(section)
+        suggestion_data = None
+        for index, tier in enumerate(tiers):
+            with track_usage() as usage:
+                try:
+                    response = await self._call_openai_api(
+                        system_prompt, user_prompt, max_tokens=max_tokens, model=tier.model,
+                        template=template
+                    )
+                except AIServiceError:
+                    self.model_router.record(tier, usage, failed=True)
+                    raise
+            parsed = self._try_parse_ai_response(response) if response else None
+            is_last = index == len(tiers) - 1
+            reason = None if is_last else self.model_router.escalation_reason(parsed)
+            self.model_router.record(tier, usage, parse_failed=parsed is None, escalation_reason=reason)
+            if parsed is not None or is_last:
+                suggestion_data = parsed if parsed is not None else (
+                    self._parse_ai_response(response) if response else None
+                )
+            if reason is None:
+                break
+            log_event(ai_logger, "llm_escalation", section_id=section.id, model=tier.model, reason=reason)
+        return suggestion_data
+    
+    async def _call_openai_api(
+        self, 
+        system_prompt: str, 
+        user_prompt: str,
+        max_tokens: int = 1000,
+        model: str | None = None,
+        template: str = "chat"
+    ) -> str | None:
+        """Call OpenAI API through the call policy (timeout, retries, circuit breaker, hedging). Returns the raw response.
+        
+        Every provider request, including retries and hedges, is recorded in
+        telemetry under ``template`` and the current caller.
+        """
+        model = model or settings.openai_model
+        # Reserve the worst case with the scheduler; unused tokens are refunded
+        reserved_tokens = self.token_budget.count_messages(system_prompt, user_prompt) + max_tokens
+        requests = 0
+        
+        async def request() -> str | None:
+            nonlocal requests
+            requests += 1
+            started = time.monotonic()
+            try:
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.1,  # Lower temperature for faster, more focused responses
+                    max_tokens=max_tokens,  # Allocated by the token budget manager
+                    timeout=settings.llm_request_timeout
+                )
+            except asyncio.CancelledError:
+                # Timed out by the call policy, or a hedge that lost the race
+                telemetry.observe_request(
+                    KIND_CHAT, model, template, time.monotonic() - started, outcome=OUTCOME_CANCELLED
+                )
+                raise
+            except Exception as e:
+                telemetry.observe_request(
+                    KIND_CHAT, model, template, time.monotonic() - started, outcome=OUTCOME_ERROR, error=e
+                )
+                raise
+            latency_s = time.monotonic() - started
+            telemetry.observe_request(KIND_CHAT, model, template, latency_s, usage=response.usage)
+            record_usage(model, response.usage, latency_s)
+            if response.usage is not None:
+                self.scheduler.refund(reserved_tokens, response.usage.total_tokens)
+            return response.choices[0].message.content
+        
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",  # Fast model for speed
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.1,  # Lower temperature for faster, more focused responses
-                max_tokens=1000,  # Reduced for faster responses
-                timeout=15  # Reduced timeout for faster responses
+            return await self.call_policy.call(
+                request, admit=lambda: self.scheduler.slot(reserved_tokens)
             )
-            
-            return response.choices[0].message.content
-            
+        except CircuitOpenError:
+            raise
         except Exception as e:
-            print(f"[ERROR] OpenAI API error: {str(e)}")
+            ai_logger.error(f"OpenAI API error ({model}, {template}): {str(e)}")
             # Re-raise the exception to be caught by the router for proper error handling
             raise AIServiceError(f"OpenAI API call failed: {str(e)}")
+        finally:
+            if requests:
+                telemetry.observe_call(KIND_CHAT, model, template, requests)
     
-    def _parse_ai_response(self, response: str) -> dict[str, Any]:
-        """Parse the AI response, extracting JSON and handling errors gracefully."""
+    def _try_parse_ai_response(self, response: str) -> dict[str, Any] | None:
+        """Extract the JSON object from an AI response, or return None if there is none."""
         try:
             # Try direct JSON parsing first
-            return json.loads(response)
+            parsed = json.loads(response)
+            return parsed if isinstance(parsed, dict) else None
         except json.JSONDecodeError:
             # Try to extract JSON from response
             import re
@@ -409,7 +706,12 @@ class AIService:
                     return json.loads(json_match.group())
                 except json.JSONDecodeError:
                     pass
-            
+            return None
+    
+    def _parse_ai_response(self, response: str) -> dict[str, Any]:
+        """Parse the AI response, extracting JSON and handling errors gracefully."""
+        parsed = self._try_parse_ai_response(response)
+        if parsed is None:
             # Return default structure if all parsing fails
             return {
                 "should_update": False,
@@ -421,6 +723,28 @@ class AIService:
                 "impact_level": "low",
                 "related_sections": []
             }
+        return parsed
+    
+    def _record_verdict(
+        self, 
+        query: str, 
+        section: DocumentSection, 
+        suggestion_data: dict[str, Any]
+    ) -> None:
+        """Append the LLM's update verdict to the verdict log used to evaluate the pre-filter."""
+        log_path = settings.prefilter_verdict_log_path
+        if not log_path:
+            return
+        record = {
+            "query": query,
+            "section_id": section.id,
+            "file_path": section.file_path,
+            "title": section.title,
+            "should_update": bool(suggestion_data.get('should_update', False)),
+            "confidence": suggestion_data.get('confidence', 0.0),
+            "recorded_at": datetime.now().isoformat()
+        }
+        line_file_logger(log_path).info(json.dumps(record))
     
     def _generate_suggestion_id(self) -> str:
         """Generate a unique suggestion ID using UUID4."""
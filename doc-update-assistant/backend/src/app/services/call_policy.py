@@ -0,0 +1,289 @@
+# LLM call policy service
+"""Retry, circuit breaker and request hedging policy for LLM provider calls."""
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, AsyncContextManager, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import openai
+
+from ..config import settings
+from ..utils.exceptions import CircuitOpenError
+from ..utils.logger import ai_logger
+
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Whether an error is transient and worth retrying (timeouts, rate limits, 5xx)."""
+    if isinstance(error, (asyncio.TimeoutError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter."""
+
+    def __init__(
+        self,
+        max_attempts: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+    ) -> None:
+        """Initialize the retry policy, falling back to settings."""
+        self.max_attempts = max_attempts or settings.llm_retry_max_attempts
+        self.base_delay = settings.llm_retry_base_delay if base_delay is None else base_delay
+        self.max_delay = settings.llm_retry_max_delay if max_delay is None else max_delay
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Delay before retry number ``attempt`` (1-based): uniform in [0, base * 2^(attempt-1)]."""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """Fails fast while the provider is unhealthy.
+
+    After ``failure_threshold`` consecutive transient failures the circuit
+    opens and calls are rejected for ``recovery_timeout`` seconds. Then a
+    single trial call is let through (half-open): success closes the circuit,
+    failure opens it again.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: Optional[int] = None,
+        recovery_timeout: Optional[float] = None,
+    ) -> None:
+        """Initialize the breaker in the closed state."""
+        self.failure_threshold = failure_threshold or settings.llm_circuit_failure_threshold
+        self.recovery_timeout = (
+            settings.llm_circuit_recovery_timeout if recovery_timeout is None else recovery_timeout
+        )
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError if the call must not reach the provider.
+
+        Returns True if the call is the half-open trial; its caller must then
+        record its outcome, or call ``release_trial`` if it never gets one.
+        """
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                raise CircuitOpenError("LLM provider circuit is open; failing fast")
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                raise CircuitOpenError("LLM provider circuit is half-open; trial call in flight")
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def release_trial(self) -> None:
+        """Give up the half-open trial slot without an outcome, e.g. when the trial was cancelled."""
+        if self.state == self.HALF_OPEN:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        """Record a successful call, closing the circuit."""
+        if self.state != self.CLOSED:
+            ai_logger.info("LLM circuit closed after successful trial call")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record a transient failure, opening the circuit once the threshold is reached."""
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                ai_logger.warning(
+                    f"LLM circuit opened after {self.consecutive_failures} consecutive failures"
+                )
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window: int = 200) -> None:
+        """Initialize an empty window."""
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        """Record a call latency in seconds."""
+        self.samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Return the latency at the given percentile, or None without samples."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(fraction * len(ordered)))
+        return ordered[index]
+
+
+class LLMCallPolicy:
+    """Runs provider calls with timeout, retries, circuit breaking and optional hedging."""
+
+    def __init__(
+        self,
+        retry: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        timeout: Optional[float] = None,
+        hedging_enabled: Optional[bool] = None,
+        hedging_percentile: Optional[float] = None,
+        hedging_min_samples: Optional[int] = None,
+    ) -> None:
+        """Initialize the policy, falling back to settings."""
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.timeout = timeout or settings.llm_request_timeout
+        self.hedging_enabled = (
+            settings.llm_hedging_enabled if hedging_enabled is None else hedging_enabled
+        )
+        self.hedging_percentile = hedging_percentile or settings.llm_hedging_percentile
+        self.hedging_min_samples = hedging_min_samples or settings.llm_hedging_min_samples
+        self.latencies = LatencyTracker()
+        self.stats: Dict[str, int] = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "failures": 0,
+            "short_circuited": 0,
+            "hedges_sent": 0,
+            "hedges_won": 0,
+        }
+
+    async def call(
+        self,
+        request: Callable[[], Awaitable[T]],
+        admit: Optional[Callable[[], AsyncContextManager[Any]]] = None,
+    ) -> T:
+        """Run ``request`` under the policy and return its result.
+
+        ``request`` must create a fresh provider call each time it is invoked
+        so it can be retried and hedged. ``admit``, if given, is entered
+        around every provider request (including retries and hedges), e.g. to
+        wait for a scheduler slot; the timeout starts once it is admitted.
+        """
+        self.stats["calls"] += 1
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                trial = self.breaker.before_call()
+            except CircuitOpenError:
+                self.stats["short_circuited"] += 1
+                raise
+            self.stats["attempts"] += 1
+            try:
+                result = await self._hedged_attempt(request, admit)
+            except asyncio.CancelledError:
+                # A cancelled trial says nothing about the provider; let the next call try
+                if trial:
+                    self.breaker.release_trial()
+                raise
+            except Exception as e:
+                retryable = is_retryable_error(e)
+                if retryable:
+                    self.breaker.record_failure()
+                else:
+                    # The provider answered; a bad request says nothing about its health
+                    self.breaker.record_success()
+                if not retryable or attempt >= self.retry.max_attempts:
+                    self.stats["failures"] += 1
+                    raise
+                delay = self.retry.backoff_delay(attempt)
+                ai_logger.warning(
+                    f"LLM call attempt {attempt} failed ({type(e).__name__}); retrying in {delay:.2f}s"
+                )
+                self.stats["retries"] += 1
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def hedge_delay(self) -> Optional[float]:
+        """Delay after which a duplicate request is sent, or None if hedging is inactive."""
+        if not self.hedging_enabled or len(self.latencies.samples) < self.hedging_min_samples:
+            return None
+        return self.latencies.percentile(self.hedging_percentile)
+
+    async def _timed_request(
+        self,
+        request: Callable[[], Awaitable[T]],
+        admit: Optional[Callable[[], AsyncContextManager[Any]]],
+    ) -> T:
+        """Send one provider request under the timeout, after admission; records its latency."""
+        if admit is None:
+            started = time.monotonic()
+            result = await asyncio.wait_for(request(), self.timeout)
+        else:
+            async with admit():
+                started = time.monotonic()
+                result = await asyncio.wait_for(request(), self.timeout)
+        self.latencies.record(time.monotonic() - started)
+        return result
+
+    async def _hedged_attempt(
+        self,
+        request: Callable[[], Awaitable[T]],
+        admit: Optional[Callable[[], AsyncContextManager[Any]]] = None,
+    ) -> T:
+        """Run one attempt, sending a duplicate if the first is slower than the hedge delay."""
+        primary = asyncio.ensure_future(self._timed_request(request, admit))
+        tasks = [primary]
+        try:
+            delay = self.hedge_delay()
+            if delay is None:
+                return await primary
+
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+
+            self.stats["hedges_sent"] += 1
+            hedge = asyncio.ensure_future(self._timed_request(request, admit))
+            tasks.append(hedge)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.stats["hedges_won"] += 1
+                        return task.result()
+            # Both requests failed; report the primary's error
+            raise primary.exception()
+        finally:
+            # Also reached when the caller is cancelled while waiting
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return call counters, breaker state and latency percentiles."""
+        return {
+            **self.stats,
+            "circuit_state": self.breaker.state,
+            "p50_latency_s": self.latencies.percentile(0.5),
+            "p95_latency_s": self.latencies.percentile(0.95),
+            "hedge_delay_s": self.hedge_delay(),
+        }
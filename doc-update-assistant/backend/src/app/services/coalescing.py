@@ -0,0 +1,185 @@
+# Request coalescing service
+"""Single-flight coalescing of identical concurrent computations."""
+
+import asyncio
+import contextvars
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+from ..config import settings
+from .llm_scheduler import current_priority, highest_priority, priority_scope
+from .telemetry import caller_scope, current_caller
+
+
+T = TypeVar("T")
+
+# Progress callback: (stage name, fraction complete in [0, 1])
+ProgressCallback = Callable[[str, float], None]
+
+# How a caller got its result from SingleFlight.run (None: it started the computation)
+JOINED_IN_FLIGHT = "in_flight"
+JOINED_IN_GRACE = "grace"
+
+# Telemetry caller of a computation shared by different callers
+SHARED_CALLER = "coalesced"
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query used for coalescing keys."""
+    return " ".join(query.casefold().split())
+
+
+@dataclass
+class _Flight:
+    """One in-flight (or recently finished) computation and its waiters."""
+    task: "asyncio.Task[Any]"
+    waiters: int = 0
+    listeners: List[ProgressCallback] = field(default_factory=list)
+    last_progress: Optional[Tuple[str, float]] = None
+    finished_at: Optional[float] = None
+    # Priority and telemetry caller of each attached waiter
+    priorities: List[str] = field(default_factory=list)
+    callers: List[str] = field(default_factory=list)
+
+    def priority(self) -> str:
+        """Most urgent priority among the waiters."""
+        return highest_priority(self.priorities)
+
+    def caller(self) -> str:
+        """The waiters' caller if they all share one, else SHARED_CALLER."""
+        callers = set(self.callers)
+        return callers.pop() if len(callers) == 1 else SHARED_CALLER
+
+
+class SingleFlight(Generic[T]):
+    """Runs at most one computation per key; concurrent callers share its result.
+
+    The computation runs in its own task so a caller going away does not
+    cancel it for the others; it is cancelled only when every waiter has gone.
+    The task starts from an empty context rather than the first caller's: its
+    LLM calls run at the most urgent priority among the callers still
+    waiting and are attributed to their shared caller (or SHARED_CALLER).
+    Successful results stay shared for ``grace_period`` seconds after they
+    finish, so a request that arrives just after completion still attaches.
+    Failures are not shared beyond the callers already waiting.
+    """
+
+    def __init__(self, grace_period: Optional[float] = None) -> None:
+        """Initialize with the post-completion grace window (defaults to settings)."""
+        self.grace_period = settings.coalesce_grace_period if grace_period is None else grace_period
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.leaders = 0
+        self.joined_in_flight = 0
+        self.joined_in_grace = 0
+
+    async def run(
+        self,
+        key: Hashable,
+        factory: Callable[[ProgressCallback], Awaitable[T]],
+        progress: Optional[ProgressCallback] = None,
+    ) -> Tuple[T, Optional[str]]:
+        """Return ``(result, joined)``, starting ``factory`` only if no flight exists for ``key``.
+
+        ``joined`` is None for the caller that started the computation,
+        JOINED_IN_FLIGHT for callers that attached while it ran and
+        JOINED_IN_GRACE for callers that got an already finished result.
+        ``factory`` receives a progress callback that fans out to every
+        attached caller's ``progress``.
+        """
+        flight = self._flights.get(key)
+        if flight is not None and flight.finished_at is not None:
+            task = flight.task
+            if task.done() and (task.cancelled() or task.exception() is not None or (
+                time.monotonic() - flight.finished_at > self.grace_period
+            )):
+                self._flights.pop(key, None)
+                flight = None
+
+        joined: Optional[str] = None
+        if flight is None:
+            flight = self._start(key, factory)
+            self.leaders += 1
+        elif flight.finished_at is not None:
+            joined = JOINED_IN_GRACE
+            self.joined_in_grace += 1
+        else:
+            joined = JOINED_IN_FLIGHT
+            self.joined_in_flight += 1
+
+        if progress:
+            flight.listeners.append(progress)
+            if flight.last_progress is not None:
+                progress(*flight.last_progress)
+
+        flight.waiters += 1
+        priority, caller = current_priority(), current_caller()
+        flight.priorities.append(priority)
+        flight.callers.append(caller)
+        try:
+            return await asyncio.shield(flight.task), joined
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                # The last caller left; nobody needs the result any more
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+            flight.priorities.remove(priority)
+            flight.callers.remove(caller)
+            if progress and progress in flight.listeners:
+                flight.listeners.remove(progress)
+
+    def _start(self, key: Hashable, factory: Callable[[ProgressCallback], Awaitable[T]]) -> _Flight:
+        """Create the task for a new flight and register it under ``key``."""
+        flight: Optional[_Flight] = None
+
+        def fan_out(stage: str, fraction: float) -> None:
+            flight.last_progress = (stage, fraction)
+            for listener in list(flight.listeners):
+                listener(stage, fraction)
+
+        async def execute() -> T:
+            try:
+                with priority_scope(flight.priority), caller_scope(flight.caller):
+                    return await factory(fan_out)
+            finally:
+                self._finish(key, flight)
+
+        # A fresh context, so the first caller's priority, caller and usage scopes do not leak in
+        task = asyncio.get_running_loop().create_task(execute(), context=contextvars.Context())
+        flight = _Flight(task=task)
+        self._flights[key] = flight
+        return flight
+
+    def _finish(self, key: Hashable, flight: _Flight) -> None:
+        """Mark a flight done and schedule its removal after the grace window."""
+        flight.finished_at = time.monotonic()
+
+        def expire() -> None:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+        if self.grace_period > 0:
+            asyncio.get_running_loop().call_later(self.grace_period, expire)
+        else:
+            expire()
+
+    def in_flight_for(self, key: Hashable) -> Optional["asyncio.Task[Any]"]:
+        """The running computation for ``key``, or None if there is none."""
+        flight = self._flights.get(key)
+        return flight.task if flight is not None and flight.finished_at is None else None
+
+    def in_flight(self) -> int:
+        """Number of computations currently running."""
+        return sum(1 for flight in self._flights.values() if flight.finished_at is None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Coalescing counters."""
+        return {
+            "in_flight": self.in_flight(),
+            "leaders": self.leaders,
+            "joined_in_flight": self.joined_in_flight,
+            "joined_in_grace": self.joined_in_grace,
+            "grace_period_s": self.grace_period,
+        }
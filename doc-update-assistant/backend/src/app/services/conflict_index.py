@@ -0,0 +1,459 @@
+# Conflict index service
+"""Interval index over the line ranges changed by pending suggestions, for overlap detection."""
+
+import random
+from collections.abc import MutableMapping
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from ..models.suggestion import ContentEdit, DiffHunk, DiffLineOp, SuggestionStatus, UpdateSuggestion
+from ..utils.content_store import content_store
+
+if TYPE_CHECKING:
+    from .suggestion_index import SuggestionIndex
+
+
+@dataclass
+class ChangeRange:
+    """Original lines one block of a suggestion changes, in document line numbers.
+
+    Positions are kept doubled so insertions can sit between lines: line
+    ``k`` is ``2k`` and the gap before it is ``2k - 1``. Two ranges overlap
+    when they touch the same line or insert into the same gap; an insertion
+    next to an edited line does not overlap it.
+    """
+    suggestion_id: str
+    section_id: str
+    low: int
+    high: int
+
+    @property
+    def start_line(self) -> int:
+        """First changed line (for an insertion, the line it is inserted before)."""
+        return (self.low + 1) // 2
+
+    @property
+    def end_line(self) -> int:
+        """Last changed line; ``start_line - 1`` for a pure insertion."""
+        return self.high // 2
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON form with plain line numbers."""
+        return {
+            "suggestion_id": self.suggestion_id,
+            "section_id": self.section_id,
+            "start_line": self.start_line,
+            "end_line": self.end_line,
+            "kind": "insert" if self.low % 2 else "change",
+        }
+
+
+class _Node:
+    """Treap node holding one interval and the largest end in its subtree."""
+    __slots__ = ("low", "high", "key", "priority", "max_high", "left", "right")
+
+    def __init__(self, low: int, high: int, key: Hashable) -> None:
+        self.low = low
+        self.high = high
+        self.key = key
+        self.priority = random.random()
+        self.max_high = high
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+
+    def update(self) -> None:
+        """Recompute the subtree maximum from the children."""
+        self.max_high = max(
+            self.high,
+            self.left.max_high if self.left else self.high,
+            self.right.max_high if self.right else self.high,
+        )
+
+
+class IntervalTree:
+    """Closed integer intervals keyed by unique ids, in a treap ordered by start.
+
+    Each node carries the largest end in its subtree, so an overlap query
+    skips every subtree that ends before the query starts and every right
+    subtree that starts after it ends: expected O(log n) to reach the first
+    match plus O(log n) per reported interval. Inserts and removals are
+    expected O(log n).
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty tree."""
+        self.root: Optional[_Node] = None
+        self.intervals: Dict[Hashable, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        """Number of intervals."""
+        return len(self.intervals)
+
+    def insert(self, key: Hashable, low: int, high: int) -> None:
+        """Add an interval, replacing any earlier one with the same key."""
+        if key in self.intervals:
+            self.remove(key)
+        self.intervals[key] = (low, high)
+        self.root = self._insert(self.root, _Node(low, high, key))
+
+    def _insert(self, node: Optional[_Node], new: _Node) -> _Node:
+        if node is None:
+            return new
+        if (new.low, new.key) < (node.low, node.key):
+            node.left = self._insert(node.left, new)
+            if node.left.priority > node.priority:
+                node = self._rotate_right(node)
+        else:
+            node.right = self._insert(node.right, new)
+            if node.right.priority > node.priority:
+                node = self._rotate_left(node)
+        node.update()
+        return node
+
+    def remove(self, key: Hashable) -> bool:
+        """Remove an interval by key; False if it was not present."""
+        interval = self.intervals.pop(key, None)
+        if interval is None:
+            return False
+        self.root = self._remove(self.root, interval[0], key)
+        return True
+
+    def _remove(self, node: Optional[_Node], low: int, key: Hashable) -> Optional[_Node]:
+        if node is None:
+            return None
+        if node.key == key:
+            if node.left is None:
+                return node.right
+            if node.right is None:
+                return node.left
+            # Rotate the higher-priority child up and keep sinking the node
+            if node.left.priority > node.right.priority:
+                node = self._rotate_right(node)
+                node.right = self._remove(node.right, low, key)
+            else:
+                node = self._rotate_left(node)
+                node.left = self._remove(node.left, low, key)
+        elif (low, key) < (node.low, node.key):
+            node.left = self._remove(node.left, low, key)
+        else:
+            node.right = self._remove(node.right, low, key)
+        node.update()
+        return node
+
+    @staticmethod
+    def _rotate_right(node: _Node) -> _Node:
+        pivot = node.left
+        node.left = pivot.right
+        pivot.right = node
+        node.update()
+        pivot.update()
+        return pivot
+
+    @staticmethod
+    def _rotate_left(node: _Node) -> _Node:
+        pivot = node.right
+        node.right = pivot.left
+        pivot.left = node
+        node.update()
+        pivot.update()
+        return pivot
+
+    def overlapping(self, low: int, high: int) -> List[Tuple[Hashable, int, int]]:
+        """(key, low, high) of every interval intersecting ``[low, high]``, by start."""
+        found = []
+        stack: List[Tuple[_Node, bool]] = [(self.root, False)] if self.root else []
+        while stack:
+            node, visited = stack.pop()
+            if visited:
+                if node.high >= low:
+                    found.append((node.key, node.low, node.high))
+                if node.right is not None and node.low <= high:
+                    stack.append((node.right, False))
+                continue
+            if node.max_high < low:
+                continue
+            stack.append((node, True))
+            if node.left is not None:
+                stack.append((node.left, False))
+        return [item for item in found if item[1] <= high]
+
+    def items(self) -> List[Tuple[Hashable, int, int]]:
+        """All intervals ordered by start."""
+        return sorted(((key, low, high) for key, (low, high) in self.intervals.items()), key=lambda item: item[1])
+
+
+def change_ranges(hunks: List[DiffHunk]) -> List[Tuple[int, int]]:
+    """Doubled (low, high) original-line ranges of the change blocks in a list of hunks (see ChangeRange)."""
+    ranges = []
+    for hunk in hunks:
+        line = hunk.old_start if hunk.old_count else hunk.old_start + 1  # Next original line
+        first_deleted = last_deleted = insert_at = None
+        # A trailing context op closes the last block
+        for op in [*hunk.line_ops, DiffLineOp.CONTEXT]:
+            if op == DiffLineOp.DELETE:
+                first_deleted = line if first_deleted is None else first_deleted
+                last_deleted = line
+                line += 1
+            elif op == DiffLineOp.ADD:
+                insert_at = line if insert_at is None else insert_at
+            else:
+                if first_deleted is not None:
+                    ranges.append((2 * first_deleted, 2 * last_deleted))
+                elif insert_at is not None:
+                    ranges.append((2 * insert_at - 1, 2 * insert_at - 1))
+                first_deleted = last_deleted = insert_at = None
+                line += 1
+    return ranges
+
+
+def edit_ranges(original: str, edit: ContentEdit) -> List[Tuple[int, int]]:
+    """Doubled (low, high) original-line range changed by a line-aligned edit (see ChangeRange).
+
+    The edit is one block, so changes a diff would split into several
+    blocks come out as one range spanning them; whole lines the edit
+    leaves equal at either end are trimmed. No diff is computed.
+    """
+    def lines(text: str) -> List[str]:
+        return text[:-1].split("\n") if text.endswith("\n") else (text.split("\n") if text else [])
+
+    old, new = lines(original[edit.start:edit.end]), lines(edit.text)
+    lead = 0
+    while lead < min(len(old), len(new)) and old[lead] == new[lead]:
+        lead += 1
+    trail = 0
+    while trail < min(len(old), len(new)) - lead and old[-1 - trail] == new[-1 - trail]:
+        trail += 1
+    first = original.count("\n", 0, edit.start) + 1 + lead
+    if len(old) - trail > lead:
+        return [(2 * first, 2 * (first + len(old) - trail - lead - 1))]
+    if len(new) - trail > lead:
+        return [(2 * first - 1, 2 * first - 1)]
+    return []
+
+
+class ConflictIndex:
+    """Per-document interval trees over the change blocks of pending suggestions.
+
+    Ranges come from a suggestion's stored edit (see ``edit_ranges``), so
+    indexing never computes a diff. They are offset by the section's first
+    line so suggestions on different sections of a page share one tree,
+    and re-placed when a section update moves the sections after it.
+    Suggestions whose section is unknown get a tree of their own section.
+    Only pending suggestions are indexed; ``update`` drops a suggestion
+    once it is approved, rejected, merged or superseded.
+    """
+
+    def __init__(self, doc_processor: Any = None) -> None:
+        """Initialize an empty index, resolving sections through ``doc_processor`` when bound."""
+        self.doc_processor = doc_processor
+        self.trees: Dict[str, IntervalTree] = {}
+        self.entries: Dict[str, Tuple[str, List[ChangeRange]]] = {}  # suggestion id -> (tree key, ranges)
+        self.offsets: Dict[str, int] = {}  # suggestion id -> line offset its ranges were placed at
+
+    def bind(self, doc_processor: Any) -> None:
+        """Resolve section offsets through a document processor and follow its section updates."""
+        self.doc_processor = doc_processor
+        if self.section_updated not in doc_processor.section_listeners:
+            doc_processor.section_listeners.append(self.section_updated)
+
+    def section_updated(self, section: Any) -> None:
+        """Re-place the ranges in a section's document whose section moved."""
+        tree = self.trees.get(section.file_path)
+        if tree is None:
+            return
+        section_offsets: Dict[str, Optional[int]] = {}
+        for suggestion_id in {suggestion_id for suggestion_id, _ in tree.intervals}:
+            section_id = self.entries[suggestion_id][1][0].section_id
+            if section_id not in section_offsets:
+                placed = self.doc_processor.get_section_by_id(section_id)
+                section_offsets[section_id] = self.doc_processor.section_line_offset(placed) if placed else None
+            offset = section_offsets[section_id]
+            if offset is None:
+                continue
+            shift = 2 * (offset - self.offsets[suggestion_id])
+            if not shift:
+                continue
+            for index, change in enumerate(self.entries[suggestion_id][1]):
+                change.low += shift
+                change.high += shift
+                tree.insert((suggestion_id, index), change.low, change.high)
+            self.offsets[suggestion_id] = offset
+
+    def _placement(self, suggestion: UpdateSuggestion) -> Tuple[str, int]:
+        """Tree key and line offset for a suggestion's section."""
+        section = self.doc_processor.get_section_by_id(suggestion.section_id) if self.doc_processor else None
+        if section is None:
+            return f"{suggestion.document_id}#{suggestion.section_id}", 0
+        return suggestion.document_id, self.doc_processor.section_line_offset(section)
+
+    def update(self, suggestion: UpdateSuggestion) -> None:
+        """Index a suggestion if it is pending, otherwise drop it."""
+        self.remove(suggestion.id)
+        if suggestion.status != SuggestionStatus.PENDING:
+            return
+        tree_key, offset = self._placement(suggestion)
+        ranges = [
+            ChangeRange(suggestion.id, suggestion.section_id, low + 2 * offset, high + 2 * offset)
+            for low, high in edit_ranges(suggestion.original_content, suggestion.suggested_edit)
+        ]
+        tree = self.trees.setdefault(tree_key, IntervalTree())
+        for index, change in enumerate(ranges):
+            tree.insert((suggestion.id, index), change.low, change.high)
+        self.entries[suggestion.id] = (tree_key, ranges)
+        self.offsets[suggestion.id] = offset
+
+    def remove(self, suggestion_id: str) -> None:
+        """Drop a suggestion's ranges."""
+        entry = self.entries.pop(suggestion_id, None)
+        self.offsets.pop(suggestion_id, None)
+        if entry is None:
+            return
+        tree_key, ranges = entry
+        tree = self.trees[tree_key]
+        for index in range(len(ranges)):
+            tree.remove((suggestion_id, index))
+        if not len(tree):
+            del self.trees[tree_key]
+
+    def clear(self) -> None:
+        """Drop every indexed suggestion."""
+        self.trees.clear()
+        self.entries.clear()
+        self.offsets.clear()
+
+    def ranges_of(self, suggestion_id: str) -> List[ChangeRange]:
+        """Indexed change ranges of a suggestion."""
+        entry = self.entries.get(suggestion_id)
+        return list(entry[1]) if entry else []
+
+    def conflicts_for(self, suggestion_id: str) -> Dict[str, List[ChangeRange]]:
+        """Other pending suggestions overlapping this one, with their overlapping ranges."""
+        entry = self.entries.get(suggestion_id)
+        if entry is None:
+            return {}
+        tree_key, ranges = entry
+        conflicts: Dict[str, List[ChangeRange]] = {}
+        for change in ranges:
+            for (other_id, index), _, _ in self.trees[tree_key].overlapping(change.low, change.high):
+                if other_id == suggestion_id:
+                    continue
+                other = self.entries[other_id][1][index]
+                if other not in conflicts.setdefault(other_id, []):
+                    conflicts[other_id].append(other)
+        return conflicts
+
+    def conflict_groups(self, document_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Sets of pending suggestions linked by overlapping ranges, per document.
+
+        One sweep over each tree's intervals in start order joins a range
+        to the group of every earlier range it still overlaps.
+        """
+        groups = []
+        for tree_key, tree in self.trees.items():
+            key_document = tree_key.split("#", 1)[0]
+            if document_id is not None and key_document != document_id:
+                continue
+            parent: Dict[str, str] = {}
+
+            def find(item: str) -> str:
+                while parent.setdefault(item, item) != item:
+                    parent[item] = parent[parent[item]]
+                    item = parent[item]
+                return item
+
+            reach, reach_owner = None, None
+            for (suggestion_id, _), low, high in tree.items():
+                find(suggestion_id)
+                if reach is not None and low <= reach:
+                    parent[find(suggestion_id)] = find(reach_owner)
+                if reach is None or high > reach:
+                    reach, reach_owner = high, suggestion_id
+            members: Dict[str, List[str]] = {}
+            for suggestion_id in parent:
+                members.setdefault(find(suggestion_id), []).append(suggestion_id)
+            for ids in members.values():
+                if len(ids) > 1:
+                    groups.append({
+                        "document_id": key_document,
+                        "suggestion_ids": sorted(ids),
+                        "ranges": [
+                            change.to_dict() for suggestion_id in sorted(ids)
+                            for change in self.entries[suggestion_id][1]
+                        ],
+                    })
+        return groups
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index size."""
+        return {
+            "documents": len(self.trees),
+            "pending_suggestions": len(self.entries),
+            "ranges": sum(len(tree) for tree in self.trees.values()),
+        }
+
+
+class IndexedSuggestionStore(MutableMapping):
+    """Suggestion mapping that keeps a ConflictIndex, and optionally a SuggestionIndex, in step with every write.
+
+    Routes and services update a suggestion's status and then store it
+    again, so re-indexing on assignment is enough to track pending state.
+    Suggestions live in ``data``, a plain dict until ``attach`` switches to a
+    durable repository. Every stored suggestion holds a content store
+    reference on its original content, so deleted suggestions' content can
+    be evicted.
+    """
+
+    def __init__(self, index: ConflictIndex, listing: Optional["SuggestionIndex"] = None) -> None:
+        """Initialize an empty store feeding ``index`` and ``listing``."""
+        self.index = index
+        self.listing = listing
+        self.data: MutableMapping = {}
+
+    def attach(self, data: MutableMapping) -> None:
+        """Keep suggestions in ``data`` from now on, copying over any held so far."""
+        previous = list(self.data.values())
+        for suggestion_id, suggestion in self.data.items():
+            data[suggestion_id] = suggestion
+        self.data = data
+        for suggestion in data.values():
+            content_store.retain(suggestion.original_hash)
+        for suggestion in previous:
+            content_store.release(suggestion.original_hash)
+        if self.listing is not None:
+            self.listing.clear()
+            for suggestion in data.values():
+                self.listing.update(suggestion)
+        self.reindex()
+
+    def reindex(self) -> None:
+        """Rebuild the conflict index from every stored suggestion (e.g. once sections are loaded)."""
+        self.index.clear()
+        for suggestion in self.data.values():
+            self.index.update(suggestion)
+
+    def __getitem__(self, suggestion_id: str) -> UpdateSuggestion:
+        return self.data[suggestion_id]
+
+    def __setitem__(self, suggestion_id: str, suggestion: UpdateSuggestion) -> None:
+        previous = self.data.get(suggestion_id)
+        self.data[suggestion_id] = suggestion
+        content_store.retain(suggestion.original_hash)
+        if previous is not None:
+            content_store.release(previous.original_hash)
+        self.index.update(suggestion)
+        if self.listing is not None:
+            self.listing.update(suggestion)
+
+    def __delitem__(self, suggestion_id: str) -> None:
+        suggestion = self.data[suggestion_id]
+        del self.data[suggestion_id]
+        content_store.release(suggestion.original_hash)
+        self.index.remove(suggestion_id)
+        if self.listing is not None:
+            self.listing.remove(suggestion_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
@@ -0,0 +1,351 @@
+# Diff engine
+"""Line and intra-line diff algorithms: Myers (linear space), patience and histogram."""
+
+import re
+from bisect import bisect_left
+from difflib import SequenceMatcher
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+
+# (tag, i1, i2, j1, j2) with difflib's tags: equal, replace, delete, insert
+Opcode = Tuple[str, int, int, int, int]
+# (start in a, start in b, length) of a run of equal elements
+Block = Tuple[int, int, int]
+# Region still to diff: a[a_lo:a_hi] against b[b_lo:b_hi]
+Region = Tuple[int, int, int, int]
+
+DIFF_ALGORITHMS = ("myers", "patience", "histogram", "difflib")
+
+# Edit cost after which the middle snake search settles for the furthest-reaching
+# diagonal instead of the exact split (GNU diff's "too expensive" heuristic)
+MYERS_MAX_COST = 256
+
+# Histogram diff falls back to Myers for regions whose rarest line is this common
+HISTOGRAM_MAX_OCCURRENCES = 64
+
+_WORD_TOKEN = re.compile(r"\w+|\s+|[^\w\s]")
+
+
+def _intern(a: Sequence[Hashable], b: Sequence[Hashable]) -> Tuple[List[int], List[int]]:
+    """Map elements to small ints so comparisons are cheap."""
+    ids: Dict[Hashable, int] = {}
+    a_ids = [ids.setdefault(item, len(ids)) for item in a]
+    b_ids = [ids.setdefault(item, len(ids)) for item in b]
+    return a_ids, b_ids
+
+
+def _trim(a: List[int], b: List[int], region: Region, blocks: List[Block]) -> Region:
+    """Strip a region's common prefix and suffix, recording them as matches."""
+    a_lo, a_hi, b_lo, b_hi = region
+    start = a_lo
+    while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+        a_lo += 1
+        b_lo += 1
+    if a_lo > start:
+        blocks.append((start, b_lo - (a_lo - start), a_lo - start))
+    end = a_hi
+    while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+        a_hi -= 1
+        b_hi -= 1
+    if a_hi < end:
+        blocks.append((a_hi, b_hi, end - a_hi))
+    return a_lo, a_hi, b_lo, b_hi
+
+
+def _middle_snake(a: List[int], b: List[int], region: Region) -> Tuple[int, int, int, int]:
+    """Myers' middle snake of a region with no common prefix or suffix, as (x1, y1, x2, y2).
+
+    Searches forward from the start and backward from the end at the same
+    time, keeping only two diagonal arrays, until the paths overlap. Past
+    ``MYERS_MAX_COST`` edits it splits at the furthest forward point instead,
+    so the script stays valid but may no longer be minimal.
+    """
+    a_lo, a_hi, b_lo, b_hi = region
+    n, m = a_hi - a_lo, b_hi - b_lo
+    delta = n - m
+    odd = delta % 2 == 1
+    max_d = (n + m + 1) // 2
+    offset = max_d + 1
+    forward = [0] * (2 * offset + 1)
+    backward = [0] * (2 * offset + 1)
+    for d in range(max_d + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            x_start, y_start = x, y
+            while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            reverse_k = delta - k
+            if odd and -(d - 1) <= reverse_k <= d - 1 and x + backward[offset + reverse_k] >= n:
+                return a_lo + x_start, b_lo + y_start, a_lo + x, b_lo + y
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            x_start, y_start = x, y
+            while x < n and y < m and a[a_hi - 1 - x] == b[b_hi - 1 - y]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            forward_k = delta - k
+            if not odd and -d <= forward_k <= d and x + forward[offset + forward_k] >= n:
+                return a_hi - x, b_hi - y, a_hi - x_start, b_hi - y_start
+        if d >= MYERS_MAX_COST:
+            best_x, best_y = max(
+                ((forward[offset + k], forward[offset + k] - k) for k in range(-d, d + 1, 2)),
+                key=lambda point: (point[0] + point[1], point[0]),
+            )
+            if (best_x, best_y) != (n, m):
+                return a_lo + best_x, b_lo + best_y, a_lo + best_x, b_lo + best_y
+    raise AssertionError("middle snake not found")
+
+
+def _myers(a: List[int], b: List[int], region: Region, blocks: List[Block]) -> None:
+    """Minimal edit script by Myers' linear-space divide and conquer.
+
+    Lines that occur only on one side can never match, so they are dropped
+    before the search (as GNU diff does); this keeps the edit distance the
+    search has to cover small when a change introduces new text.
+    """
+    a_lo, a_hi, b_lo, b_hi = _trim(a, b, region, blocks)
+    if a_lo == a_hi or b_lo == b_hi:
+        return
+    in_a, in_b = set(a[a_lo:a_hi]), set(b[b_lo:b_hi])
+    a_keep = [i for i in range(a_lo, a_hi) if a[i] in in_b]
+    b_keep = [j for j in range(b_lo, b_hi) if b[j] in in_a]
+    if len(a_keep) == a_hi - a_lo and len(b_keep) == b_hi - b_lo:
+        _myers_search(a, b, (a_lo, a_hi, b_lo, b_hi), blocks)
+        return
+    sub_blocks: List[Block] = []
+    _myers_search([a[i] for i in a_keep], [b[j] for j in b_keep], (0, len(a_keep), 0, len(b_keep)), sub_blocks)
+    for i, j, length in sub_blocks:
+        blocks.extend((a_keep[i + k], b_keep[j + k], 1) for k in range(length))
+
+
+def _myers_search(a: List[int], b: List[int], region: Region, blocks: List[Block]) -> None:
+    """Myers' divide and conquer over middle snakes."""
+    stack = [region]
+    while stack:
+        a_lo, a_hi, b_lo, b_hi = _trim(a, b, stack.pop(), blocks)
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+        x1, y1, x2, y2 = _middle_snake(a, b, (a_lo, a_hi, b_lo, b_hi))
+        if x2 > x1:
+            blocks.append((x1, y1, x2 - x1))
+        stack.append((a_lo, x1, b_lo, y1))
+        stack.append((x2, a_hi, y2, b_hi))
+
+
+def _unique_anchors(a: List[int], b: List[int], region: Region) -> List[Tuple[int, int]]:
+    """Longest increasing run of lines that occur exactly once on each side (patience sorting)."""
+    a_lo, a_hi, b_lo, b_hi = region
+    counts: Dict[int, List[int]] = {}
+    for i in range(a_lo, a_hi):
+        entry = counts.setdefault(a[i], [0, i, 0, 0])
+        entry[0] += 1
+    for j in range(b_lo, b_hi):
+        entry = counts.get(b[j])
+        if entry is not None:
+            entry[2] += 1
+            entry[3] = j
+    pairs = sorted((i, j) for count_a, i, count_b, j in counts.values() if count_a == 1 and count_b == 1)
+    if not pairs:
+        return []
+    # Patience sort on the b positions, keeping back-pointers to rebuild the sequence
+    tops: List[int] = []
+    top_index: List[int] = []
+    previous: List[int] = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        pile = bisect_left(tops, j)
+        if pile == len(tops):
+            tops.append(j)
+            top_index.append(index)
+        else:
+            tops[pile] = j
+            top_index[pile] = index
+        previous[index] = top_index[pile - 1] if pile > 0 else -1
+    anchors = []
+    index = top_index[-1]
+    while index >= 0:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _patience(a: List[int], b: List[int], region: Region, blocks: List[Block]) -> None:
+    """Patience diff: align on unique common lines, recurse between them, Myers where there are none."""
+    stack = [region]
+    while stack:
+        region = _trim(a, b, stack.pop(), blocks)
+        a_lo, a_hi, b_lo, b_hi = region
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+        anchors = _unique_anchors(a, b, region)
+        if not anchors:
+            _myers(a, b, region, blocks)
+            continue
+        i, j = a_lo, b_lo
+        for anchor_i, anchor_j in anchors:
+            stack.append((i, anchor_i, j, anchor_j))
+            blocks.append((anchor_i, anchor_j, 1))
+            i, j = anchor_i + 1, anchor_j + 1
+        stack.append((i, a_hi, j, b_hi))
+
+
+def _histogram(a: List[int], b: List[int], region: Region, blocks: List[Block]) -> None:
+    """Histogram diff: split on the longest match around the least frequent common line."""
+    stack = [region]
+    while stack:
+        region = _trim(a, b, stack.pop(), blocks)
+        a_lo, a_hi, b_lo, b_hi = region
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+        occurrences: Dict[int, List[int]] = {}
+        for i in range(a_lo, a_hi):
+            occurrences.setdefault(a[i], []).append(i)
+
+        best = None  # (occurrences, -length, a start, b start, length)
+        j = b_lo
+        while j < b_hi:
+            positions = occurrences.get(b[j])
+            if not positions or len(positions) > HISTOGRAM_MAX_OCCURRENCES or (
+                best is not None and len(positions) > best[0]
+            ):
+                j += 1
+                continue
+            next_j = j + 1
+            for i in positions:
+                start_i, start_j = i, j
+                while start_i > a_lo and start_j > b_lo and a[start_i - 1] == b[start_j - 1]:
+                    start_i -= 1
+                    start_j -= 1
+                end_i, end_j = i + 1, j + 1
+                while end_i < a_hi and end_j < b_hi and a[end_i] == b[end_j]:
+                    end_i += 1
+                    end_j += 1
+                candidate = (len(positions), -(end_i - start_i), start_i, start_j, end_i - start_i)
+                if best is None or candidate < best:
+                    best = candidate
+                next_j = max(next_j, end_j)
+            # Lines inside the match just found cannot start a better one
+            j = next_j
+
+        if best is None:
+            _myers(a, b, region, blocks)
+            continue
+        _, _, start_i, start_j, length = best
+        blocks.append((start_i, start_j, length))
+        stack.append((a_lo, start_i, b_lo, start_j))
+        stack.append((start_i + length, a_hi, start_j + length, b_hi))
+
+
+def _opcodes_from_blocks(blocks: List[Block], n: int, m: int) -> List[Opcode]:
+    """difflib-style opcodes from disjoint matching blocks."""
+    opcodes: List[Opcode] = []
+    i = j = 0
+    merged: List[List[int]] = []
+    for start_i, start_j, length in sorted(blocks):
+        if length <= 0:
+            continue
+        if merged and merged[-1][0] + merged[-1][2] == start_i and merged[-1][1] + merged[-1][2] == start_j:
+            merged[-1][2] += length
+        else:
+            merged.append([start_i, start_j, length])
+    for start_i, start_j, length in merged + [[n, m, 0]]:
+        if i < start_i and j < start_j:
+            opcodes.append(("replace", i, start_i, j, start_j))
+        elif i < start_i:
+            opcodes.append(("delete", i, start_i, j, j))
+        elif j < start_j:
+            opcodes.append(("insert", i, i, j, start_j))
+        if length:
+            opcodes.append(("equal", start_i, start_i + length, start_j, start_j + length))
+        i, j = start_i + length, start_j + length
+    return opcodes
+
+
+def diff_opcodes(a: Sequence[Hashable], b: Sequence[Hashable], algorithm: str = "histogram") -> List[Opcode]:
+    """Opcodes turning ``a`` into ``b`` using the chosen algorithm."""
+    if algorithm == "difflib":
+        return SequenceMatcher(None, a, b, autojunk=False).get_opcodes()
+    engines = {"myers": _myers, "patience": _patience, "histogram": _histogram}
+    if algorithm not in engines:
+        raise ValueError(f"Unknown diff algorithm: {algorithm} (expected one of {', '.join(DIFF_ALGORITHMS)})")
+    a_ids, b_ids = _intern(a, b)
+    blocks: List[Block] = []
+    engines[algorithm](a_ids, b_ids, (0, len(a_ids), 0, len(b_ids)), blocks)
+    return _opcodes_from_blocks(blocks, len(a_ids), len(b_ids))
+
+
+def group_opcodes(opcodes: List[Opcode], context: int = 3) -> List[List[Opcode]]:
+    """Split opcodes into hunks with up to ``context`` equal lines around each change."""
+    if not any(tag != "equal" for tag, *_ in opcodes):
+        return []
+    codes = list(opcodes)
+    tag, i1, i2, j1, j2 = codes[0]
+    if tag == "equal":
+        codes[0] = (tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2)
+    tag, i1, i2, j1, j2 = codes[-1]
+    if tag == "equal":
+        codes[-1] = (tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context))
+    groups: List[List[Opcode]] = []
+    group: List[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        # An equal run longer than two contexts ends one hunk and starts the next
+        if tag == "equal" and i2 - i1 > 2 * context:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            groups.append(group)
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        groups.append(group)
+    return groups
+
+
+def tokenize(text: str, granularity: str = "word") -> List[str]:
+    """Split a line into words, whitespace runs and punctuation, or into characters."""
+    if granularity == "char":
+        return list(text)
+    return _WORD_TOKEN.findall(text)
+
+
+def inline_diff(
+    old: str,
+    new: str,
+    granularity: str = "word",
+    algorithm: str = "myers",
+) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    """Intra-line segments for a changed line pair: (old side, new side) of ``{"op", "text"}``.
+
+    ``op`` is ``equal`` on both sides, ``delete`` on the old side and
+    ``insert`` on the new side; adjacent segments with the same op are merged.
+    """
+    old_tokens, new_tokens = tokenize(old, granularity), tokenize(new, granularity)
+    old_segments: List[Dict[str, str]] = []
+    new_segments: List[Dict[str, str]] = []
+
+    def push(segments: List[Dict[str, str]], op: str, text: str) -> None:
+        if not text:
+            return
+        if segments and segments[-1]["op"] == op:
+            segments[-1]["text"] += text
+        else:
+            segments.append({"op": op, "text": text})
+
+    for tag, i1, i2, j1, j2 in diff_opcodes(old_tokens, new_tokens, algorithm):
+        if tag == "equal":
+            push(old_segments, "equal", "".join(old_tokens[i1:i2]))
+            push(new_segments, "equal", "".join(new_tokens[j1:j2]))
+        else:
+            push(old_segments, "delete", "".join(old_tokens[i1:i2]))
+            push(new_segments, "insert", "".join(new_tokens[j1:j2]))
+    return old_segments, new_segments
@@ -1,97 +1,542 @@
 # Diff service
 """Diff service for generating GitHub-style diffs."""
 
-import difflib
-import re
-from typing import Dict, List
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
 
-from ..models.suggestion import DiffHunk
+from ..config import settings
+from ..models.suggestion import DiffHunk, DiffLineOp, DiffStats
+from ..utils.exceptions import PatchConflictError
+from ..utils.helpers import generate_hash
+from .diff_engine import diff_opcodes, group_opcodes, inline_diff
+
+if TYPE_CHECKING:
+    from ..models.suggestion import UpdateSuggestion
+
+
+# Unified-diff line after a side's last line when it has no trailing newline
+NO_NEWLINE_MARKER = "\\ No newline at end of file"
+
+
+@dataclass
+class AppliedHunk:
+    """Where a hunk applied: 1-based line, offset from its header and context lines dropped."""
+    index: int
+    line: int
+    offset: int
+    fuzz: int
+
+
+@dataclass
+class HunkConflict:
+    """A hunk whose context could not be found in the content."""
+    index: int
+    expected_line: int
+    reason: str
+    old_lines: List[str]
+
+
+@dataclass
+class PatchResult:
+    """Patched content plus per-hunk outcome."""
+    content: str
+    applied: List[AppliedHunk] = field(default_factory=list)
+    conflicts: List[HunkConflict] = field(default_factory=list)
+    
+    @property
+    def clean(self) -> bool:
+        """Whether every hunk applied."""
+        return not self.conflicts
 
 
 class DiffService:
     """Handles diff generation and parsing (GitHub-style)."""
     
+    # Hunks of recently viewed suggestions, keyed by original hash and edit
+    _hunk_cache: "OrderedDict[Tuple[str, int, int, str], List[DiffHunk]]" = OrderedDict()
+    
+    @staticmethod
+    def suggestion_hunks(suggestion: "UpdateSuggestion") -> List[DiffHunk]:
+        """Diff hunks for a suggestion, computed on first use and kept in an LRU cache.
+        
+        The first computation also records the suggestion's diff stats.
+        """
+        edit = suggestion.suggested_edit
+        key = (suggestion.original_hash, edit.start, edit.end, edit.text)
+        cache = DiffService._hunk_cache
+        hunks = cache.get(key)
+        if hunks is None:
+            original = suggestion.original_content
+            hunks = DiffService.generate_diff_hunks(original, edit.apply(original))
+            cache[key] = hunks
+            while len(cache) > max(settings.diff_cache_size, 1):
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        if suggestion.diff_stats is None:
+            suggestion.diff_stats = DiffService.compute_diff_stats(hunks)
+        return hunks
+    
     @staticmethod
     def generate_diff_hunks(
         original: str, 
         suggested: str, 
-        context_lines: int = 3
+        context_lines: Optional[int] = None,
+        algorithm: Optional[str] = None
     ) -> List[DiffHunk]:
-        """Generate diff hunks between original and suggested content."""
+        """Generate diff hunks between original and suggested content.
+        
+        Hunks are built straight from the engine's opcodes with unified-diff
+        numbering; ``algorithm`` defaults to ``settings.diff_algorithm``.
+        Like git, a last line without a newline differs from the same line
+        with one, and hunks reaching the end of a side record whether that
+        side ends with a newline, so applying them reproduces it exactly.
+        """
+        if context_lines is None:
+            context_lines = settings.diff_context_lines
         original_lines = original.splitlines()
         suggested_lines = suggested.splitlines()
-        diff = difflib.unified_diff(
-            original_lines,
-            suggested_lines,
-            lineterm='',
-            n=context_lines
+        old_eof_newline = original.endswith("\n")
+        new_eof_newline = suggested.endswith("\n")
+        opcodes = diff_opcodes(
+            DiffService._eof_keys(original_lines, old_eof_newline),
+            DiffService._eof_keys(suggested_lines, new_eof_newline),
+            algorithm or settings.diff_algorithm
         )
-        return DiffService._process_diff_lines(diff)
-
-    @staticmethod
-    def _process_diff_lines(diff) -> List[DiffHunk]:
-        """Process diff lines and create hunks."""
         hunks = []
-        current_hunk = None
-        for line in diff:
-            if line.startswith('@@'):
-                if current_hunk:
-                    hunks.append(current_hunk)
-                current_hunk = DiffService._parse_hunk_header(line)
-            elif current_hunk:
-                DiffService._add_line_to_hunk(current_hunk, line)
-        if current_hunk:
-            hunks.append(current_hunk)
+        for group in group_opcodes(opcodes, context_lines):
+            i1, i2, j1, j2 = group[0][1], group[-1][2], group[0][3], group[-1][4]
+            # Like unified diff, an empty side is numbered by the line before it
+            hunks.append(DiffHunk(
+                old_start=i1 + 1 if i2 > i1 else i1,
+                old_count=i2 - i1,
+                new_start=j1 + 1 if j2 > j1 else j1,
+                new_count=j2 - j1,
+                old_lines=original_lines[i1:i2],
+                new_lines=suggested_lines[j1:j2],
+                line_ops=DiffService._ops_from_opcodes(group),
+                old_eof_newline=old_eof_newline if i2 == len(original_lines) else None,
+                new_eof_newline=new_eof_newline if j2 == len(suggested_lines) else None
+            ))
         return hunks
-
+    
+    @staticmethod
+    def _eof_keys(lines: List[str], eof_newline: bool) -> List[str]:
+        """Lines to diff, with an unterminated last line made distinct from a terminated one."""
+        if eof_newline or not lines:
+            return lines
+        # splitlines() never leaves a newline inside a line, so this cannot match a real one
+        return lines[:-1] + [lines[-1] + "\n"]
+    
     @staticmethod
-    def _add_line_to_hunk(hunk: DiffHunk, line: str) -> None:
-        """Add a line to the current hunk based on its type."""
-        if line.startswith('-'):
-            hunk.old_lines.append(line[1:])
-        elif line.startswith('+'):
-            hunk.new_lines.append(line[1:])
-        elif line.startswith(' '):
-            context_line = line[1:]
-            hunk.old_lines.append(context_line)
-            hunk.new_lines.append(context_line)
+    def _ops_from_opcodes(opcodes: List[Tuple[str, int, int, int, int]]) -> List[DiffLineOp]:
+        """Per-line ops for a run of opcodes, deletions before additions in a replace."""
+        ops: List[DiffLineOp] = []
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == "equal":
+                ops.extend([DiffLineOp.CONTEXT] * (i2 - i1))
+                continue
+            ops.extend([DiffLineOp.DELETE] * (i2 - i1))
+            ops.extend([DiffLineOp.ADD] * (j2 - j1))
+        return ops
     
     @staticmethod
-    def _parse_hunk_header(header: str) -> DiffHunk:
-        """Parse a hunk header like @@ -1,4 +1,6 @@."""
-        # Extract the numbers from the header
-        match = re.match(r'@@ -(\d+),?(\d*) \+(\d+),?(\d*) @@', header)
-        if not match:
-            raise ValueError(f"Invalid hunk header: {header}")
-            
-        old_start = int(match.group(1))
-        old_count = int(match.group(2)) if match.group(2) else 1
-        new_start = int(match.group(3))
-        new_count = int(match.group(4)) if match.group(4) else 1
+    def line_ops(hunk: DiffHunk) -> List[DiffLineOp]:
+        """A hunk's line ops; hunks stored before ops were recorded get them re-derived."""
+        if hunk.line_ops or not (hunk.old_lines or hunk.new_lines):
+            return hunk.line_ops
+        return DiffService._ops_from_opcodes(diff_opcodes(hunk.old_lines, hunk.new_lines, "myers"))
+    
+    @staticmethod
+    def compute_diff_stats(hunks: List[DiffHunk]) -> DiffStats:
+        """Exact added and deleted line counts, counted from the hunks' line ops."""
+        stats = DiffStats(changes=len(hunks))
+        for hunk in hunks:
+            for op in DiffService.line_ops(hunk):
+                if op == DiffLineOp.ADD:
+                    stats.additions += 1
+                elif op == DiffLineOp.DELETE:
+                    stats.deletions += 1
+        return stats
+    
+    @staticmethod
+    def format_unified(hunks: List[DiffHunk]) -> str:
+        """Render hunks as unified-diff text with ' ', '-' and '+' line prefixes.
         
-        return DiffHunk(
-            old_start=old_start,
-            old_count=old_count,
-            new_start=new_start,
-            new_count=new_count,
-            old_lines=[],
-            new_lines=[]
-        )
+        A last line without a newline is followed by git's
+        ``\\ No newline at end of file`` marker.
+        """
+        prefixes = {DiffLineOp.CONTEXT: " ", DiffLineOp.DELETE: "-", DiffLineOp.ADD: "+"}
+        lines = []
+        for hunk in hunks:
+            lines.append(f"@@ -{hunk.old_start},{hunk.old_count} +{hunk.new_start},{hunk.new_count} @@")
+            old_index = new_index = 0
+            for op in DiffService.line_ops(hunk):
+                if op == DiffLineOp.ADD:
+                    text = hunk.new_lines[new_index]
+                    new_index += 1
+                    unterminated = new_index == len(hunk.new_lines) and hunk.new_eof_newline is False
+                else:
+                    text = hunk.old_lines[old_index]
+                    old_index += 1
+                    unterminated = old_index == len(hunk.old_lines) and hunk.old_eof_newline is False
+                    if op == DiffLineOp.CONTEXT:
+                        new_index += 1
+                lines.append(prefixes[op] + text)
+                if unterminated:
+                    lines.append(NO_NEWLINE_MARKER)
+        return "\n".join(lines)
+    
+    @staticmethod
+    def inline_changes(hunk: DiffHunk, granularity: str = "word") -> List[Dict[str, Any]]:
+        """Intra-line segments for the changed line pairs of a hunk.
+        
+        Each block of deletions followed by additions pairs its old and new
+        lines in order; a pair gets ``old``/``new`` segment lists (see
+        ``inline_diff``). Lines without a counterpart are whole-line
+        deletions or insertions and are skipped.
+        """
+        changes: List[Dict[str, Any]] = []
+        deleted: List[int] = []  # Indexes into old_lines of the current change block
+        added: List[int] = []  # Indexes into new_lines of the current change block
+        
+        def flush() -> None:
+            for old_index, new_index in zip(deleted, added):
+                old_segments, new_segments = inline_diff(
+                    hunk.old_lines[old_index], hunk.new_lines[new_index], granularity
+                )
+                changes.append({
+                    "old_line": hunk.old_start + old_index,
+                    "new_line": hunk.new_start + new_index,
+                    "old": old_segments,
+                    "new": new_segments,
+                })
+            deleted.clear()
+            added.clear()
+        
+        old_index = new_index = 0
+        for op in DiffService.line_ops(hunk):
+            if op == DiffLineOp.DELETE:
+                # Deletions after additions start a new change block
+                if added:
+                    flush()
+                deleted.append(old_index)
+                old_index += 1
+            elif op == DiffLineOp.ADD:
+                added.append(new_index)
+                new_index += 1
+            else:
+                flush()
+                old_index += 1
+                new_index += 1
+        flush()
+        return changes
     
     @staticmethod
     def apply_diff_hunks(original: str, hunks: List[DiffHunk]) -> str:
-        """Apply diff hunks to original content."""
-        # TODO: Implement proper diff application
-        # For now, this is a placeholder
-        return original
+        """Apply diff hunks to original content, raising PatchConflictError if any hunk does not apply."""
+        result = DiffService.apply_patch(original, hunks)
+        if result.conflicts:
+            raise PatchConflictError(
+                f"{len(result.conflicts)} of {len(hunks)} hunks did not apply",
+                conflicts=result.conflicts
+            )
+        return result.content
+    
+    @staticmethod
+    def apply_patch(
+        original: str,
+        hunks: List[DiffHunk],
+        max_fuzz: int = 2,
+        max_offset: Optional[int] = None
+    ) -> PatchResult:
+        """Apply as many hunks as possible and report the ones that conflict.
+        
+        Each hunk's old lines (context plus deletions) are located in the
+        content, nearest to where the hunk expects them after the drift of
+        earlier hunks. If they are not found, up to ``max_fuzz`` leading and
+        trailing context lines are dropped and the search repeated, like
+        ``patch --fuzz``. Candidate positions come from an index of line
+        positions built once, so a patch is linear in the content size for
+        typical documents. Conflicting hunks leave their region untouched.
+        """
+        lines = original.splitlines()
+        positions: Dict[str, List[int]] = {}
+        for index, line in enumerate(lines):
+            positions.setdefault(line, []).append(index)
+        
+        output: List[str] = []
+        applied: List[AppliedHunk] = []
+        conflicts: List[HunkConflict] = []
+        eof_newline = original.endswith("\n")  # Unless a hunk reaching the end says otherwise
+        cursor = 0  # Lines before this are already copied or replaced
+        drift = 0  # Offset at which the previous hunk applied
+        for index, hunk in sorted(enumerate(hunks), key=lambda item: item[1].old_start):
+            # A hunk that removes nothing inserts after line old_start
+            expected = hunk.old_start if hunk.old_count == 0 else hunk.old_start - 1
+            lead, trail = DiffService._context_lengths(hunk)
+            match = None
+            for fuzz in range(max_fuzz + 1):
+                drop_lead, drop_trail = min(fuzz, lead), min(fuzz, trail)
+                if fuzz and not (drop_lead or drop_trail):
+                    break
+                pattern = hunk.old_lines[drop_lead:len(hunk.old_lines) - drop_trail]
+                position = DiffService._find_block(
+                    lines, positions, pattern, expected + drift + drop_lead, cursor, max_offset
+                )
+                if position is not None:
+                    match = (position, drop_lead, drop_trail, pattern)
+                    break
+            if match is None:
+                conflicts.append(HunkConflict(
+                    index=index,
+                    expected_line=expected + drift + 1,
+                    reason="context not found" if hunk.old_lines else "insertion point out of range",
+                    old_lines=hunk.old_lines
+                ))
+                continue
+            position, drop_lead, drop_trail, pattern = match
+            output.extend(lines[cursor:position])
+            output.extend(hunk.new_lines[drop_lead:len(hunk.new_lines) - drop_trail])
+            cursor = position + len(pattern)
+            if cursor == len(lines) and hunk.new_eof_newline is not None and not drop_trail:
+                eof_newline = hunk.new_eof_newline
+            drift = position - drop_lead - expected
+            applied.append(AppliedHunk(
+                index=index, line=position - drop_lead + 1, offset=drift, fuzz=max(drop_lead, drop_trail)
+            ))
+        output.extend(lines[cursor:])
+        
+        content = "\n".join(output)
+        if eof_newline and output:
+            content += "\n"
+        return PatchResult(content=content, applied=applied, conflicts=conflicts)
+    
+    @staticmethod
+    def _context_lengths(hunk: DiffHunk) -> Tuple[int, int]:
+        """Leading and trailing context lines of a hunk (lines shared by both sides at its edges)."""
+        if hunk.line_ops:
+            ops = hunk.line_ops
+            lead = next((index for index, op in enumerate(ops) if op != DiffLineOp.CONTEXT), len(ops))
+            trail = next((index for index, op in enumerate(reversed(ops)) if op != DiffLineOp.CONTEXT), len(ops))
+            return lead, min(trail, len(ops) - lead)
+        old, new = hunk.old_lines, hunk.new_lines
+        limit = min(len(old), len(new))
+        lead = 0
+        while lead < limit and old[lead] == new[lead]:
+            lead += 1
+        trail = 0
+        while trail < limit - lead and old[-1 - trail] == new[-1 - trail]:
+            trail += 1
+        return lead, trail
     
+    @staticmethod
+    def _find_block(
+        lines: List[str],
+        positions: Dict[str, List[int]],
+        pattern: List[str],
+        expected: int,
+        start: int,
+        max_offset: Optional[int]
+    ) -> Optional[int]:
+        """Position at or after ``start`` where ``pattern`` occurs, nearest to ``expected``."""
+        if not pattern:
+            position = min(max(expected, start), len(lines))
+            if max_offset is not None and abs(position - expected) > max_offset:
+                return None
+            return position
+        # Walk outwards from the expected position over the first line's occurrences
+        candidates = positions.get(pattern[0], [])
+        lowest = bisect_left(candidates, start)
+        right = bisect_left(candidates, expected, lowest)
+        left = right - 1
+        while left >= lowest or right < len(candidates):
+            if right >= len(candidates) or (
+                left >= lowest and expected - candidates[left] < candidates[right] - expected
+            ):
+                candidate = candidates[left]
+                left -= 1
+            else:
+                candidate = candidates[right]
+                right += 1
+            if max_offset is not None and abs(candidate - expected) > max_offset:
+                break
+            if lines[candidate:candidate + len(pattern)] == pattern:
+                return candidate
+        return None
+    
+    @staticmethod
+    def combine_changes(original: str, hunk_sets: List[List[DiffHunk]]) -> str:
+        """Content with the changes of several diffs of the same original applied together.
+        
+        Each diff is reduced to its change blocks (context dropped). Blocks
+        from different diffs must not touch the same lines or insert at the
+        same point, except for identical blocks, which are applied once;
+        otherwise PatchConflictError lists the overlapping blocks.
+        """
+        lines = original.splitlines()
+        blocks = set()
+        for diff_index, hunks in enumerate(hunk_sets):
+            for hunk in hunks:
+                old_line = hunk.old_start - 1 if hunk.old_count else hunk.old_start  # 0-based
+                new_index = 0
+                block_start, block_new = None, []
+                ops = DiffService.line_ops(hunk)
+                for op_index, op in enumerate(ops + [DiffLineOp.CONTEXT]):
+                    if op == DiffLineOp.CONTEXT:
+                        if block_start is not None:
+                            # Only a block ending the hunk can reach the end of the content
+                            eof = hunk.new_eof_newline if op_index == len(ops) else None
+                            blocks.add((block_start, old_line, tuple(block_new), eof, diff_index))
+                            block_start, block_new = None, []
+                        old_line += 1
+                        new_index += 1
+                        continue
+                    if block_start is None:
+                        block_start = old_line
+                    if op == DiffLineOp.DELETE:
+                        old_line += 1
+                    else:
+                        block_new.append(hunk.new_lines[new_index])
+                        new_index += 1
+        
+        # Identical blocks from different diffs are the same change
+        unique: Dict[Tuple[int, int, Tuple[str, ...], Optional[bool]], int] = {}
+        for start, end, new_lines, eof, diff_index in sorted(blocks, key=lambda block: block[:3] + block[4:]):
+            unique.setdefault((start, end, new_lines, eof), diff_index)
+        ordered = sorted(unique.items(), key=lambda item: (item[0][0], item[0][1]))
+        
+        conflicts = []
+        reach, reach_diff = -1, None  # Furthest end of the blocks so far
+        insertion, insertion_diff = None, None  # Latest pure insertion point
+        for (start, end, _, _), diff_index in ordered:
+            if start < reach:
+                conflicts.append({"diffs": [reach_diff, diff_index], "lines": [start + 1, max(end, reach)]})
+            elif start == end == insertion:
+                # Two different insertions at the same point have no defined order
+                conflicts.append({"diffs": [insertion_diff, diff_index], "lines": [start + 1, start]})
+            if start == end:
+                insertion, insertion_diff = start, diff_index
+            if end > reach:
+                reach, reach_diff = end, diff_index
+        if conflicts:
+            raise PatchConflictError(f"{len(conflicts)} overlapping changes", conflicts=conflicts)
+        
+        output: List[str] = []
+        cursor = 0
+        eof_newline = original.endswith("\n")
+        for (start, end, new_lines, eof), _ in ordered:
+            output.extend(lines[cursor:start])
+            output.extend(new_lines)
+            cursor = end
+            if end == len(lines) and eof is not None:
+                eof_newline = eof
+        output.extend(lines[cursor:])
+        content = "\n".join(output)
+        if eof_newline and output:
+            content += "\n"
+        return content
+
+    @staticmethod
+    def rebase_hunks(hunks: List[DiffHunk], old_offset: int, new_offset: int) -> List[DiffHunk]:
+        """Copies of section-relative hunks renumbered by line offsets into a larger file."""
+        return [
+            # The end of a section is not the end of the file
+            hunk.model_copy(update={
+                "old_start": hunk.old_start + old_offset,
+                "new_start": hunk.new_start + new_offset,
+                "old_eof_newline": None,
+                "new_eof_newline": None,
+            })
+            for hunk in hunks
+        ]
+
+    @staticmethod
+    def document_diff(
+        suggestions: List["UpdateSuggestion"],
+        doc_processor: Any,
+        inline: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Records of one combined diff per document for a set of suggestions, in a single pass.
+
+        Suggestions are ordered by position within their document and their
+        hunks rebased from section to document line numbers using the
+        section's ``line_start`` (see ``DocumentProcessor.section_line_offset``);
+        new-side numbers also carry the line count change of the suggestions
+        before them. A suggestion whose changes
+        overlap an earlier one in the same document, or whose section is no
+        longer loaded, is reported as skipped instead. Placement only needs
+        the stored edits, so each suggestion's hunks are diffed and yielded in
+        turn: ``document``, ``suggestion``, ``hunk`` and ``skipped`` entries,
+        then one ``summary``.
+        """
+        from .conflict_index import edit_ranges
+
+        # Order by position from the stored edits alone; hunks are computed as each suggestion is yielded
+        placed = []
+        skipped = 0
+        for suggestion in suggestions:
+            section = doc_processor.get_section_by_id(suggestion.section_id) if doc_processor else None
+            if section is None:
+                skipped += 1
+                yield {"type": "skipped", "suggestion_id": suggestion.id, "reason": "section_not_found"}
+                continue
+            ranges = edit_ranges(suggestion.original_content, suggestion.suggested_edit)
+            first_change = ranges[0][0] if ranges else 0
+            offset = doc_processor.section_line_offset(section)
+            placed.append((suggestion.document_id, offset, first_change, suggestion, section, ranges))
+        placed.sort(key=lambda entry: entry[:3])
+
+        totals = DiffStats()
+        documents = included = 0
+        current_document = None
+        for document_id, offset, _, suggestion, section, ranges in placed:
+            if document_id != current_document:
+                current_document = document_id
+                delta, reach, reach_owner = 0, 0, None  # New-side shift; furthest doubled change end
+                documents += 1
+                yield {"type": "document", "document_id": document_id, "file_path": section.file_path}
+            if ranges and ranges[0][0] + 2 * offset <= reach:
+                skipped += 1
+                yield {"type": "skipped", "suggestion_id": suggestion.id, "reason": "overlaps", "conflicts_with": reach_owner}
+                continue
+
+            hunks = suggestion.diff_hunks
+            stats = suggestion.diff_stats or DiffService.compute_diff_stats(hunks)
+            included += 1
+            yield {
+                "type": "suggestion",
+                "suggestion_id": suggestion.id,
+                "document_id": document_id,
+                "section_id": suggestion.section_id,
+                "line_offset": offset,
+                "drifted": generate_hash(section.content) != suggestion.original_hash,
+                "stats": stats.model_dump(),
+            }
+            for hunk in DiffService.rebase_hunks(hunks, offset, offset + delta):
+                record = {"type": "hunk", "suggestion_id": suggestion.id, **hunk.model_dump(mode="json")}
+                if inline:
+                    record["inline"] = DiffService.inline_changes(hunk, inline)
+                yield record
+
+            delta += stats.additions - stats.deletions
+            if ranges and ranges[-1][1] + 2 * offset > reach:
+                reach, reach_owner = ranges[-1][1] + 2 * offset, suggestion.id
+            totals.additions += stats.additions
+            totals.deletions += stats.deletions
+            totals.changes += stats.changes
+
+        yield {
+            "type": "summary",
+            "documents": documents,
+            "suggestions": included,
+            "skipped": skipped,
+            "stats": totals.model_dump(),
+        }
+
     @staticmethod
     def get_diff_stats(hunks: List[DiffHunk]) -> Dict[str, int]:
         """Get diff statistics (additions, deletions, etc.)."""
-        additions = sum(len([line for line in hunk.new_lines if line not in hunk.old_lines]) for hunk in hunks)
-        deletions = sum(len([line for line in hunk.old_lines if line not in hunk.new_lines]) for hunk in hunks)
-        return {
-            "additions": additions,
-            "deletions": deletions,
-            "changes": len(hunks)
-        }
\ No newline at end of file
+        return DiffService.compute_diff_stats(hunks).model_dump()
@@ -4,9 +4,10 @@
 import hashlib
 import json
 import re
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import numpy as np
 from openai import OpenAI
@@ -18,7 +19,11 @@ from typing import Any, Dict, List, Optional
 
 
 from ..models.document import Document, DocumentSection, DocumentType
-from ..utils.exceptions import DocumentProcessingError
+from ..services.section_tree import SectionTreeIndex
+from ..services.symbol_index import SymbolIndex
+from ..services.telemetry import KIND_EMBEDDING, OUTCOME_ERROR, caller_scope, telemetry
+from ..utils.exceptions import DocumentProcessingError, StorageError
+from ..utils.logger import processor_logger
 
 
 class DocumentProcessor:
@@ -29,18 +34,22 @@ class DocumentProcessor:
         self.documents: Dict[str, Document] = {}
         self.sections: Dict[str, DocumentSection] = {}
         self.embeddings: Dict[str, np.ndarray] = {}  # section_id -> embedding vector
+        self.section_tree = SectionTreeIndex()  # Header hierarchy, built at ingestion
+        self.symbol_index = SymbolIndex()  # Code identifiers -> sections, built at ingestion
+        self.storage: Any = None  # StorageService that section updates are saved to, if any
+        self.section_listeners: List[Callable[[DocumentSection], None]] = []  # Called after each section update
         
         # Initialize OpenAI client only if API key is available
         api_key = settings.openai_api_key or os.getenv("OPENAI_API_KEY")
         if api_key:
             try:
-                self.embeddings_model = OpenAI(api_key=api_key, timeout=30)
-                print("[DEBUG] OpenAI client initialized successfully")
+                self.embeddings_model = OpenAI(api_key=api_key, base_url=settings.openai_base_url, timeout=30)
+                processor_logger.debug("OpenAI client initialized successfully")
             except Exception as e:
-                print(f"[DEBUG] Failed to initialize OpenAI client: {e}")
+                processor_logger.warning(f"Failed to initialize OpenAI client: {e}")
                 self.embeddings_model = None
         else:
-            print("[DEBUG] No OpenAI API key found, embeddings will be disabled")
+            processor_logger.warning("No OpenAI API key found, embeddings will be disabled")
             self.embeddings_model = None
         
         # Fast embedding search optimizations
@@ -49,8 +58,12 @@ class DocumentProcessor:
         self.query_embedding_cache: Dict[str, np.ndarray] = {}  # Cache for query embeddings
         self._embedding_matrix_dirty = True
         
+        # Bumped whenever sections or embeddings change, so results derived
+        # from the corpus (e.g. coalesced suggestion runs) can be keyed on it
+        self.corpus_version = 0
+        
         # Load existing embeddings on initialization
-        print("[DocumentProcessor] Loading existing embeddings from pickle file...")
+        processor_logger.info("Loading existing embeddings from pickle file...")
         self.load_embeddings()
         
     def save_embeddings(self, path: str = "data/embeddings.pkl") -> None:
@@ -66,25 +79,25 @@ class DocumentProcessor:
                 loaded = pickle.load(f)
                 self.embeddings = {k: np.array(v) for k, v in loaded.items()}
         except Exception as e:
-            print(f"[Embedding] No existing embeddings loaded: {e}")
+            processor_logger.warning(f"No existing embeddings loaded: {e}")
 
     async def load_documents_from_json_file(self, json_file_path: str) -> Document | None:
         """Load a single JSON document in the OpenAI Agents SDK format and process it into sections."""
         file_path = self._ensure_path(json_file_path)
         if not file_path.exists():
-            print(f"[DocumentProcessor] File not found: {file_path}")
+            processor_logger.warning(f"File not found: {file_path}")
             raise DocumentProcessingError(f"File not found: {file_path}")
         data = self._load_json_file(file_path)
         markdown_content = data.get('markdown', '')
         metadata = data.get('metadata', {})
         if not markdown_content:
-            print(f"[DocumentProcessor] No markdown content found in JSON file: {file_path}")
+            processor_logger.warning(f"No markdown content found in JSON file: {file_path}")
             raise DocumentProcessingError(f"No markdown content found in JSON file: {file_path}")
         document = await self._process_json_document(file_path, markdown_content, metadata)
         if document:
             self._store_document(document)
         else:
-            print(f"[DocumentProcessor] Failed to process document: {file_path}")
+            processor_logger.error(f"Failed to process document: {file_path}")
         return document
 
     def _ensure_path(self, path_input: str) -> Path:
@@ -97,7 +110,7 @@ class DocumentProcessor:
             with open(file_path, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except Exception as e:
-            print(f"[DocumentProcessor] Exception loading JSON file {file_path}: {str(e)}")
+            processor_logger.error(f"Exception loading JSON file {file_path}: {str(e)}")
             raise DocumentProcessingError(f"Failed to load JSON file: {str(e)}")
 
     def _store_document(self, document: Document) -> None:
@@ -105,12 +118,15 @@ class DocumentProcessor:
         self.documents[document.id] = document
         for section in document.sections:
             self.sections[section.id] = section
+        self.section_tree.add_document(document)
+        self.symbol_index.add_document(document)
+        self.corpus_version += 1
     
     async def load_documents_from_directory(self, docs_path: str) -> list[Document]:
         """Load all JSON documents from a directory and process them."""
         docs_path_path = self._ensure_path(docs_path)
         if not docs_path_path.exists():
-            print(f"[DocumentProcessor] Directory not found: {docs_path_path}")
+            processor_logger.warning(f"Directory not found: {docs_path_path}")
             raise DocumentProcessingError(f"Directory not found: {docs_path_path}")
         
         
@@ -121,9 +137,9 @@ class DocumentProcessor:
                 documents.append(document)
         
         if not documents:
-            print(f"[DocumentProcessor] No valid documents loaded from directory: {docs_path_path}")
+            processor_logger.warning(f"No valid documents loaded from directory: {docs_path_path}")
         else:
-            print(f"[DocumentProcessor] Loaded {len(documents)} documents")
+            processor_logger.info(f"Loaded {len(documents)} documents")
             
             # Only generate embeddings for sections that don't have them
             sections_needing_embeddings = [
@@ -132,11 +148,11 @@ class DocumentProcessor:
             ]
             
             if sections_needing_embeddings:
-                print(f"[DocumentProcessor] Need to generate embeddings for {len(sections_needing_embeddings)} new sections")
+                processor_logger.info(f"Need to generate embeddings for {len(sections_needing_embeddings)} new sections")
                 await self.generate_section_embeddings()
                 self.save_embeddings()
             else:
-                print("[DocumentProcessor] All sections already have embeddings, skipping generation")
+                processor_logger.info("All sections already have embeddings, skipping generation")
         
         return documents
 
@@ -145,7 +161,7 @@ class DocumentProcessor:
         try:
             return await self.load_documents_from_json_file(str(file_path))
         except Exception as e:
-            print(f"[DocumentProcessor] Error processing {file_path}: {str(e)}")
+            processor_logger.error(f"Error processing {file_path}: {str(e)}")
             return None
     
     async def _process_json_document(
@@ -171,7 +187,7 @@ class DocumentProcessor:
             )
             return document
         except Exception as e:
-            print(f"[DocumentProcessor] Error processing document {file_path}: {str(e)}")
+            processor_logger.error(f"Error processing document {file_path}: {str(e)}")
             return None
     
     def _parse_markdown_sections(self, content: str, file_path: str) -> list[DocumentSection]:
@@ -284,12 +300,93 @@ class DocumentProcessor:
     def get_section_by_id(self, section_id: str) -> DocumentSection | None:
         """Get a section by its unique ID."""
         return self.sections.get(section_id)
+
+    def section_line_offset(self, section: DocumentSection) -> int:
+        """Document lines before a section's content, so section line ``n`` is document line ``n + offset``.
+
+        ``line_start`` is the 0-based line of the section's header; the stored
+        content starts after the header and any blank lines stripped from it.
+        """
+        document = self.documents.get(self._generate_doc_id(section.file_path))
+        if document is None:
+            return section.line_start + 1
+        lines = document.content.split('\n')
+        index = section.line_start
+        if index < len(lines) and lines[index].strip().startswith('#'):
+            index += 1
+        while index < min(section.line_end, len(lines) - 1) and not lines[index].strip():
+            index += 1
+        return index
+
+    async def update_section_content(self, section_id: str, content: str) -> DocumentSection | None:
+        """Replace a section's content (e.g. after merging a suggestion) and refresh its indexes and embedding.
+        
+        The document's content and the line ranges of the section and the
+        sections after it are updated to match, and the document is saved
+        when a storage service is attached.
+        """
+        section = self.sections.get(section_id)
+        if section is None:
+            return None
+        content = content.strip()
+        document = self.documents.get(self._generate_doc_id(section.file_path))
+        if document is not None:
+            self._splice_document_content(document, section, content)
+        section.content = content
+        section.section_type = DocumentType.CODE if '```' in content else DocumentType.MARKDOWN
+        section.metadata.update({
+            "has_code": '```' in content,
+            "word_count": len(content.split()),
+            "char_count": len(content)
+        })
+        section.updated_at = datetime.now()
+        
+        if document is not None:
+            document.updated_at = section.updated_at
+            self.section_tree.add_document(document)
+            self.symbol_index.add_document(document)
+            for listener in self.section_listeners:
+                listener(section)
+            if self.storage is not None:
+                try:
+                    await self.storage.save_document(document)
+                except StorageError as e:
+                    processor_logger.error(f"Failed to save document {document.id} after updating section {section_id}: {e}")
+        self.corpus_version += 1
+        
+        # Re-embed just this section
+        self.embeddings.pop(section_id, None)
+        self._embedding_matrix_dirty = True
+        await self.generate_section_embeddings()
+        return section
+    
+    def _splice_document_content(self, document: Document, section: DocumentSection, content: str) -> None:
+        """Put a section's new (stripped) content into its document and shift the line ranges after it.
+        
+        Must run before ``section.content`` changes: the old content's line
+        count gives the span of document lines it occupies.
+        """
+        lines = document.content.split('\n')
+        start = self.section_line_offset(section)
+        old_count = len(section.content.split('\n')) if section.content else 0
+        new_lines = content.split('\n') if content else []
+        lines[start:start + old_count] = new_lines
+        document.content = '\n'.join(lines)
+        
+        delta = len(new_lines) - old_count
+        if not delta:
+            return
+        section.line_end += delta
+        for other in document.sections:
+            if other is not section and other.line_start > section.line_start:
+                other.line_start += delta
+                other.line_end += delta
     
     async def generate_section_embeddings(self, batch_size: int = 50) -> None:
         """Generate and store embeddings for all document sections using optimized batching."""
         # Skip embedding generation if no OpenAI client is available
         if not self.embeddings_model:
-            print("[DEBUG] No OpenAI client available, skipping embedding generation")
+            processor_logger.info("No OpenAI client available, skipping embedding generation")
             return
         
         # Only embed non-empty, valid string contents
@@ -300,54 +397,69 @@ class DocumentProcessor:
         ]
         
         if not to_embed:
-            print("[DEBUG] No sections to embed")
+            processor_logger.debug("No sections to embed")
             return
         
-        print(f"[DEBUG] Generating embeddings for {len(to_embed)} sections")
+        processor_logger.info(f"Generating embeddings for {len(to_embed)} sections")
         
         for i in range(0, len(to_embed), batch_size):
             batch = to_embed[i:i+batch_size]
             ids, texts = zip(*batch)
             try:
-                response = self.embeddings_model.embeddings.create(
-                    input=list(texts),
-                    model="text-embedding-ada-002",
-                    timeout=20  # Reduced timeout for faster processing
-                )
+                with caller_scope("indexing"):
+                    response = self._create_embeddings(list(texts), template="section_batch", timeout=20)
                 for idx, emb in enumerate(response.data):
                     self.embeddings[ids[idx]] = np.array(emb.embedding)
                 
-                print(f"[DEBUG] Embedded batch {i//batch_size + 1}/{(len(to_embed) - 1)//batch_size + 1}")
+                processor_logger.debug(f"Embedded batch {i//batch_size + 1}/{(len(to_embed) - 1)//batch_size + 1}")
                 
             except Exception as e:
-                print(f"[Embedding] Error embedding batch {i}-{i+batch_size}: {e}")
                 # Don't raise on embedding errors, just skip embeddings
-                print("[DEBUG] Skipping embedding generation due to API error")
+                processor_logger.error(
+                    f"Error embedding batch {i}-{i+batch_size}, skipping embedding generation: {e}"
+                )
                 return
         
         # Mark matrix as dirty after adding new embeddings
         self._embedding_matrix_dirty = True
+        self.corpus_version += 1
 
     async def _embed_text(self, text: str) -> np.ndarray | None:
         """Get embedding for a text using OpenAI API with optimization."""
         if not self.embeddings_model:
-            print("[DEBUG] No OpenAI client available for text embedding")
+            processor_logger.debug("No OpenAI client available for text embedding")
             return None
             
         try:
             # Truncate text for faster embedding
             truncated_text = text[:1000] if len(text) > 1000 else text
             
-            response = self.embeddings_model.embeddings.create(
-                input=truncated_text,
-                model="text-embedding-ada-002",
-                timeout=15  # Reduced timeout for faster processing
-            )
+            response = self._create_embeddings(truncated_text, template="query", timeout=15)
             return np.array(response.data[0].embedding)
         except Exception as e:
-            print(f"[Embedding] Error embedding text: {e}")
+            processor_logger.error(f"Error embedding text: {e}")
             return None
 
+    def _create_embeddings(self, texts: str | list[str], template: str, timeout: float) -> Any:
+        """Call the embeddings API, recording the request in telemetry."""
+        model = "text-embedding-ada-002"
+        started = time.monotonic()
+        try:
+            response = self.embeddings_model.embeddings.create(
+                input=texts,
+                model=model,
+                timeout=timeout  # Reduced timeout for faster processing
+            )
+        except Exception as e:
+            telemetry.observe_request(
+                KIND_EMBEDDING, model, template, time.monotonic() - started, outcome=OUTCOME_ERROR, error=e
+            )
+            raise
+        finally:
+            telemetry.observe_call(KIND_EMBEDDING, model, template, 1)
+        telemetry.observe_request(KIND_EMBEDDING, model, template, time.monotonic() - started, usage=response.usage)
+        return response
+
     def _cosine_similarity(self, a: np.ndarray, b: np.ndarray) -> float:
         """Compute cosine similarity between two vectors."""
         if np.linalg.norm(a) == 0 or np.linalg.norm(b) == 0:
@@ -374,6 +486,10 @@ class DocumentProcessor:
         
         return embedding
     
+    async def get_query_embedding(self, query: str) -> np.ndarray | None:
+        """Get the embedding for a query, reusing the one computed during search when cached."""
+        return await self._get_cached_query_embedding(query)
+    
     def _build_embedding_matrix(self) -> None:
         """Build embedding matrix for fast similarity search."""
         if not self.embeddings or not self._embedding_matrix_dirty:
@@ -391,7 +507,7 @@ class DocumentProcessor:
             self.embedding_matrix = None
             
         self._embedding_matrix_dirty = False
-        print(f"[DEBUG] Built embedding matrix with {len(self.section_ids_list)} sections")
+        processor_logger.debug(f"Built embedding matrix with {len(self.section_ids_list)} sections")
     
     def _fast_embedding_search(self, query_emb: np.ndarray, limit: int) -> list[DocumentSection]:
         """Ultra-fast embedding search using vectorized operations."""
@@ -428,14 +544,14 @@ class DocumentProcessor:
     async def search_sections(self, query: str, limit: int = 10) -> list[DocumentSection]:
         """Ultra-fast embedding-based search with context preservation."""
         if not self.embeddings:
-            print("[DEBUG] No embeddings available, using keyword search")
+            processor_logger.warning("No embeddings available, using keyword search")
             return self._keyword_search_sections(query, limit)
         
         try:
             # Get query embedding with caching
             query_emb = await self._get_cached_query_embedding(query)
             if query_emb is None:
-                print("[DEBUG] Failed to get query embedding, using keyword search")
+                processor_logger.warning("Failed to get query embedding, using keyword search")
                 return self._keyword_search_sections(query, limit)
             
             # Use fast matrix operations for similarity search
@@ -455,7 +571,7 @@ class DocumentProcessor:
             return results[:limit]
             
         except Exception as e:
-            print(f"[DEBUG] Embedding search failed: {e}, using keyword search")
+            processor_logger.warning(f"Embedding search failed: {e}, using keyword search")
             return self._keyword_search_sections(query, limit)
 
     def _keyword_search_sections(self, query: str, limit: int = 10) -> list[DocumentSection]:
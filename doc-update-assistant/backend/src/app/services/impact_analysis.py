@@ -0,0 +1,299 @@
+# Impact analysis service
+"""Corpus-wide impact analysis of a release change description."""
+
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, MutableMapping, Optional, Tuple
+
+from ..config import settings
+from ..models.document import DocumentSection
+from ..models.job import JobStatus
+from ..models.suggestion import SuggestionBatch, UpdateSuggestion
+from ..utils.content_store import content_store
+from ..utils.exceptions import StorageError, ValidationError
+from ..utils.logger import ai_logger
+from .llm_scheduler import PRIORITY_BULK, priority_scope
+from .telemetry import caller_scope
+from .prefilter import SectionPreFilter
+from .usage import UsageAccumulator, track_usage
+
+
+class ImpactAnalyzer:
+    """Scores every section against a change description and runs the LLM on the likely-affected ones.
+
+    Scoring is local (embedding similarity plus identifier/keyword overlap),
+    so the whole corpus is ranked without any LLM call. Candidates above the
+    threshold are sent to the LLM with bounded concurrency until the provider
+    call or cost budget is spent. Batches are checkpointed after every
+    section, so a stopped, interrupted or budget-capped run can be resumed
+    where it left off.
+    """
+
+    def __init__(
+        self,
+        doc_processor: Any,
+        ai_service: Any,
+        suggestions_store: MutableMapping[str, UpdateSuggestion],
+        storage: Any = None,
+    ) -> None:
+        """Initialize the analyzer with the app's processor, AI service and stores."""
+        self.doc_processor = doc_processor
+        self.ai_service = ai_service
+        self.suggestions_store = suggestions_store
+        self.storage = storage
+        self.scorer = SectionPreFilter.default(doc_processor)
+        self.batches: Dict[str, SuggestionBatch] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._checkpoint_locks: Dict[str, asyncio.Lock] = {}
+        self._checkpoint_requested: Dict[str, int] = {}
+        self._checkpoint_saved: Dict[str, int] = {}
+
+    async def score_sections(
+        self,
+        description: str,
+        threshold: float,
+        max_sections: int,
+    ) -> List[Tuple[DocumentSection, float]]:
+        """Score all sections and return candidates above the threshold, best first."""
+        context = await self.scorer.build_context(description)
+        scored = []
+        for section in self.doc_processor.sections.values():
+            if not section.content or not section.content.strip():
+                continue
+            score = self.scorer.score_section(section, context)
+            if score is not None and score >= threshold:
+                scored.append((section, score))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:max_sections]
+
+    async def start(
+        self,
+        description: str,
+        threshold: Optional[float] = None,
+        max_sections: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        max_llm_calls: Optional[int] = None,
+        max_cost_usd: Optional[float] = None,
+    ) -> SuggestionBatch:
+        """Score the corpus, create a batch for the candidates and start the LLM stage in the background."""
+        threshold = settings.impact_score_threshold if threshold is None else threshold
+        max_sections = max_sections or settings.impact_max_sections
+        candidates = await self.score_sections(description, threshold, max_sections)
+        now = datetime.now()
+        batch = SuggestionBatch(
+            id=str(uuid.uuid4()),
+            query=description,
+            suggestions=[],
+            created_at=now,
+            updated_at=now,
+            run_status=JobStatus.QUEUED.value,
+            progress=0.0,
+            candidate_section_ids=[section.id for section, _ in candidates],
+            metadata={
+                "threshold": threshold,
+                "scores": {section.id: round(score, 4) for section, score in candidates},
+                "limits": self._limits(concurrency, max_llm_calls, max_cost_usd),
+            },
+            report={"sections_scored": len(self.doc_processor.sections)},
+        )
+        self.batches[batch.id] = batch
+        await self._checkpoint(batch)
+        self._launch(batch)
+        return batch
+
+    async def resume(
+        self,
+        batch_id: str,
+        concurrency: Optional[int] = None,
+        max_llm_calls: Optional[int] = None,
+        max_cost_usd: Optional[float] = None,
+    ) -> Optional[SuggestionBatch]:
+        """Continue a stopped batch with the sections it has not processed yet."""
+        batch = await self.get(batch_id)
+        if batch is None:
+            return None
+        if batch_id in self._tasks:
+            raise ValidationError(f"Impact analysis {batch_id} is already running")
+        batch.metadata["limits"] = self._limits(concurrency, max_llm_calls, max_cost_usd)
+        batch.run_status = JobStatus.QUEUED.value
+        self._launch(batch)
+        return batch
+
+    async def stop(self, batch_id: str) -> Optional[SuggestionBatch]:
+        """Stop a running batch; it is checkpointed as cancelled and can be resumed later."""
+        batch = await self.get(batch_id)
+        task = self._tasks.get(batch_id)
+        if batch is None or task is None:
+            return batch
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return batch
+
+    async def get(self, batch_id: str) -> Optional[SuggestionBatch]:
+        """Get a batch from memory, falling back to the persisted checkpoint."""
+        batch = self.batches.get(batch_id)
+        if batch is None and self.storage is not None:
+            batch = await self.storage.load_batch(batch_id)
+            if batch is not None:
+                if batch.run_status in (JobStatus.QUEUED.value, JobStatus.RUNNING.value):
+                    # The process that ran it is gone; it can be resumed
+                    batch.run_status = JobStatus.CANCELLED.value
+                self.batches[batch.id] = batch
+                content_store.retain_all(suggestion.original_hash for suggestion in batch.suggestions)
+        return batch
+
+    def _limits(
+        self,
+        concurrency: Optional[int],
+        max_llm_calls: Optional[int],
+        max_cost_usd: Optional[float],
+    ) -> Dict[str, Any]:
+        """Resolve run limits against settings."""
+        return {
+            "concurrency": concurrency or settings.impact_concurrency,
+            "max_llm_calls": max_llm_calls or settings.impact_max_llm_calls,
+            "max_cost_usd": settings.impact_max_cost_usd if max_cost_usd is None else max_cost_usd,
+        }
+
+    def _launch(self, batch: SuggestionBatch) -> None:
+        """Run the LLM stage for a batch in the background at bulk priority."""
+        with priority_scope(PRIORITY_BULK), caller_scope("impact_analysis"):
+            task = asyncio.create_task(self._run(batch))
+        self._tasks[batch.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(batch.id, None))
+
+    async def _run(self, batch: SuggestionBatch) -> None:
+        """Generate suggestions for the unprocessed candidates within the run limits."""
+        limits = batch.metadata["limits"]
+        processed = set(batch.processed_section_ids)
+        pending = [
+            section for section in (
+                self.doc_processor.get_section_by_id(section_id)
+                for section_id in batch.candidate_section_ids
+                if section_id not in processed
+            ) if section is not None
+        ]
+        semaphore = asyncio.Semaphore(limits["concurrency"])
+        run_usage = UsageAccumulator()
+        in_flight = 0
+        budget_exhausted = False
+        section_latencies: List[float] = []
+        previous_usage = batch.report.get("usage", {})
+
+        def over_budget() -> bool:
+            # Provider calls on both sides; each section in flight makes at least one more
+            spent_calls = previous_usage.get("llm_calls", 0) + run_usage.calls + in_flight
+            spent_cost = previous_usage.get("estimated_cost_usd", 0.0) + run_usage.cost_usd
+            return spent_calls >= limits["max_llm_calls"] or spent_cost >= limits["max_cost_usd"]
+
+        async def process(section: DocumentSection) -> None:
+            nonlocal in_flight, budget_exhausted
+            async with semaphore:
+                if over_budget():
+                    budget_exhausted = True
+                    return
+                in_flight += 1
+                started = time.monotonic()
+                with track_usage() as usage:
+                    try:
+                        suggestion = await self.ai_service.generate_section_suggestion(
+                            batch.query, section
+                        )
+                    except Exception as e:
+                        ai_logger.error(f"Impact analysis failed on section {section.id}: {e}")
+                        suggestion = None
+                    finally:
+                        in_flight -= 1
+                        run_usage.merge(usage)
+                section_latencies.append(time.monotonic() - started)
+                if suggestion is not None:
+                    self.suggestions_store[suggestion.id] = suggestion
+                    batch.suggestions.append(suggestion)
+                    # Batches are kept, so their suggestions' content must outlive the stored copies
+                    content_store.retain(suggestion.original_hash)
+                batch.processed_section_ids.append(section.id)
+                batch.progress = round(
+                    len(batch.processed_section_ids) / max(len(batch.candidate_section_ids), 1), 3
+                )
+                batch.updated_at = datetime.now()
+                await self._checkpoint(batch)
+
+        batch.run_status = JobStatus.RUNNING.value
+        run_started = time.monotonic()
+        try:
+            await asyncio.gather(*(process(section) for section in pending))
+            batch.run_status = JobStatus.SUCCEEDED.value
+        except asyncio.CancelledError:
+            batch.run_status = JobStatus.CANCELLED.value
+            raise
+        except Exception as e:
+            batch.run_status = JobStatus.FAILED.value
+            batch.metadata["error"] = str(e)
+        finally:
+            self._update_report(batch, run_usage, section_latencies, time.monotonic() - run_started, budget_exhausted)
+            batch.updated_at = datetime.now()
+            await self._checkpoint(batch)
+            ai_logger.info(
+                f"Impact analysis {batch.id}: {len(batch.processed_section_ids)}/"
+                f"{len(batch.candidate_section_ids)} sections processed, "
+                f"{len(batch.suggestions)} suggestions ({batch.run_status})"
+            )
+
+    def _update_report(
+        self,
+        batch: SuggestionBatch,
+        run_usage: UsageAccumulator,
+        section_latencies: List[float],
+        wall_time_s: float,
+        budget_exhausted: bool,
+    ) -> None:
+        """Fold this run's usage into the batch's cumulative cost/latency report."""
+        previous = batch.report.get("usage", {})
+        summary = run_usage.summary()
+        ordered = sorted(section_latencies)
+        batch.report.update({
+            "candidates": len(batch.candidate_section_ids),
+            "processed": len(batch.processed_section_ids),
+            "remaining": len(batch.candidate_section_ids) - len(batch.processed_section_ids),
+            "suggestions": len(batch.suggestions),
+            "budget_exhausted": budget_exhausted,
+            "runs": batch.report.get("runs", 0) + 1,
+            "usage": {
+                "llm_calls": previous.get("llm_calls", 0) + summary["llm_calls"],
+                "prompt_tokens": previous.get("prompt_tokens", 0) + summary["prompt_tokens"],
+                "completion_tokens": previous.get("completion_tokens", 0) + summary["completion_tokens"],
+                "estimated_cost_usd": round(
+                    previous.get("estimated_cost_usd", 0.0) + summary["estimated_cost_usd"], 6
+                ),
+            },
+            "last_run": {
+                **summary,
+                "wall_time_s": round(wall_time_s, 3),
+                "section_latency_p50_s": round(ordered[len(ordered) // 2], 3) if ordered else None,
+                "section_latency_max_s": round(ordered[-1], 3) if ordered else None,
+            },
+        })
+
+    async def _checkpoint(self, batch: SuggestionBatch) -> None:
+        """Persist the batch so it can be resumed; failures are logged, not raised.
+
+        Saves of one batch run one at a time. A caller that finds its state
+        already written by a save that started later returns without
+        writing, so sections finishing together cost one write, not one each.
+        """
+        if self.storage is None:
+            return
+        version = self._checkpoint_requested.get(batch.id, 0) + 1
+        self._checkpoint_requested[batch.id] = version
+        async with self._checkpoint_locks.setdefault(batch.id, asyncio.Lock()):
+            if self._checkpoint_saved.get(batch.id, 0) >= version:
+                return
+            latest = self._checkpoint_requested[batch.id]
+            try:
+                await self.storage.save_batch(batch)
+            except StorageError as e:
+                ai_logger.error(f"Could not checkpoint impact analysis {batch.id}: {e}")
+                return
+            self._checkpoint_saved[batch.id] = latest
@@ -0,0 +1,259 @@
+# Job service
+"""Bounded in-process worker pool for background suggestion jobs."""
+
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, MutableMapping, Optional
+
+from ..config import settings
+from ..models.job import JobStatus, SuggestionJob
+from ..models.suggestion import UpdateSuggestion
+from ..utils.content_store import content_store
+from ..utils.exceptions import JobQueueFullError, StorageError
+from ..utils.logger import app_logger
+from .llm_scheduler import PRIORITY_BULK, priority_scope
+from .telemetry import caller_scope
+
+
+class SuggestionJobManager:
+    """Queues suggestion requests and runs them on a fixed number of workers.
+
+    Submissions beyond ``max_queue_depth`` waiting jobs are rejected; a
+    cancelled queued job frees its slot right away. Jobs are persisted
+    through ``StorageService`` when submitted and when they finish, so
+    results survive restarts. On a clean stop, running jobs are put back in
+    the queue and persisted, and every queued job resumes on the next start;
+    only jobs left running by a crash are reported as failed.
+    """
+
+    def __init__(
+        self,
+        pipeline: Any,
+        suggestions_store: MutableMapping[str, UpdateSuggestion],
+        storage: Any = None,
+        workers: Optional[int] = None,
+        max_queue_depth: Optional[int] = None,
+    ) -> None:
+        """Initialize the manager; call ``start`` from the running event loop."""
+        self.pipeline = pipeline
+        self.suggestions_store = suggestions_store
+        self.storage = storage
+        self.worker_count = workers or settings.job_workers
+        self.max_queue_depth = max_queue_depth or settings.job_max_queue_depth
+        self.jobs: Dict[str, SuggestionJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending = 0  # Queued jobs not cancelled yet; the queue also holds cancelled ids
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._stopping = False
+
+    async def start(self) -> None:
+        """Recover persisted jobs and start the worker pool."""
+        self._queue = asyncio.Queue()
+        self._pending = 0
+        self._stopping = False
+        await self._recover_jobs()
+        self._workers = [
+            asyncio.create_task(self._worker(index)) for index in range(self.worker_count)
+        ]
+        app_logger.info(
+            f"Started {self.worker_count} suggestion job workers "
+            f"(max queue depth {self.max_queue_depth})"
+        )
+
+    async def stop(self) -> None:
+        """Stop the workers, requeueing and persisting interrupted jobs so they resume on restart."""
+        self._stopping = True
+        for task in list(self._running.values()):
+            task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for job in list(self.jobs.values()):
+            if job.status == JobStatus.RUNNING:
+                job.status = JobStatus.QUEUED
+                job.stage = JobStatus.QUEUED.value
+                job.progress = 0.0
+                job.started_at = None
+                job.message = "Interrupted by server shutdown; resumes on restart"
+                await self._persist(job)
+
+    async def submit(self, query: str, metadata: Optional[Dict[str, Any]] = None) -> SuggestionJob:
+        """Enqueue a job, raising JobQueueFullError when the queue is at capacity."""
+        if self._queue is None:
+            raise JobQueueFullError("Job workers are not running")
+        job = SuggestionJob(
+            id=str(uuid.uuid4()),
+            query=query,
+            created_at=datetime.now(),
+            metadata=metadata or {}
+        )
+        if self._pending >= self.max_queue_depth:
+            raise JobQueueFullError(
+                f"Job queue is full ({self.max_queue_depth} jobs waiting); try again later"
+            )
+        self._enqueue(job)
+        await self._persist(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[SuggestionJob]:
+        """Get a job from memory, falling back to persisted results."""
+        job = self.jobs.get(job_id)
+        if job is None and self.storage is not None:
+            job = await self.storage.load_job(job_id)
+            if job is not None:
+                self._remember(job)
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[SuggestionJob]:
+        """Cancel a queued or running job; finished jobs are returned unchanged."""
+        job = await self.get(job_id)
+        if job is None or job.is_finished:
+            return job
+        if job.status == JobStatus.RUNNING and job_id in self._running:
+            # The worker marks the job cancelled when the task unwinds
+            self._running[job_id].cancel()
+            return job
+        # Queued jobs are skipped when a worker dequeues them, but free their slot now
+        self._pending -= 1
+        self._finish(job, JobStatus.CANCELLED, message="Cancelled before start")
+        await self._persist(job)
+        return job
+
+    def _remember(self, job: SuggestionJob) -> None:
+        """Keep a loaded job in memory, with a content reference for each of its suggestions."""
+        self.jobs[job.id] = job
+        content_store.retain_all(suggestion.original_hash for suggestion in job.suggestions)
+
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._pending
+
+    def _enqueue(self, job: SuggestionJob) -> None:
+        """Track a queued job and hand it to the workers."""
+        assert self._queue is not None
+        self.jobs[job.id] = job
+        self._queue.put_nowait(job.id)
+        self._pending += 1
+
+    async def _worker(self, index: int) -> None:
+        """Take jobs off the queue and run them one at a time."""
+        assert self._queue is not None
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self.jobs.get(job_id)
+                if job is None or job.status != JobStatus.QUEUED:
+                    continue
+                self._pending -= 1
+                task = asyncio.create_task(self._execute(job))
+                self._running[job_id] = task
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    if self._stopping or not task.cancelled():
+                        # The worker itself is being stopped
+                        raise
+                finally:
+                    self._running.pop(job_id, None)
+                await self._persist(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                app_logger.error(f"Job worker {index} failed on job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job: SuggestionJob) -> None:
+        """Run the pipeline for a job and record its outcome."""
+        job.status = JobStatus.RUNNING
+        job.started_at = datetime.now()
+
+        def progress(stage: str, fraction: float) -> None:
+            job.stage = stage
+            job.progress = round(fraction, 3)
+
+        try:
+            # Jobs yield to interactive requests for LLM capacity
+            with priority_scope(PRIORITY_BULK), caller_scope("jobs"):
+                result = await self.pipeline.run(job.query, progress=progress)
+        except asyncio.CancelledError:
+            # On shutdown ``stop`` requeues the job instead
+            if not self._stopping:
+                self._finish(job, JobStatus.CANCELLED, message="Cancelled while running")
+            raise
+        except Exception as e:
+            self._finish(job, JobStatus.FAILED, error=str(e))
+            return
+
+        for suggestion in result.suggestions:
+            self.suggestions_store[suggestion.id] = suggestion
+        job.suggestions = result.suggestions
+        # Jobs are kept, so their suggestions' content must outlive the stored copies
+        content_store.retain_all(suggestion.original_hash for suggestion in job.suggestions)
+        job.metadata.update({
+            "sections_found": result.sections_found,
+            "sections_skipped": result.sections_skipped,
+        })
+        self._finish(job, JobStatus.SUCCEEDED, message=result.message)
+
+    def _finish(
+        self,
+        job: SuggestionJob,
+        status: JobStatus,
+        message: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """Move a job to a terminal status."""
+        job.status = status
+        job.stage = status.value
+        job.finished_at = datetime.now()
+        if status == JobStatus.SUCCEEDED:
+            job.progress = 1.0
+        job.message = message
+        job.error = error
+
+    async def _persist(self, job: SuggestionJob) -> None:
+        """Persist a job if storage is configured; failures are logged, not raised."""
+        if self.storage is None:
+            return
+        try:
+            await self.storage.save_job(job)
+        except StorageError as e:
+            app_logger.error(f"Could not persist job {job.id}: {e}")
+
+    async def _recover_jobs(self) -> None:
+        """Load persisted jobs, requeueing queued ones and failing those a crash left running."""
+        if self.storage is None:
+            return
+        try:
+            job_ids = await self.storage.list_jobs()
+        except StorageError as e:
+            app_logger.error(f"Could not list persisted jobs: {e}")
+            return
+        recovered = 0
+        queued: List[SuggestionJob] = []
+        for job_id in job_ids:
+            try:
+                job = await self.storage.load_job(job_id)
+            except StorageError as e:
+                app_logger.error(f"Could not load persisted job {job_id}: {e}")
+                continue
+            if job is None:
+                continue
+            if job.status == JobStatus.QUEUED:
+                queued.append(job)
+            elif job.status == JobStatus.RUNNING:
+                self._finish(job, JobStatus.FAILED, error="Interrupted by server restart")
+                await self._persist(job)
+            self._remember(job)
+            recovered += 1
+        # Already accepted, so requeued even beyond the queue depth
+        for job in sorted(queued, key=lambda queued_job: queued_job.created_at):
+            self._enqueue(job)
+        if recovered:
+            app_logger.info(
+                f"Recovered {recovered} persisted suggestion jobs ({len(queued)} requeued)"
+            )
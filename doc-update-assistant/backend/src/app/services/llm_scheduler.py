@@ -0,0 +1,250 @@
+# LLM scheduler service
+"""Central admission control for LLM requests: priorities, concurrency and rate budgets."""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Union
+
+from ..config import settings
+from .usage import record_queue_wait
+
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BULK = "bulk"
+
+_current_priority: ContextVar[Union[str, Callable[[], str]]] = ContextVar(
+    "llm_priority", default=PRIORITY_INTERACTIVE
+)
+
+
+def current_priority() -> str:
+    """Priority class of LLM calls made in the current context."""
+    priority = _current_priority.get()
+    return priority() if callable(priority) else priority
+
+
+def highest_priority(priorities: Iterable[str]) -> str:
+    """The priority class with the largest scheduling weight (interactive when there are none)."""
+    weights = settings.llm_priority_weights
+    return max(priorities, key=lambda priority: weights.get(priority, 0.0), default=PRIORITY_INTERACTIVE)
+
+
+@contextmanager
+def priority_scope(priority: Union[str, Callable[[], str]]) -> Iterator[None]:
+    """Run LLM calls made in this context (and tasks spawned from it) at ``priority``.
+
+    ``priority`` may be a function, evaluated for every call, so work shared
+    by several callers can follow the most urgent one still waiting.
+    """
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+@dataclass
+class SchedulerTicket:
+    """A granted slot: its priority class, reserved tokens and time spent queued."""
+    priority: str
+    tokens: int
+    queue_wait_s: float
+
+
+@dataclass
+class _Waiter:
+    """A request waiting for admission."""
+    priority: str
+    tokens: int
+    future: "asyncio.Future[float]"
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class _TokenBucket:
+    """Continuously refilled budget of ``capacity`` units per minute."""
+
+    def __init__(self, per_minute: Optional[int]) -> None:
+        """Create the bucket full; ``None`` or 0 means unlimited."""
+        self.capacity = float(per_minute) if per_minute else None
+        self.available = self.capacity or 0.0
+        self._refilled_at = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        """Add the budget accrued since the last refill."""
+        if self.capacity is None:
+            return
+        elapsed = now - self._refilled_at
+        self.available = min(self.capacity, self.available + elapsed * self.capacity / 60)
+        self._refilled_at = now
+
+    def cost(self, amount: float) -> float:
+        """Clamp a request so one oversized call cannot wait forever."""
+        return amount if self.capacity is None else min(amount, self.capacity)
+
+    def seconds_until(self, amount: float) -> float:
+        """Time until ``amount`` is available (0 if it already is)."""
+        if self.capacity is None or self.available >= amount:
+            return 0.0
+        return (amount - self.available) * 60 / self.capacity
+
+    def take(self, amount: float) -> None:
+        """Consume budget."""
+        if self.capacity is not None:
+            self.available -= amount
+
+    def give_back(self, amount: float) -> None:
+        """Return unused budget, e.g. when a call used fewer tokens than reserved."""
+        if self.capacity is not None:
+            self.available = min(self.capacity, self.available + amount)
+
+
+class LLMScheduler:
+    """Admits LLM requests under a concurrency cap and request/token-per-minute budgets.
+
+    Waiting requests are queued per priority class and admitted by stride
+    scheduling on the class weights: with both classes waiting, interactive
+    requests go ahead of queued bulk work most of the time, but bulk still
+    gets its weighted share, so it never starves. Requests reserve their
+    estimated tokens up front; ``refund`` returns what they did not use.
+    Time spent waiting is reported separately from provider latency.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        weights: Optional[Dict[str, float]] = None,
+    ) -> None:
+        """Initialize the scheduler, falling back to settings."""
+        self.max_concurrency = max_concurrency or settings.llm_max_concurrency
+        self.requests = _TokenBucket(
+            settings.llm_requests_per_minute if requests_per_minute is None else requests_per_minute
+        )
+        self.tokens = _TokenBucket(
+            settings.llm_tokens_per_minute if tokens_per_minute is None else tokens_per_minute
+        )
+        self.weights = dict(weights or settings.llm_priority_weights)
+        self.queues: Dict[str, Deque[_Waiter]] = {priority: deque() for priority in self.weights}
+        self._pass: Dict[str, float] = {priority: 0.0 for priority in self.weights}
+        self._last_pass = 0.0
+        self.running = 0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self.stats: Dict[str, Dict[str, Any]] = {
+            priority: {"admitted": 0, "queued": 0, "queue_waits": deque(maxlen=1000)}
+            for priority in self.weights
+        }
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int, priority: Optional[str] = None) -> AsyncIterator[SchedulerTicket]:
+        """Wait for admission, hold a concurrency slot for the block, then release it."""
+        priority = priority or current_priority()
+        if priority not in self.queues:
+            priority = PRIORITY_BULK if PRIORITY_BULK in self.queues else next(iter(self.queues))
+        tokens = int(self.tokens.cost(estimated_tokens))
+        queue_wait_s = await self._acquire(priority, tokens)
+        record_queue_wait(queue_wait_s)
+        try:
+            yield SchedulerTicket(priority=priority, tokens=tokens, queue_wait_s=queue_wait_s)
+        finally:
+            self.running -= 1
+            self._dispatch()
+
+    def refund(self, reserved_tokens: int, used_tokens: int) -> None:
+        """Give back reserved tokens a finished call did not use."""
+        if used_tokens < reserved_tokens:
+            self.tokens.give_back(reserved_tokens - used_tokens)
+            self._dispatch()
+
+    async def _acquire(self, priority: str, tokens: int) -> float:
+        """Queue a request and wait until the dispatcher admits it; returns the wait."""
+        waiter = _Waiter(priority, tokens, asyncio.get_running_loop().create_future())
+        queue = self.queues[priority]
+        if not queue:
+            # An idle class re-joins at the current virtual time instead of
+            # spending credit it built up while it had nothing queued
+            self._pass[priority] = max(self._pass[priority], self._last_pass)
+        queue.append(waiter)
+        self.stats[priority]["queued"] += 1
+        self._dispatch()
+        try:
+            return await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as the caller went away; free the slot
+                self.running -= 1
+                self._dispatch()
+            elif waiter in queue:
+                queue.remove(waiter)
+            raise
+
+    def _next_priority(self) -> Optional[str]:
+        """The non-empty class with the lowest pass value."""
+        candidates = [priority for priority, queue in self.queues.items() if queue]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda priority: (self._pass[priority], -self.weights[priority]))
+
+    def _dispatch(self) -> None:
+        """Admit queued requests while concurrency and rate budgets allow."""
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        while self.running < self.max_concurrency:
+            priority = self._next_priority()
+            if priority is None:
+                return
+            waiter = self.queues[priority][0]
+            delay = max(self.requests.seconds_until(1), self.tokens.seconds_until(waiter.tokens))
+            if delay > 0:
+                self._schedule_wakeup(delay)
+                return
+            self.queues[priority].popleft()
+            if waiter.future.done():
+                continue
+            self.requests.take(1)
+            self.tokens.take(waiter.tokens)
+            self.running += 1
+            self._last_pass = self._pass[priority]
+            self._pass[priority] += 1 / self.weights[priority]
+            queue_wait_s = now - waiter.enqueued_at
+            self.stats[priority]["admitted"] += 1
+            self.stats[priority]["queue_waits"].append(queue_wait_s)
+            waiter.future.set_result(queue_wait_s)
+
+    def _schedule_wakeup(self, delay: float) -> None:
+        """Re-run dispatch once the rate budget has refilled."""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._wakeup = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def queue_depth(self) -> Dict[str, int]:
+        """Requests waiting per priority class."""
+        return {priority: len(queue) for priority, queue in self.queues.items()}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Budgets, occupancy and per-class admission and queue-wait metrics."""
+        by_priority = {}
+        for priority, stats in self.stats.items():
+            waits: List[float] = sorted(stats["queue_waits"])
+            by_priority[priority] = {
+                "weight": self.weights[priority],
+                "waiting": len(self.queues[priority]),
+                "admitted": stats["admitted"],
+                "queue_wait_p50_s": round(waits[len(waits) // 2], 3) if waits else None,
+                "queue_wait_p95_s": round(waits[min(len(waits) - 1, int(0.95 * len(waits)))], 3) if waits else None,
+                "queue_wait_max_s": round(waits[-1], 3) if waits else None,
+            }
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "requests_per_minute": self.requests.capacity,
+            "tokens_per_minute": self.tokens.capacity,
+            "requests_available": None if self.requests.capacity is None else round(self.requests.available, 1),
+            "tokens_available": None if self.tokens.capacity is None else round(self.tokens.available),
+            "priorities": by_priority,
+        }
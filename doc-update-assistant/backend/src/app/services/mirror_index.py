@@ -0,0 +1,148 @@
+# Mirror alignment service
+"""Alignment index linking English pages and sections to their translated mirrors."""
+
+import re
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from ..models.document import Document, DocumentSection
+
+
+SOURCE_LANGUAGE = "en"
+
+# Language segment in mirror URLs, e.g. /openai-agents-python/ja/agents/
+LANGUAGE_SEGMENT = re.compile(r"/(ja|zh|ko)(?=/)")
+
+
+def page_key(document: Document) -> Tuple[str, str]:
+    """(language, language-neutral path) for a document, from its source URL or file name."""
+    url = document.metadata.get("url") or document.metadata.get("sourceURL") or ""
+    path = urlparse(url).path if url else document.file_path
+    match = LANGUAGE_SEGMENT.search(path)
+    language = document.metadata.get("language") or (match.group(1) if match else SOURCE_LANGUAGE)
+    if match:
+        path = path[:match.start()] + path[match.end():]
+    return language, path
+
+
+def section_signature(section: DocumentSection) -> Tuple[int, int]:
+    """Translation-invariant shape of a section: header level and code fence count."""
+    return section.metadata.get("header_level", 0), section.content.count("```")
+
+
+class MirrorAlignmentIndex:
+    """Links each English section to the same section on its translated mirror page.
+
+    Pages are paired by URL path with the language segment removed. Sections
+    are paired by header structure: when both pages have the same sequence
+    of header levels and code fence counts they pair one-to-one in order,
+    otherwise the longest matching runs of that sequence are paired and the
+    rest stay unaligned. The index is rebuilt lazily when the corpus version
+    changes.
+    """
+
+    def __init__(self, doc_processor: Any) -> None:
+        """Initialize an empty index over the processor's documents."""
+        self.doc_processor = doc_processor
+        self.mirrors: Dict[str, Dict[str, str]] = {}  # English section id -> {language: section id}
+        self.sources: Dict[str, str] = {}  # mirror section id -> English section id
+        self.page_pairs: List[Tuple[str, str, str]] = []  # (language, English doc id, mirror doc id)
+        self.unaligned_sections = 0
+        self._built_version: Optional[int] = None
+
+    def ensure_current(self) -> None:
+        """Rebuild the index if documents changed since it was built."""
+        version = getattr(self.doc_processor, "corpus_version", None)
+        if self._built_version != version or version is None:
+            self.build()
+            self._built_version = version
+
+    def build(self) -> None:
+        """Pair mirror pages and align their sections."""
+        self.mirrors = {}
+        self.sources = {}
+        self.page_pairs = []
+        self.unaligned_sections = 0
+        pages: Dict[Tuple[str, str], Document] = {}
+        for document in self.doc_processor.documents.values():
+            pages[page_key(document)] = document
+        for (language, path), mirror in pages.items():
+            if language == SOURCE_LANGUAGE:
+                continue
+            source = pages.get((SOURCE_LANGUAGE, path))
+            if source is None:
+                continue
+            self.page_pairs.append((language, source.id, mirror.id))
+            self._align_sections(language, source.sections, mirror.sections)
+
+    def _align_sections(
+        self,
+        language: str,
+        source_sections: List[DocumentSection],
+        mirror_sections: List[DocumentSection],
+    ) -> None:
+        """Pair sections of one page with those of its mirror by header structure."""
+        source_shape = [section_signature(section) for section in source_sections]
+        mirror_shape = [section_signature(section) for section in mirror_sections]
+        if source_shape == mirror_shape:
+            pairs = list(zip(source_sections, mirror_sections))
+        else:
+            matcher = SequenceMatcher(a=source_shape, b=mirror_shape, autojunk=False)
+            pairs = [
+                (source_sections[block.a + offset], mirror_sections[block.b + offset])
+                for block in matcher.get_matching_blocks()
+                for offset in range(block.size)
+            ]
+        for source, mirror in pairs:
+            self.mirrors.setdefault(source.id, {})[language] = mirror.id
+            self.sources[mirror.id] = source.id
+        self.unaligned_sections += len(source_sections) + len(mirror_sections) - 2 * len(pairs)
+
+    def mirrors_of(self, section_id: str) -> List[DocumentSection]:
+        """Translated counterparts of an English section."""
+        self.ensure_current()
+        return [
+            section for section in (
+                self.doc_processor.get_section_by_id(mirror_id)
+                for mirror_id in self.mirrors.get(section_id, {}).values()
+            ) if section is not None
+        ]
+
+    def source_of(self, section_id: str) -> Optional[DocumentSection]:
+        """English counterpart of a translated section."""
+        self.ensure_current()
+        source_id = self.sources.get(section_id)
+        return self.doc_processor.get_section_by_id(source_id) if source_id else None
+
+    def language_of(self, section_id: str) -> str:
+        """Language of an aligned section (English if it is not a known mirror)."""
+        self.ensure_current()
+        source_id = self.sources.get(section_id)
+        if source_id is None:
+            return SOURCE_LANGUAGE
+        for language, mirror_id in self.mirrors.get(source_id, {}).items():
+            if mirror_id == section_id:
+                return language
+        return SOURCE_LANGUAGE
+
+    def split_mirrored(self, sections: List[DocumentSection]) -> Tuple[List[DocumentSection], List[DocumentSection]]:
+        """Split sections into those to analyse and mirrors whose English source is also present."""
+        self.ensure_current()
+        present = {section.id for section in sections}
+        primary, derived = [], []
+        for section in sections:
+            if self.sources.get(section.id) in present:
+                derived.append(section)
+            else:
+                primary.append(section)
+        return primary, derived
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Page and section alignment counts."""
+        self.ensure_current()
+        return {
+            "page_pairs": len(self.page_pairs),
+            "aligned_sections": len(self.sources),
+            "unaligned_sections": self.unaligned_sections,
+        }
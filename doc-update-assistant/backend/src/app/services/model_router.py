@@ -0,0 +1,142 @@
+# Model routing service
+"""Tiered model routing: try a cheap model first and escalate when needed."""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from ..config import settings
+from ..models.document import DocumentSection
+from .usage import UsageAccumulator
+
+
+# Escalation reasons
+ESCALATE_LOW_CONFIDENCE = "low_confidence"
+ESCALATE_PARSE_ERROR = "parse_error"
+
+
+@dataclass
+class ModelTier:
+    """One model in the routing ladder."""
+    name: str
+    model: str
+
+
+@dataclass
+class TierMetrics:
+    """Call, escalation and usage counters for a tier."""
+    calls: int = 0
+    failures: int = 0
+    parse_failures: int = 0
+    escalations: int = 0
+    escalation_reasons: Dict[str, int] = field(default_factory=dict)
+    usage: UsageAccumulator = field(default_factory=UsageAccumulator)
+
+    def summary(self) -> Dict[str, Any]:
+        """Return counters, escalation rate and usage/latency totals."""
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "parse_failures": self.parse_failures,
+            "escalations": self.escalations,
+            "escalation_rate": round(self.escalations / self.calls, 3) if self.calls else 0.0,
+            "escalation_reasons": dict(self.escalation_reasons),
+            **self.usage.summary(),
+        }
+
+
+class ModelRouter:
+    """Chooses which models a section is sent to and when to escalate.
+
+    Sections are sent to the fast tier first and re-run on the strong tier
+    when the answer cannot be parsed or its confidence is below the
+    threshold. Section types listed in ``strong_section_types`` (code by
+    default) skip the fast tier. With routing disabled every call uses the
+    fast tier only.
+    """
+
+    def __init__(
+        self,
+        fast_model: Optional[str] = None,
+        strong_model: Optional[str] = None,
+        confidence_threshold: Optional[float] = None,
+        escalate_on_parse_error: Optional[bool] = None,
+        strong_section_types: Optional[List[str]] = None,
+        enabled: Optional[bool] = None,
+    ) -> None:
+        """Initialize the router, defaulting to the model routing settings."""
+        self.fast = ModelTier("fast", fast_model or settings.openai_model)
+        self.strong = ModelTier("strong", strong_model or settings.llm_escalation_model)
+        self.confidence_threshold = (
+            settings.llm_escalation_confidence_threshold
+            if confidence_threshold is None else confidence_threshold
+        )
+        self.escalate_on_parse_error = (
+            settings.llm_escalate_on_parse_error
+            if escalate_on_parse_error is None else escalate_on_parse_error
+        )
+        self.strong_section_types = set(
+            settings.llm_strong_section_types if strong_section_types is None else strong_section_types
+        )
+        self.enabled = settings.llm_routing_enabled if enabled is None else enabled
+        self.metrics: Dict[str, TierMetrics] = {
+            self.fast.name: TierMetrics(),
+            self.strong.name: TierMetrics(),
+        }
+        self.routed_direct = 0
+
+    def route(self, section: DocumentSection) -> List[ModelTier]:
+        """Return the tiers to try for a section, in order."""
+        if not self.enabled or self.fast.model == self.strong.model:
+            return [self.fast]
+        section_type = getattr(section.section_type, "value", section.section_type)
+        if section_type in self.strong_section_types:
+            self.routed_direct += 1
+            return [self.strong]
+        return [self.fast, self.strong]
+
+    def escalation_reason(self, parsed: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Why a tier's answer should be retried on the next tier, or None to accept it."""
+        if parsed is None:
+            return ESCALATE_PARSE_ERROR if self.escalate_on_parse_error else None
+        try:
+            confidence = float(parsed.get("confidence", 0.0))
+        except (TypeError, ValueError):
+            confidence = 0.0
+        if confidence < self.confidence_threshold:
+            return ESCALATE_LOW_CONFIDENCE
+        return None
+
+    def record(
+        self,
+        tier: ModelTier,
+        usage: UsageAccumulator,
+        failed: bool = False,
+        parse_failed: bool = False,
+        escalation_reason: Optional[str] = None,
+    ) -> None:
+        """Record the outcome of one call on a tier."""
+        metrics = self.metrics[tier.name]
+        metrics.calls += 1
+        metrics.usage.merge(usage)
+        if failed:
+            metrics.failures += 1
+        if parse_failed:
+            metrics.parse_failures += 1
+        if escalation_reason:
+            metrics.escalations += 1
+            metrics.escalation_reasons[escalation_reason] = (
+                metrics.escalation_reasons.get(escalation_reason, 0) + 1
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Routing configuration and per-tier metrics."""
+        return {
+            "enabled": self.enabled,
+            "confidence_threshold": self.confidence_threshold,
+            "strong_section_types": sorted(self.strong_section_types),
+            "routed_direct_to_strong": self.routed_direct,
+            "tiers": {
+                tier.name: {"model": tier.model, **self.metrics[tier.name].summary()}
+                for tier in (self.fast, self.strong)
+            },
+        }
@@ -0,0 +1,301 @@
+# Pre-filter service
+"""Cheap local relevance pre-filter that skips LLM calls for irrelevant sections."""
+
+import json
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import settings
+from ..models.document import DocumentSection
+from ..utils.helpers import extract_identifiers
+from ..utils.logger import ai_logger, line_file_logger
+from .ai_service import CONCEPT_KEYWORDS
+
+
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "now", "new", "was", "are",
+    "has", "have", "from", "into", "all", "can", "should", "will", "when",
+    "use", "uses", "used", "added", "add", "update", "updated", "change",
+    "changed", "docs", "documentation", "section", "please", "which",
+}
+
+
+@dataclass
+class PreFilterContext:
+    """Query features shared by all pre-filter signals."""
+    query: str
+    keywords: List[str]
+    identifiers: List[str]
+    concepts: List[str]
+    query_embedding: Optional[np.ndarray] = None
+
+
+@dataclass
+class PreFilterResult:
+    """Outcome of pre-filtering a list of search results."""
+    kept: List[DocumentSection]
+    skipped: List[DocumentSection]
+    scores: Dict[str, float] = field(default_factory=dict)
+    signal_scores: Dict[str, Dict[str, Optional[float]]] = field(default_factory=dict)
+
+
+class PreFilterSignal(ABC):
+    """A relevance signal scoring a section for a query in [0, 1].
+
+    Returning None means the signal has nothing to say for this query (e.g. no
+    embedding available) and is left out of the weighted combination.
+    """
+    name = "signal"
+
+    @abstractmethod
+    def score(self, section: DocumentSection, context: PreFilterContext) -> Optional[float]:
+        """Score a section's relevance to the query."""
+
+
+class EmbeddingSimilaritySignal(PreFilterSignal):
+    """Cosine similarity between the query and section embeddings, rescaled to [0, 1]."""
+    name = "embedding"
+
+    def __init__(
+        self,
+        doc_processor: Any,
+        floor: Optional[float] = None,
+        ceiling: Optional[float] = None,
+    ) -> None:
+        """Initialize with the processor holding section embeddings and the similarity range to rescale."""
+        self.doc_processor = doc_processor
+        self.floor = settings.prefilter_similarity_floor if floor is None else floor
+        self.ceiling = settings.prefilter_similarity_ceiling if ceiling is None else ceiling
+
+    def score(self, section: DocumentSection, context: PreFilterContext) -> Optional[float]:
+        """Score a section by embedding similarity to the query."""
+        section_embedding = self.doc_processor.embeddings.get(section.id)
+        if context.query_embedding is None or section_embedding is None:
+            return None
+        norms = np.linalg.norm(context.query_embedding) * np.linalg.norm(section_embedding)
+        if norms == 0:
+            return 0.0
+        similarity = float(np.dot(context.query_embedding, section_embedding) / norms)
+        scaled = (similarity - self.floor) / (self.ceiling - self.floor)
+        return min(max(scaled, 0.0), 1.0)
+
+
+class IdentifierOverlapSignal(PreFilterSignal):
+    """Overlap of query identifiers and keywords with the section text."""
+    name = "lexical"
+
+    def __init__(self, identifier_weight: float = 0.7) -> None:
+        """Initialize with the share of the score given to identifier matches."""
+        self.identifier_weight = identifier_weight
+
+    def score(self, section: DocumentSection, context: PreFilterContext) -> Optional[float]:
+        """Score a section by the fraction of query identifiers and keywords it mentions."""
+        if not context.identifiers and not context.keywords:
+            return None
+        text = f"{section.title}\n{section.content}"
+        text_lower = text.lower()
+        keyword_score = (
+            sum(1 for keyword in context.keywords if keyword in text_lower) / len(context.keywords)
+            if context.keywords else 0.0
+        )
+        if not context.identifiers:
+            return keyword_score
+        identifier_score = sum(
+            1 for identifier in context.identifiers
+            if identifier in text or identifier.split('.')[-1] in text
+        ) / len(context.identifiers)
+        return (
+            self.identifier_weight * identifier_score
+            + (1 - self.identifier_weight) * keyword_score
+        )
+
+
+class ConceptSignal(PreFilterSignal):
+    """Whether the section discusses the SDK concepts detected in the query."""
+    name = "concept"
+
+    def score(self, section: DocumentSection, context: PreFilterContext) -> Optional[float]:
+        """Score a section by the fraction of query concepts it covers."""
+        if not context.concepts:
+            return None
+        text_lower = f"{section.title}\n{section.content}".lower()
+        covered = sum(
+            1 for concept in context.concepts
+            if any(keyword in text_lower for keyword in CONCEPT_KEYWORDS.get(concept, [concept]))
+        )
+        return covered / len(context.concepts)
+
+
+class SectionPreFilter:
+    """Weighted combination of pre-filter signals with a tunable keep threshold.
+
+    Raising the threshold skips more LLM calls (precision); lowering it sends
+    more sections to the model (recall). The ``min_keep`` best sections are
+    always kept so a query never ends up with nothing to analyze.
+    """
+
+    def __init__(
+        self,
+        signals: List[Tuple[PreFilterSignal, float]],
+        threshold: Optional[float] = None,
+        min_keep: Optional[int] = None,
+        doc_processor: Any = None,
+    ) -> None:
+        """Initialize the pre-filter with weighted signals and an optional processor for query embeddings."""
+        self.signals = signals
+        self.threshold = settings.prefilter_threshold if threshold is None else threshold
+        self.min_keep = settings.prefilter_min_keep if min_keep is None else min_keep
+        self.doc_processor = doc_processor
+        self.total_considered = 0
+        self.total_skipped = 0
+
+    @classmethod
+    def default(cls, doc_processor: Any) -> "SectionPreFilter":
+        """Build the default embedding + lexical + concept pre-filter."""
+        return cls(
+            signals=[
+                (EmbeddingSimilaritySignal(doc_processor), 0.5),
+                (IdentifierOverlapSignal(), 0.3),
+                (ConceptSignal(), 0.2),
+            ],
+            doc_processor=doc_processor,
+        )
+
+    async def build_context(
+        self,
+        query: str,
+        change_context: Optional[dict[str, Any]] = None,
+    ) -> PreFilterContext:
+        """Extract the query features used by the signals."""
+        query_lower = query.lower()
+        keywords = [
+            term for term in dict.fromkeys(re.findall(r'[a-z_][a-z0-9_]{2,}', query_lower))
+            if term not in STOPWORDS
+        ]
+        if change_context and "affected_concepts" in change_context:
+            concepts = list(change_context["affected_concepts"])
+        else:
+            concepts = [
+                concept for concept, concept_keywords in CONCEPT_KEYWORDS.items()
+                if any(keyword in query_lower for keyword in concept_keywords)
+            ]
+        query_embedding = None
+        if self.doc_processor is not None and self.doc_processor.embeddings:
+            query_embedding = await self.doc_processor.get_query_embedding(query)
+        return PreFilterContext(
+            query=query,
+            keywords=keywords,
+            identifiers=extract_identifiers(query),
+            concepts=concepts,
+            query_embedding=query_embedding,
+        )
+
+    def score_signals(self, section: DocumentSection, context: PreFilterContext) -> Dict[str, Optional[float]]:
+        """Score a section with every signal, keyed by signal name."""
+        return {signal.name: signal.score(section, context) for signal, _ in self.signals}
+
+    def score_section(
+        self,
+        section: DocumentSection,
+        context: PreFilterContext,
+        signal_scores: Optional[Dict[str, Optional[float]]] = None,
+    ) -> Optional[float]:
+        """Combine the available signal scores for a section, or None if no signal applies."""
+        if signal_scores is None:
+            signal_scores = self.score_signals(section, context)
+        weighted_sum = 0.0
+        total_weight = 0.0
+        for signal, weight in self.signals:
+            signal_score = signal_scores[signal.name]
+            if signal_score is None:
+                continue
+            weighted_sum += weight * signal_score
+            total_weight += weight
+        if total_weight == 0:
+            return None
+        return weighted_sum / total_weight
+
+    def apply(
+        self,
+        sections: List[DocumentSection],
+        context: PreFilterContext,
+        threshold: Optional[float] = None,
+    ) -> PreFilterResult:
+        """Split sections into kept and skipped using precomputed query features."""
+        threshold = self.threshold if threshold is None else threshold
+        scores: Dict[str, float] = {}
+        signal_scores: Dict[str, Dict[str, Optional[float]]] = {}
+        for section in sections:
+            signal_scores[section.id] = self.score_signals(section, context)
+            section_score = self.score_section(section, context, signal_scores[section.id])
+            # Without any signal we cannot judge the section, so let the LLM decide
+            scores[section.id] = 1.0 if section_score is None else section_score
+
+        ranked = sorted(sections, key=lambda s: scores[s.id], reverse=True)
+        always_kept = {s.id for s in ranked[:self.min_keep]}
+        kept = [s for s in sections if s.id in always_kept or scores[s.id] >= threshold]
+        kept_ids = {s.id for s in kept}
+        skipped = [s for s in sections if s.id not in kept_ids]
+        return PreFilterResult(kept=kept, skipped=skipped, scores=scores, signal_scores=signal_scores)
+
+    async def filter(
+        self,
+        query: str,
+        sections: List[DocumentSection],
+        change_context: Optional[dict[str, Any]] = None,
+    ) -> PreFilterResult:
+        """Pre-filter search results before they are sent to the LLM."""
+        if not sections:
+            return PreFilterResult(kept=[], skipped=[])
+        context = await self.build_context(query, change_context)
+        result = self.apply(sections, context)
+        self.total_considered += len(sections)
+        self.total_skipped += len(result.skipped)
+        ai_logger.info(
+            f"Pre-filter skipped {len(result.skipped)}/{len(sections)} LLM calls "
+            f"(threshold={self.threshold:.2f}, lifetime skipped "
+            f"{self.total_skipped}/{self.total_considered})"
+        )
+        self._record_decisions(query, result)
+        return result
+
+    def _record_decisions(self, query: str, result: PreFilterResult) -> None:
+        """Append every keep/skip decision with its scores to the verdict log.
+
+        Skipped sections never reach the model, so these records are what
+        lets the evaluation harness see which sections the pre-filter dropped
+        and measure the recall lost on them.
+        """
+        log_path = settings.prefilter_verdict_log_path
+        if not log_path:
+            return
+        verdict_log = line_file_logger(log_path)
+        recorded_at = datetime.now().isoformat()
+        for kept, sections in ((True, result.kept), (False, result.skipped)):
+            for section in sections:
+                verdict_log.info(json.dumps({
+                    "type": "prefilter",
+                    "query": query,
+                    "section_id": section.id,
+                    "file_path": section.file_path,
+                    "title": section.title,
+                    "kept": kept,
+                    "score": result.scores.get(section.id),
+                    "signal_scores": result.signal_scores.get(section.id, {}),
+                    "threshold": self.threshold,
+                    "recorded_at": recorded_at,
+                }))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return lifetime pre-filter counters."""
+        return {
+            "threshold": self.threshold,
+            "sections_considered": self.total_considered,
+            "llm_calls_skipped": self.total_skipped,
+            "skip_rate": self.total_skipped / self.total_considered if self.total_considered else 0.0,
+        }
@@ -0,0 +1,202 @@
+# Section tree service
+"""Header hierarchy index over document sections and ancestor context assembly."""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from ..models.document import Document, DocumentSection
+
+
+# Characters kept from a section's lead paragraph as its summary
+SUMMARY_MAX_CHARS = 240
+
+_MARKUP = re.compile(r"[*_`>\[\]]|\(http[^)]*\)")
+
+
+def summarize_section(content: str, max_chars: int = SUMMARY_MAX_CHARS) -> str:
+    """First prose paragraph of a section (code, lists and tables skipped), shortened."""
+    in_fence = False
+    for paragraph in re.split(r"\n\s*\n", content):
+        stripped = paragraph.strip()
+        # Code blocks may contain blank lines; track fences across paragraphs
+        odd_fences = stripped.count("```") % 2 == 1
+        if in_fence or stripped.startswith("```"):
+            in_fence = in_fence != odd_fences
+            continue
+        if not stripped or stripped[0] in "-*|!<":
+            continue
+        text = " ".join(_MARKUP.sub("", stripped).split())
+        if len(text) <= max_chars:
+            return text
+        return text[:max_chars].rsplit(" ", 1)[0] + "..."
+    return ""
+
+
+@dataclass
+class SectionNode:
+    """Position of a section in its document's header hierarchy."""
+    section_id: str
+    document_id: str
+    title: str
+    level: int
+    position: int
+    summary: str = ""
+    parent_id: Optional[str] = None
+    children: List[str] = field(default_factory=list)
+    prev_sibling_id: Optional[str] = None
+    next_sibling_id: Optional[str] = None
+    depth: int = 0
+
+
+@dataclass
+class SectionContext:
+    """Ancestor context assembled for a section within a token budget."""
+    section_id: str
+    breadcrumb: List[str]
+    text: str
+    tokens: int
+    ancestors_included: int
+    ancestors_total: int
+
+
+class SectionTreeIndex:
+    """Parent/child/sibling links between sections, built once per document at ingestion.
+
+    Sections are nested by header level: a section's parent is the nearest
+    preceding section with a lower level. All navigation is a dictionary
+    lookup on the section id; nothing re-scans ``document.sections``.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty index."""
+        self.nodes: Dict[str, SectionNode] = {}
+        self.roots: Dict[str, List[str]] = {}  # document id -> top-level section ids
+
+    def add_document(self, document: Document) -> None:
+        """Index a document's sections, replacing any earlier version of it."""
+        self.remove_document(document.id)
+        roots: List[str] = []
+        stack: List[SectionNode] = []
+        for position, section in enumerate(document.sections):
+            node = SectionNode(
+                section_id=section.id,
+                document_id=document.id,
+                title=section.title,
+                level=section.metadata.get("header_level", 1) or 1,
+                position=position,
+                summary=summarize_section(section.content),
+            )
+            while stack and stack[-1].level >= node.level:
+                stack.pop()
+            siblings = stack[-1].children if stack else roots
+            if stack:
+                node.parent_id = stack[-1].section_id
+                node.depth = stack[-1].depth + 1
+            if siblings:
+                node.prev_sibling_id = siblings[-1]
+                self.nodes[siblings[-1]].next_sibling_id = node.section_id
+            siblings.append(node.section_id)
+            self.nodes[node.section_id] = node
+            stack.append(node)
+        self.roots[document.id] = roots
+
+    def remove_document(self, document_id: str) -> None:
+        """Drop a document's sections from the index."""
+        pending = list(self.roots.pop(document_id, []))
+        while pending:
+            node = self.nodes.pop(pending.pop(), None)
+            if node is not None:
+                pending.extend(node.children)
+
+    def node(self, section_id: str) -> Optional[SectionNode]:
+        """The tree node for a section."""
+        return self.nodes.get(section_id)
+
+    def parent(self, section_id: str) -> Optional[SectionNode]:
+        """The enclosing section, if any."""
+        node = self.nodes.get(section_id)
+        return self.nodes.get(node.parent_id) if node and node.parent_id else None
+
+    def children(self, section_id: str) -> List[SectionNode]:
+        """Direct subsections in document order."""
+        node = self.nodes.get(section_id)
+        return [self.nodes[child_id] for child_id in node.children] if node else []
+
+    def siblings(self, section_id: str) -> List[SectionNode]:
+        """Sections sharing the same parent (excluding the section itself)."""
+        node = self.nodes.get(section_id)
+        if node is None:
+            return []
+        ids = self.nodes[node.parent_id].children if node.parent_id else self.roots.get(node.document_id, [])
+        return [self.nodes[sibling_id] for sibling_id in ids if sibling_id != section_id]
+
+    def ancestors(self, section_id: str) -> List[SectionNode]:
+        """Enclosing sections from the nearest outwards."""
+        result = []
+        node = self.parent(section_id)
+        while node is not None:
+            result.append(node)
+            node = self.nodes.get(node.parent_id) if node.parent_id else None
+        return result
+
+    def breadcrumb(self, section_id: str) -> List[str]:
+        """Heading titles from the top of the page down to the section."""
+        node = self.nodes.get(section_id)
+        if node is None:
+            return []
+        return [ancestor.title for ancestor in reversed(self.ancestors(section_id))] + [node.title]
+
+    def outline(self, document_id: str) -> List[Dict[str, Any]]:
+        """Nested heading outline of a document."""
+        def render(section_id: str) -> Dict[str, Any]:
+            node = self.nodes[section_id]
+            return {
+                "section_id": node.section_id,
+                "title": node.title,
+                "level": node.level,
+                "children": [render(child_id) for child_id in node.children],
+            }
+        return [render(section_id) for section_id in self.roots.get(document_id, [])]
+
+    def assemble_context(
+        self,
+        section: DocumentSection,
+        max_tokens: int,
+        count_tokens: Callable[[str], int],
+    ) -> SectionContext:
+        """Heading path plus ancestor summaries for a section, nearest ancestor first, within ``max_tokens``.
+
+        The breadcrumb is always included if it fits; ancestor summaries are
+        added from the closest parent outwards until the budget runs out.
+        """
+        breadcrumb = self.breadcrumb(section.id) or [section.title]
+        ancestors = self.ancestors(section.id)
+        path_line = "Location: " + " > ".join(breadcrumb)
+        used = count_tokens(path_line)
+        if used > max_tokens:
+            return SectionContext(section.id, breadcrumb, "", 0, 0, len(ancestors))
+
+        summaries: List[str] = []
+        for ancestor in ancestors:
+            if not ancestor.summary:
+                continue
+            line = f"{'#' * ancestor.level} {ancestor.title}: {ancestor.summary}"
+            cost = count_tokens(line)
+            if used + cost > max_tokens:
+                break
+            summaries.append(line)
+            used += cost
+        # Outermost heading first reads naturally
+        text = "\n".join([path_line, *reversed(summaries)])
+        return SectionContext(section.id, breadcrumb, text, used, len(summaries), len(ancestors))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index size and shape."""
+        depths = [node.depth for node in self.nodes.values()]
+        return {
+            "documents": len(self.roots),
+            "sections": len(self.nodes),
+            "root_sections": sum(len(roots) for roots in self.roots.values()),
+            "max_depth": max(depths) if depths else 0,
+        }
@@ -0,0 +1,188 @@
+# Semantic cache service
+"""Reuse of suggestion batches for near-duplicate queries."""
+
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..config import settings
+from ..models.suggestion import SuggestionBatch, UpdateSuggestion
+from ..utils.content_store import content_store
+from ..utils.helpers import extract_identifiers, generate_hash
+
+
+# Terms that flip the meaning of otherwise near-identical change descriptions
+POLARITY_TERMS = (
+    "remove", "deprecat", "no longer", "not ", "n't", "drop", "rename",
+    "replace", "disable", "instead of",
+)
+
+
+@dataclass
+class CacheEntry:
+    """A generated batch with the query embedding and section hashes it was built from."""
+    batch: SuggestionBatch
+    embedding: np.ndarray
+    identifiers: frozenset
+    polarity: frozenset
+    section_hashes: Dict[str, str]
+    stored_at: float
+
+
+@dataclass
+class CacheHit:
+    """A cached batch that matched a new query."""
+    batch: SuggestionBatch
+    similarity: float
+
+
+def query_signature(query: str) -> tuple:
+    """Identifiers and polarity terms a cached query must share with a new one."""
+    query_lower = query.lower()
+    identifiers = frozenset(identifier.lower() for identifier in extract_identifiers(query))
+    polarity = frozenset(term for term in POLARITY_TERMS if term in query_lower)
+    return identifiers, polarity
+
+
+class SemanticSuggestionCache:
+    """Maps query embeddings to previously generated suggestion batches.
+
+    A new query hits when its embedding is at least ``threshold`` cosine
+    similar to a cached query, it names the same code identifiers and
+    carries the same polarity terms ("removed", "no longer", ...), which
+    embeddings alone barely distinguish. The hit is then validated: every
+    section the batch was generated from must still exist with the same
+    content hash, otherwise the entry is dropped.
+    """
+
+    def __init__(
+        self,
+        doc_processor: Any,
+        threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ) -> None:
+        """Initialize the cache, falling back to settings."""
+        self.doc_processor = doc_processor
+        self.threshold = settings.semantic_cache_threshold if threshold is None else threshold
+        self.max_entries = settings.semantic_cache_max_entries if max_entries is None else max_entries
+        self.ttl_seconds = settings.semantic_cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "invalidated": 0, "stored": 0}
+
+    async def lookup(self, query: str) -> Optional[CacheHit]:
+        """Return a still-valid cached batch for a near-duplicate query, if any."""
+        if not self.entries:
+            self.stats["misses"] += 1
+            return None
+        embedding = await self._embed(query)
+        if embedding is None:
+            self.stats["misses"] += 1
+            return None
+        identifiers, polarity = query_signature(query)
+        now = time.monotonic()
+
+        candidates = []
+        for batch_id, entry in list(self.entries.items()):
+            if now - entry.stored_at > self.ttl_seconds:
+                del self.entries[batch_id]
+                continue
+            if entry.identifiers != identifiers or entry.polarity != polarity:
+                continue
+            similarity = float(np.dot(embedding, entry.embedding))
+            if similarity >= self.threshold:
+                candidates.append((similarity, batch_id, entry))
+
+        for similarity, batch_id, entry in sorted(candidates, key=lambda item: item[0], reverse=True):
+            if not self._is_valid(entry):
+                del self.entries[batch_id]
+                self.stats["invalidated"] += 1
+                continue
+            self.entries.move_to_end(batch_id)
+            self.stats["hits"] += 1
+            return CacheHit(batch=entry.batch, similarity=similarity)
+
+        self.stats["misses"] += 1
+        return None
+
+    async def store(
+        self,
+        query: str,
+        suggestions: List[UpdateSuggestion],
+        section_ids: List[str],
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Optional[SuggestionBatch]:
+        """Cache the batch generated for a query from the given sections.
+
+        The batch holds copies, so later reviews and edits of the stored
+        suggestions do not change what the cache hands out.
+        """
+        embedding = await self._embed(query)
+        if embedding is None:
+            return None
+        section_hashes = {}
+        for section_id in section_ids:
+            section = self.doc_processor.get_section_by_id(section_id)
+            if section is None:
+                return None
+            section_hashes[section_id] = generate_hash(section.content or "")
+        batch = SuggestionBatch(
+            id=str(uuid.uuid4()),
+            query=query,
+            suggestions=[suggestion.model_copy(deep=True) for suggestion in suggestions],
+            created_at=datetime.now(),
+            metadata=metadata or {},
+        )
+        identifiers, polarity = query_signature(query)
+        self.entries[batch.id] = CacheEntry(
+            batch=batch,
+            embedding=embedding,
+            identifiers=identifiers,
+            polarity=polarity,
+            section_hashes=section_hashes,
+            stored_at=time.monotonic(),
+        )
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self.stats["stored"] += 1
+        return batch
+
+    def clear(self) -> None:
+        """Drop all cached batches."""
+        self.entries.clear()
+
+    def _is_valid(self, entry: CacheEntry) -> bool:
+        """Whether every source section still has the content the batch was built from.
+        
+        The batch also needs its suggestions' original content, which the
+        content store may have evicted once no stored suggestion used it.
+        """
+        for section_id, content_hash in entry.section_hashes.items():
+            section = self.doc_processor.get_section_by_id(section_id)
+            if section is None or generate_hash(section.content or "") != content_hash:
+                return False
+        return not content_store.missing(suggestion.original_hash for suggestion in entry.batch.suggestions)
+
+    async def _embed(self, query: str) -> Optional[np.ndarray]:
+        """Unit-normalized query embedding, or None when embeddings are unavailable."""
+        embedding = await self.doc_processor.get_query_embedding(query)
+        if embedding is None:
+            return None
+        vector = np.asarray(embedding, dtype=float)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and size."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self.entries),
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            "threshold": self.threshold,
+        }
@@ -1,28 +1,98 @@
 # Storage service
 """Storage service for documents and suggestions."""
 
-import json
+import asyncio
+import itertools
 import os
+import threading
+import time
+import uuid
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import orjson
 
 from ..models.document import Document, DocumentSection
-from ..models.suggestion import UpdateSuggestion
+from ..models.job import SuggestionJob
+from ..models.suggestion import SuggestionBatch, UpdateSuggestion
+from ..utils.content_store import content_store
 from ..utils.exceptions import StorageError
+from ..utils.logger import app_logger
 
 
 class StorageService:
-    """Handles storage operations for documents and suggestions."""
+    """Handles storage operations for documents and suggestions.
+    
+    File I/O runs in the default executor so it never blocks the event loop.
+    Every write goes to a temporary file that is fsynced and renamed over the
+    target, so a crash leaves either the old or the new file, never a torn
+    one. Batch saves write all their files in one executor call and fsync
+    each directory once. File listings are read from disk once per
+    directory and then kept up to date by this service's own writes.
+    
+    File counts and byte totals per directory are likewise updated on every
+    save and delete, persisted to ``stats.json`` shortly afterwards, and
+    reconciled against a directory scan in the background when they are
+    older than ``reconcile_interval`` seconds, so stats never walk the tree
+    on the request path.
+    
+    Replacing or removing a file and reading the size it replaces happen
+    under a lock striped by path, so concurrent writes of one path each see
+    the size the other left and the counters add up. Each such change gets
+    a sequence number, which lets a reconcile tell which changes its
+    snapshot of a file already includes. Changes are recorded in the order
+    their threads finish: their count and size deltas add up in any order,
+    but a listing only follows a path's highest sequence recorded so far.
+    """
     
-    def __init__(self, storage_path: str = "data") -> None:
-        """Initialize the storage service."""
+    # Stored object directories whose files and bytes are counted
+    TRACKED = ("documents", "suggestions", "jobs", "batches", "contents")
+    STATS_PERSIST_DELAY = 1.0  # Seconds of counter changes batched into one stats.json write
+    
+    _PATH_LOCKS = tuple(threading.Lock() for _ in range(64))
+    _sequence = itertools.count(1)  # Orders file changes; drawn under the path's lock
+    
+    def __init__(
+        self,
+        storage_path: str = "data",
+        write_parallelism: int = 8,
+        reconcile_interval: float = 3600.0
+    ) -> None:
+        """Initialize the storage service; batches are written by up to ``write_parallelism`` threads."""
         self.storage_path = Path(storage_path)
         self.documents_path = self.storage_path / "documents"
         self.suggestions_path = self.storage_path / "suggestions"
+        self.jobs_path = self.storage_path / "jobs"
+        self.batches_path = self.storage_path / "batches"
+        self.contents_path = self.storage_path / "contents"
         
         # Create directories if they don't exist
         self.documents_path.mkdir(parents=True, exist_ok=True)
+        self.contents_path.mkdir(parents=True, exist_ok=True)
         self.suggestions_path.mkdir(parents=True, exist_ok=True)
+        self.jobs_path.mkdir(parents=True, exist_ok=True)
+        self.batches_path.mkdir(parents=True, exist_ok=True)
+        
+        # Stems of the JSON files in each directory, loaded on first listing
+        self._listings: Dict[Path, Set[str]] = {}
+        self.write_parallelism = max(write_parallelism, 1)
+        self.min_chunk_size = 8
+        
+        # Incremental per-directory counters, seeded from the last persisted snapshot
+        self.stats_path = self.storage_path / "stats.json"
+        self.reconcile_interval = reconcile_interval
+        self._counters: Dict[str, Dict[str, int]] = {name: {"files": 0, "bytes": 0} for name in self.TRACKED}
+        self._other_bytes = 0  # Files outside the tracked directories, as of the last reconcile
+        self._reconciled_at: Optional[float] = None
+        self._in_flight: Dict[Path, int] = {}  # Paths with writes or deletes not yet recorded
+        self._journal: Optional[List[Tuple[Path, Optional[int], Optional[int], int]]] = None  # While reconciling
+        self._touched: Optional[Set[Path]] = None  # Paths changed while reconciling
+        self._stale: Dict[Path, int] = {}  # Changes up to this sequence are already in the counters
+        self._applied: Dict[Path, int] = {}  # Sequence the listing reflects, while changes are in flight
+        self._stats_dirty = False
+        self._persist_task: Optional[asyncio.Task] = None
+        self._reconcile_task: Optional[asyncio.Task] = None
+        self._load_stats_snapshot()
     
     async def save_document(self, document: Document) -> bool:
         """Save a document to storage."""
@@ -31,6 +101,12 @@ class StorageService:
             document.model_dump()
         )
     
+    async def save_documents(self, documents: Iterable[Document]) -> int:
+        """Save several documents in one batch; returns the number written."""
+        return await self._save_json_files([
+            (self.documents_path / f"{document.id}.json", document.model_dump()) for document in documents
+        ])
+    
     async def load_document(self, document_id: str) -> Optional[Document]:
         """Load a document from storage."""
         data = await self._load_json_file(self.documents_path / f"{document_id}.json")
@@ -46,15 +122,27 @@ class StorageService:
     
     async def save_suggestion(self, suggestion: UpdateSuggestion) -> bool:
         """Save a suggestion to storage."""
+        await self._save_contents([suggestion])
         return await self._save_json_file(
             self.suggestions_path / f"{suggestion.id}.json",
             suggestion.model_dump()
         )
     
+    async def save_suggestions(self, suggestions: Iterable[UpdateSuggestion]) -> int:
+        """Save several suggestions (and the contents they reference) in one batch; returns the number written."""
+        suggestions = list(suggestions)
+        await self._save_contents(suggestions)
+        return await self._save_json_files([
+            (self.suggestions_path / f"{suggestion.id}.json", suggestion.model_dump()) for suggestion in suggestions
+        ])
+    
     async def load_suggestion(self, suggestion_id: str) -> Optional[UpdateSuggestion]:
         """Load a suggestion from storage."""
         data = await self._load_json_file(self.suggestions_path / f"{suggestion_id}.json")
-        return UpdateSuggestion(**data) if data else None
+        if not data:
+            return None
+        await self._load_contents([data])
+        return UpdateSuggestion(**data)
     
     async def delete_suggestion(self, suggestion_id: str) -> bool:
         """Delete a suggestion from storage."""
@@ -64,56 +152,420 @@ class StorageService:
         """List all stored suggestion IDs."""
         return await self._list_json_files(self.suggestions_path)
     
-    async def get_storage_stats(self) -> Dict[str, int]:
-        """Get storage statistics."""
+    async def save_job(self, job: SuggestionJob) -> bool:
+        """Save a background job and its results to storage."""
+        await self._save_contents(job.suggestions)
+        return await self._save_json_file(
+            self.jobs_path / f"{job.id}.json",
+            job.model_dump()
+        )
+    
+    async def load_job(self, job_id: str) -> Optional[SuggestionJob]:
+        """Load a background job from storage."""
+        data = await self._load_json_file(self.jobs_path / f"{job_id}.json")
+        if not data:
+            return None
+        await self._load_contents(data.get("suggestions", []))
+        return SuggestionJob(**data)
+    
+    async def list_jobs(self) -> List[str]:
+        """List all stored job IDs."""
+        return await self._list_json_files(self.jobs_path)
+    
+    async def save_batch(self, batch: SuggestionBatch) -> bool:
+        """Save a suggestion batch to storage."""
+        await self._save_contents(batch.suggestions)
+        return await self._save_json_file(
+            self.batches_path / f"{batch.id}.json",
+            batch.model_dump()
+        )
+    
+    async def load_batch(self, batch_id: str) -> Optional[SuggestionBatch]:
+        """Load a suggestion batch from storage."""
+        data = await self._load_json_file(self.batches_path / f"{batch_id}.json")
+        if not data:
+            return None
+        await self._load_contents(data.get("suggestions", []))
+        return SuggestionBatch(**data)
+    
+    async def get_storage_stats(self) -> Dict[str, Any]:
+        """Get storage statistics from the incremental counters.
+        
+        Only the first call without a persisted snapshot scans the storage
+        tree; afterwards stale counters are reconciled in the background.
+        """
+        if self._reconciled_at is None and not self.stats_path.exists():
+            await self.reconcile_stats()
+        elif self._reconciled_at is None or time.time() - self._reconciled_at > self.reconcile_interval:
+            if self._reconcile_task is None or self._reconcile_task.done():
+                self._reconcile_task = asyncio.create_task(self.reconcile_stats())
+        tracked_bytes = sum(counter["bytes"] for counter in self._counters.values())
         return {
-            "total_documents": len(list(self.documents_path.glob("*.json"))),
-            "total_suggestions": len(list(self.suggestions_path.glob("*.json"))),
-            "storage_size_bytes": self._get_directory_size(self.storage_path)
+            "total_documents": self._counters["documents"]["files"],
+            "total_suggestions": self._counters["suggestions"]["files"],
+            "storage_size_bytes": tracked_bytes + self._other_bytes,
+            "by_directory": {name: dict(counter) for name, counter in self._counters.items()},
+            "reconciled_at": self._reconciled_at,
         }
     
-    def _get_directory_size(self, path: Path) -> int:
-        """Get total size of a directory in bytes."""
-        total_size = 0
+    async def reconcile_stats(self) -> None:
+        """Replace the counters and listings with a fresh scan of the storage tree.
         
-        for file_path in path.rglob("*"):
-            if file_path.is_file():
-                total_size += file_path.stat().st_size
+        The scan may or may not see a file written or deleted while it runs,
+        so every path changed during the scan is stat-ed again afterwards
+        under its lock. The changes recorded since that stat are applied on
+        top, and ones still in flight are skipped if the stat included them.
+        """
+        self._journal, self._touched = [], set(self._in_flight)
+        try:
+            sizes, other_bytes = await asyncio.to_thread(self._scan_storage)
+            restated = await asyncio.to_thread(self._stat_paths, list(self._touched))
+        finally:
+            journal, self._journal, self._touched = self._journal, None, None
         
-        return total_size
-
+        for file_path, (size, sequence) in restated.items():
+            files = self._tracked_files(sizes, file_path)
+            if files is not None:
+                if size is None:
+                    files.pop(file_path.stem, None)
+                else:
+                    files[file_path.stem] = size
+            if file_path in self._in_flight:
+                self._stale[file_path] = sequence
+        self._counters = {name: {"files": len(files), "bytes": sum(files.values())} for name, files in sizes.items()}
+        self._other_bytes = other_bytes
+        for name, files in sizes.items():
+            self._listings[self.storage_path / name] = set(files)
+        # The listings now reflect each restated path as of its stat, and every other path before its changes
+        self._applied = {file_path: sequence for file_path, (_, sequence) in restated.items()}
+        for file_path, old_size, new_size, sequence in journal:
+            if file_path not in restated or sequence > restated[file_path][1]:
+                self._apply_change(file_path, old_size, new_size, sequence)
+        for file_path in list(self._applied):
+            if file_path not in self._in_flight:
+                self._applied.pop(file_path, None)
+        self._reconciled_at = time.time()
+        await self._persist_stats()
+    
+    async def close(self) -> None:
+        """Write a final stats snapshot, marked clean so the next start trusts it."""
+        if self._persist_task is not None and not self._persist_task.done():
+            self._persist_task.cancel()
+        await self._persist_stats(clean=True)
+    
+    def _scan_storage(self) -> Tuple[Dict[str, Dict[str, int]], int]:
+        """Sizes by stem of the files in each tracked directory, plus the bytes of every other file."""
+        sizes: Dict[str, Dict[str, int]] = {}
+        for name in self.TRACKED:
+            directory = self.storage_path / name
+            suffix = self._listing_suffix(directory)
+            files: Dict[str, int] = {}
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(suffix) and not entry.name.startswith(".") and entry.is_file():
+                        try:
+                            files[entry.name[:-len(suffix)]] = entry.stat().st_size
+                        except FileNotFoundError:
+                            continue  # Removed while scanning
+            sizes[name] = files
+        
+        other_bytes = 0
+        for root, directories, files in os.walk(self.storage_path):
+            if Path(root) == self.storage_path:
+                directories[:] = [name for name in directories if name not in self.TRACKED]
+            for name in files:
+                try:
+                    other_bytes += os.stat(os.path.join(root, name)).st_size
+                except OSError:
+                    continue  # Removed while scanning
+        return sizes, other_bytes
+    
+    @classmethod
+    def _stat_paths(cls, paths: List[Path]) -> Dict[Path, Tuple[Optional[int], int]]:
+        """Size (None if missing) of each path and a sequence number after every change it includes."""
+        result = {}
+        for file_path in paths:
+            with cls._path_lock(file_path):
+                try:
+                    size: Optional[int] = os.stat(file_path).st_size
+                except FileNotFoundError:
+                    size = None
+                result[file_path] = (size, next(cls._sequence))
+        return result
+    
+    def _tracked_files(self, sizes: Dict[str, Dict[str, int]], file_path: Path) -> Optional[Dict[str, int]]:
+        """The scanned sizes of the tracked directory a path is counted in, if any."""
+        directory = file_path.parent
+        if directory.parent != self.storage_path or file_path.suffix != self._listing_suffix(directory):
+            return None
+        return sizes.get(directory.name)
+    
+    def _load_stats_snapshot(self) -> None:
+        """Seed the counters from ``stats.json`` if it exists and is readable."""
+        try:
+            with open(self.stats_path, 'rb') as f:
+                snapshot = orjson.loads(f.read())
+            for name in self.TRACKED:
+                counter = snapshot["counters"][name]
+                self._counters[name] = {"files": int(counter["files"]), "bytes": int(counter["bytes"])}
+            self._other_bytes = int(snapshot.get("other_bytes", 0))
+            # Changes after the last snapshot of an unclean shutdown are missing: reconcile soon
+            self._reconciled_at = snapshot.get("reconciled_at") if snapshot.get("clean") else None
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            app_logger.warning(f"Ignoring unreadable storage stats snapshot {self.stats_path}: {e}")
+    
+    async def _persist_stats(self, clean: bool = False) -> None:
+        """Write the counters to ``stats.json``."""
+        self._stats_dirty = False
+        payload = orjson.dumps({
+            "counters": self._counters,
+            "other_bytes": self._other_bytes,
+            "reconciled_at": self._reconciled_at,
+            "clean": clean,
+        })
+        await asyncio.to_thread(self._write_atomic, [(self.stats_path, payload)])
+    
+    async def _persist_stats_later(self) -> None:
+        """Persist the counters after a short delay, again while changes keep arriving."""
+        while True:
+            await asyncio.sleep(self.STATS_PERSIST_DELAY)
+            try:
+                await self._persist_stats()
+            except StorageError as e:
+                app_logger.warning(f"Could not persist storage stats: {e}")
+            if not self._stats_dirty:
+                return
+    
+    def _begin_changes(self, paths: Iterable[Path]) -> None:
+        """Mark writes or deletes of ``paths`` as started."""
+        for file_path in paths:
+            self._in_flight[file_path] = self._in_flight.get(file_path, 0) + 1
+            if self._touched is not None:
+                self._touched.add(file_path)
+    
+    def _end_changes(self, paths: Iterable[Path]) -> None:
+        """Mark writes or deletes of ``paths`` as recorded (or failed)."""
+        for file_path in paths:
+            remaining = self._in_flight.get(file_path, 0) - 1
+            if remaining > 0:
+                self._in_flight[file_path] = remaining
+            else:
+                self._in_flight.pop(file_path, None)
+                self._stale.pop(file_path, None)
+                self._applied.pop(file_path, None)
+    
+    def _record_change(
+        self, file_path: Path, old_size: Optional[int], new_size: Optional[int], sequence: int
+    ) -> None:
+        """Record one file write (or deletion, ``new_size`` None) made as change number ``sequence``."""
+        if self._journal is not None:
+            self._journal.append((file_path, old_size, new_size, sequence))
+            self._touched.add(file_path)
+        if sequence <= self._stale.get(file_path, 0):
+            return  # A reconcile already counted it
+        self._apply_change(file_path, old_size, new_size, sequence)
+    
+    def _apply_change(
+        self, file_path: Path, old_size: Optional[int], new_size: Optional[int], sequence: int
+    ) -> None:
+        """Apply one file write (or deletion, ``new_size`` None) to the counters and listings.
+        
+        The counters take every change's delta; the listing only follows a
+        change newer than the last one applied to the path.
+        """
+        self._stats_dirty = True
+        newest = sequence > self._applied.get(file_path, 0)
+        if newest:
+            self._applied[file_path] = sequence
+        directory = file_path.parent
+        if file_path.suffix == self._listing_suffix(directory):
+            listing = self._listings.get(directory)
+            if listing is not None and newest:
+                if new_size is None:
+                    listing.discard(file_path.stem)
+                else:
+                    listing.add(file_path.stem)
+            counter = self._counters.get(directory.name) if directory.parent == self.storage_path else None
+            if counter is not None:
+                counter["files"] += (new_size is not None) - (old_size is not None)
+                counter["bytes"] += (new_size or 0) - (old_size or 0)
+        if self._persist_task is None or self._persist_task.done():
+            self._persist_task = asyncio.create_task(self._persist_stats_later())
+    
+    async def _save_contents(self, suggestions: Iterable[UpdateSuggestion]) -> None:
+        """Write the original content referenced by suggestions, once per content hash."""
+        keys = {suggestion.original_hash for suggestion in suggestions}
+        existing = await self._listing(self.contents_path)
+        # Encoding the text unchanged keeps it byte-identical so its hash still matches
+        entries = [
+            (self.contents_path / f"{key}.txt", content_store.get(key).encode("utf-8"))
+            for key in keys - existing
+        ]
+        if entries:
+            await self._write_files(entries)
+    
+    async def _load_contents(self, records: List[Dict[str, Any]]) -> None:
+        """Load the original content referenced by stored suggestions into the content store."""
+        for key in content_store.missing(record.get("original_hash", "") for record in records):
+            file_path = self.contents_path / f"{key}.txt"
+            data = await asyncio.to_thread(self._read_bytes, file_path)
+            if data is None:
+                raise StorageError(f"Failed to load file {file_path}: not found")
+            content_store.put(data.decode("utf-8"))
+    
     async def _save_json_file(self, file_path: Path, data: Dict) -> bool:
-        """Save data to JSON file."""
+        """Save data to a JSON file atomically."""
+        await self._save_json_files([(file_path, data)])
+        return True
+
+    async def _save_json_files(self, entries: List[Tuple[Path, Dict]]) -> int:
+        """Save several JSON files atomically in one executor call."""
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, default=str)
-            return True
+            payloads = [
+                (file_path, orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+                for file_path, data in entries
+            ]
         except Exception as e:
-            raise StorageError(f"Failed to save file {file_path}: {str(e)}")
+            raise StorageError(f"Failed to serialize {len(entries)} files: {str(e)}")
+        return await self._write_files(payloads)
+
+    async def _write_files(self, entries: List[Tuple[Path, bytes]]) -> int:
+        """Write files atomically and record them in the cached listings."""
+        if not entries:
+            return 0
+        paths = [file_path for file_path, _ in entries]
+        self._begin_changes(paths)
+        try:
+            # Split large batches across executor threads so their fsyncs overlap
+            chunk_size = max(-(-len(entries) // self.write_parallelism), self.min_chunk_size)
+            results = await asyncio.gather(*(
+                asyncio.to_thread(self._write_atomic, entries[start:start + chunk_size])
+                for start in range(0, len(entries), chunk_size)
+            ))
+            for chunk in results:
+                for file_path, old_size, new_size, sequence in chunk:
+                    self._record_change(file_path, old_size, new_size, sequence)
+        finally:
+            self._end_changes(paths)
+        return len(entries)
+
+    @classmethod
+    def _path_lock(cls, file_path: Path) -> threading.Lock:
+        """Lock serializing the replacement or removal of a path with reads of its size."""
+        return cls._PATH_LOCKS[hash(file_path) % len(cls._PATH_LOCKS)]
+
+    @classmethod
+    def _write_atomic(cls, entries: List[Tuple[Path, bytes]]) -> List[Tuple[Path, Optional[int], int, int]]:
+        """Write each file to a fsynced temporary file, rename it into place, then fsync the directories.
+        
+        Returns (path, size replaced or None, size written, change sequence)
+        per file for the counters.
+        """
+        directories = set()
+        written = []
+        for file_path, payload in entries:
+            temp_path = file_path.with_name(f".{file_path.name}.{uuid.uuid4().hex}.tmp")
+            try:
+                with open(temp_path, 'wb') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                # The size replaced is read under the lock so it is the one the rename overwrites
+                with cls._path_lock(file_path):
+                    try:
+                        old_size: Optional[int] = os.stat(file_path).st_size
+                    except FileNotFoundError:
+                        old_size = None
+                    os.replace(temp_path, file_path)
+                    sequence = next(cls._sequence)
+            except Exception as e:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+                raise StorageError(f"Failed to save file {file_path}: {str(e)}")
+            directories.add(file_path.parent)
+            written.append((file_path, old_size, len(payload), sequence))
+        # Make the renames themselves durable
+        for directory in directories:
+            try:
+                fd = os.open(directory, os.O_RDONLY)
+            except OSError:
+                continue  # Directories cannot be opened on every platform
+            try:
+                os.fsync(fd)
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+        return written
+
+    @staticmethod
+    def _read_bytes(file_path: Path) -> Optional[bytes]:
+        """File contents, or None if it does not exist."""
+        try:
+            with open(file_path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            raise StorageError(f"Failed to load file {file_path}: {str(e)}")
 
     async def _load_json_file(self, file_path: Path) -> Optional[Dict]:
         """Load data from JSON file."""
+        data = await asyncio.to_thread(self._read_bytes, file_path)
+        if data is None:
+            return None
         try:
-            if not file_path.exists():
-                return None
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return orjson.loads(data)
         except Exception as e:
             raise StorageError(f"Failed to load file {file_path}: {str(e)}")
 
+    @classmethod
+    def _remove(cls, file_path: Path) -> Tuple[int, int]:
+        """Delete a file and return its size and change sequence."""
+        with cls._path_lock(file_path):
+            size = os.stat(file_path).st_size
+            os.remove(file_path)
+            return size, next(cls._sequence)
+
     async def _delete_file(self, file_path: Path) -> bool:
         """Delete a file."""
+        self._begin_changes([file_path])
         try:
-            if file_path.exists():
-                os.remove(file_path)
-                return True
-            return False
-        except Exception as e:
-            raise StorageError(f"Failed to delete file {file_path}: {str(e)}")
+            try:
+                size, sequence = await asyncio.to_thread(self._remove, file_path)
+            except FileNotFoundError:
+                return False
+            except Exception as e:
+                raise StorageError(f"Failed to delete file {file_path}: {str(e)}")
+            self._record_change(file_path, size, None, sequence)
+            return True
+        finally:
+            self._end_changes([file_path])
+
+    def _listing_suffix(self, directory: Path) -> str:
+        """File suffix tracked in a directory's listing."""
+        return ".txt" if directory == self.contents_path else ".json"
+
+    async def _listing(self, directory: Path) -> Set[str]:
+        """Cached stems of the files in a directory, scanned on first use."""
+        listing = self._listings.get(directory)
+        if listing is None:
+            suffix = self._listing_suffix(directory)
+            try:
+                names = await asyncio.to_thread(os.listdir, directory)
+            except Exception as e:
+                raise StorageError(f"Failed to list files in {directory}: {str(e)}")
+            listing = {
+                name[:-len(suffix)] for name in names
+                if name.endswith(suffix) and not name.startswith(".")
+            }
+            self._listings[directory] = listing
+        return listing
 
     async def _list_json_files(self, directory: Path) -> List[str]:
         """List all JSON file stems in directory."""
-        try:
-            return [file_path.stem for file_path in directory.glob("*.json")]
-        except Exception as e:
-            raise StorageError(f"Failed to list files in {directory}: {str(e)}")
+        return sorted(await self._listing(directory))
@@ -0,0 +1,225 @@
+# Suggestion index service
+"""Secondary indexes over stored suggestions for sorted, filtered and paginated listing."""
+
+import base64
+import binascii
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..models.suggestion import SuggestionStatus, SuggestionType, UpdateSuggestion
+from ..utils.exceptions import ValidationError
+
+# (created_at timestamp, suggestion id): unique and in listing order
+SortKey = Tuple[float, str]
+
+
+class SortedKeys:
+    """Sorted set of keys kept as a list of bounded sublists.
+
+    Inserts and removals bisect to one sublist and shift at most about
+    ``2 * load`` items in it, instead of the whole list, so they stay cheap
+    with millions of keys. Iteration can start from any key.
+    """
+
+    def __init__(self, load: int = 512) -> None:
+        """Initialize an empty set."""
+        self.load = load
+        self.lists: List[List[SortKey]] = []
+        self.maxes: List[SortKey] = []  # Last key of each sublist
+        self.size = 0
+
+    def __len__(self) -> int:
+        """Number of keys."""
+        return self.size
+
+    def add(self, key: SortKey) -> None:
+        """Insert a key that is not present."""
+        if not self.lists:
+            self.lists.append([key])
+            self.maxes.append(key)
+            self.size = 1
+            return
+        index = min(bisect_left(self.maxes, key), len(self.maxes) - 1)
+        sublist = self.lists[index]
+        insort(sublist, key)
+        self.maxes[index] = sublist[-1]
+        if len(sublist) > 2 * self.load:
+            self.lists[index:index + 1] = [sublist[:self.load], sublist[self.load:]]
+            self.maxes[index:index + 1] = [sublist[self.load - 1], sublist[-1]]
+        self.size += 1
+
+    def remove(self, key: SortKey) -> None:
+        """Remove a key, raising KeyError if it is not present."""
+        index = bisect_left(self.maxes, key)
+        if index == len(self.maxes):
+            raise KeyError(key)
+        sublist = self.lists[index]
+        position = bisect_left(sublist, key)
+        if position == len(sublist) or sublist[position] != key:
+            raise KeyError(key)
+        del sublist[position]
+        self.size -= 1
+        if sublist:
+            self.maxes[index] = sublist[-1]
+        else:
+            del self.lists[index]
+            del self.maxes[index]
+
+    def iter_after(self, key: Optional[SortKey] = None, reverse: bool = False) -> Iterator[SortKey]:
+        """Keys after ``key`` in iteration order (all keys when None); ``reverse`` iterates descending."""
+        if not reverse:
+            index = 0 if key is None else bisect_right(self.maxes, key)
+            for list_index in range(index, len(self.lists)):
+                sublist = self.lists[list_index]
+                start = 0 if key is None or list_index > index else bisect_right(sublist, key)
+                yield from sublist[start:]
+            return
+        index = len(self.lists) - 1 if key is None else min(bisect_left(self.maxes, key), len(self.lists) - 1)
+        for list_index in range(index, -1, -1):
+            sublist = self.lists[list_index]
+            end = len(sublist) if key is None or list_index < index else bisect_left(sublist, key)
+            for position in range(end - 1, -1, -1):
+                yield sublist[position]
+
+
+def encode_cursor(key: SortKey) -> str:
+    """Opaque page cursor for a sort key."""
+    return base64.urlsafe_b64encode(f"{key[0]!r}|{key[1]}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    """Sort key from a page cursor, raising ValidationError if it is malformed."""
+    try:
+        timestamp, suggestion_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return float(timestamp), suggestion_id
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValidationError(f"Invalid cursor: {cursor}") from e
+
+
+class SuggestionIndex:
+    """Suggestions ordered by creation time, overall and per status, type, document and section.
+
+    Each (field, value) bucket is a SortedKeys of the suggestions with that
+    value, so bucket sizes double as the status and type counters. A page
+    walks the smallest bucket among the requested filters from the cursor
+    and checks the other filters per entry, costing O(page) when the
+    smallest bucket is selective. Updates cost O(log n) per field.
+    """
+
+    FIELDS = ("status", "suggestion_type", "document_id", "section_id")
+
+    def __init__(self) -> None:
+        """Initialize empty indexes."""
+        self.all = SortedKeys()
+        self.buckets: Dict[Tuple[str, Any], SortedKeys] = {}
+        self.entries: Dict[str, Tuple[SortKey, Tuple[Any, ...], float]] = {}  # id -> (key, field values, confidence)
+        self.confidence_total = 0.0
+
+    def __len__(self) -> int:
+        """Number of indexed suggestions."""
+        return len(self.entries)
+
+    @staticmethod
+    def sort_key(suggestion: UpdateSuggestion) -> SortKey:
+        """Listing key of a suggestion."""
+        return suggestion.created_at.timestamp(), suggestion.id
+
+    def update(self, suggestion: UpdateSuggestion) -> None:
+        """Index a new suggestion or move a stored one to the buckets of its current values."""
+        key = self.sort_key(suggestion)
+        values = tuple(getattr(suggestion, field) for field in self.FIELDS)
+        old = self.entries.get(suggestion.id)
+        if old is not None and old[0] == key and old[1] == values:
+            self.confidence_total += suggestion.confidence_score - old[2]
+            self.entries[suggestion.id] = (key, values, suggestion.confidence_score)
+            return
+        self.remove(suggestion.id)
+        self.all.add(key)
+        for field, value in zip(self.FIELDS, values):
+            self.buckets.setdefault((field, value), SortedKeys()).add(key)
+        self.entries[suggestion.id] = (key, values, suggestion.confidence_score)
+        self.confidence_total += suggestion.confidence_score
+
+    def remove(self, suggestion_id: str) -> None:
+        """Drop a suggestion from every index."""
+        entry = self.entries.pop(suggestion_id, None)
+        if entry is None:
+            return
+        key, values, confidence = entry
+        self.all.remove(key)
+        for field, value in zip(self.FIELDS, values):
+            self._bucket_remove(field, value, key)
+        self.confidence_total -= confidence
+
+    def _bucket_remove(self, field: str, value: Any, key: SortKey) -> None:
+        bucket = self.buckets[(field, value)]
+        bucket.remove(key)
+        if not len(bucket):
+            del self.buckets[(field, value)]
+
+    def clear(self) -> None:
+        """Drop every indexed suggestion."""
+        self.all = SortedKeys()
+        self.buckets.clear()
+        self.entries.clear()
+        self.confidence_total = 0.0
+
+    def count(self, field: str, value: Any) -> int:
+        """Number of suggestions whose ``field`` equals ``value``."""
+        bucket = self.buckets.get((field, value))
+        return len(bucket) if bucket is not None else 0
+
+    def page(
+        self,
+        filters: Dict[str, Any],
+        limit: int,
+        cursor: Optional[SortKey] = None,
+        descending: bool = True
+    ) -> Tuple[List[str], Optional[SortKey]]:
+        """Ids of up to ``limit`` suggestions matching ``filters`` after ``cursor``, and the next cursor.
+
+        ``filters`` maps fields from FIELDS to required values; None values
+        are ignored. The next cursor is None on the last page.
+        """
+        ids: List[str] = []
+        last: Optional[SortKey] = None
+        for key in self._iter_matching(filters, cursor, descending):
+            if len(ids) == limit:
+                return ids, last
+            ids.append(key[1])
+            last = key
+        return ids, None
+
+    def matching(self, filters: Dict[str, Any], descending: bool = False) -> Iterator[str]:
+        """Ids of every suggestion matching ``filters`` (as for ``page``), in creation order."""
+        return (key[1] for key in self._iter_matching(filters, None, descending))
+
+    def _iter_matching(
+        self,
+        filters: Dict[str, Any],
+        cursor: Optional[SortKey],
+        descending: bool
+    ) -> Iterator[SortKey]:
+        """Keys matching ``filters`` after ``cursor``, walking the smallest requested bucket."""
+        active = [(self.FIELDS.index(field), value) for field, value in filters.items() if value is not None]
+        candidates = []
+        for position, value in active:
+            bucket = self.buckets.get((self.FIELDS[position], value))
+            if bucket is None:
+                return
+            candidates.append(bucket)
+        source = min(candidates, key=len) if candidates else self.all
+        for key in source.iter_after(cursor, reverse=descending):
+            values = self.entries[key[1]][1]
+            if all(values[position] == value for position, value in active):
+                yield key
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Totals by status and type and the average confidence, from the counters."""
+        total = len(self.entries)
+        return {
+            "total_suggestions": total,
+            "by_status": {status.value: self.count("status", status) for status in SuggestionStatus},
+            "by_type": {suggestion_type.value: self.count("suggestion_type", suggestion_type) for suggestion_type in SuggestionType},
+            "average_confidence": self.confidence_total / total if total else 0.0,
+        }
@@ -0,0 +1,368 @@
+# Suggestion pipeline service
+"""End-to-end suggestion generation: search, pre-filter, LLM generation."""
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from ..config import settings
+from ..models.document import DocumentSection
+from ..models.suggestion import SuggestionStatus, UpdateSuggestion
+from ..utils.logger import ai_logger
+from .coalescing import JOINED_IN_GRACE, ProgressCallback, SingleFlight, normalize_query
+
+
+@dataclass
+class GenerationResult:
+    """Outcome of one pipeline run."""
+    query: str
+    suggestions: List[UpdateSuggestion]
+    sections_found: int = 0
+    sections_skipped: int = 0
+    message: str = ""
+    metadata: dict = field(default_factory=dict)
+    # Sections still generating when the deadline passed; they keep running
+    pending: Dict[str, "asyncio.Task[Optional[UpdateSuggestion]]"] = field(default_factory=dict)
+
+    @property
+    def pending_section_ids(self) -> List[str]:
+        """Ids of the sections whose suggestions were not ready by the deadline."""
+        return list(self.pending)
+
+
+class RunDeadline:
+    """Absolute deadline of a run that later callers sharing the run can move earlier."""
+
+    def __init__(self, at: Optional[float] = None) -> None:
+        """Initialize with a ``time.monotonic()`` deadline; None waits for everything."""
+        self.at = at
+        self._tightened = asyncio.Event()
+
+    def tighten(self, at: Optional[float]) -> None:
+        """Move the deadline to ``at`` if that is earlier, waking ``wait``."""
+        if at is None or (self.at is not None and self.at <= at):
+            return
+        self.at = at
+        self._tightened.set()
+        self._tightened = asyncio.Event()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None without a deadline."""
+        return None if self.at is None else max(self.at - time.monotonic(), 0.0)
+
+    async def wait(self, tasks: Iterable["asyncio.Future[Any]"]) -> None:
+        """Wait until every task is done or the deadline, as tightened meanwhile, passes."""
+        pending = {task for task in tasks if not task.done()}
+        while pending:
+            remaining = self.remaining()
+            if remaining == 0:
+                return
+            tightened = asyncio.ensure_future(self._tightened.wait())
+            try:
+                _, pending = await asyncio.wait(
+                    pending | {tightened}, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                tightened.cancel()
+            pending.discard(tightened)
+
+
+class SuggestionPipeline:
+    """Runs search, pre-filtering and LLM generation for a query.
+
+    Identical concurrent queries (after normalization, against the same
+    corpus version) are coalesced into a single run whose result is shared.
+    With a deadline, the run returns the suggestions finished in time and
+    hands back the still-running sections in ``GenerationResult.pending``;
+    a shared run stops waiting at the earliest deadline among its callers
+    and each caller keeps waiting on the pending sections up to its own.
+    Complete runs are stored in the semantic cache, if one is configured,
+    and reused for near-duplicate queries. Results that were already handed
+    out (cache hits and finished shared runs) come back as new pending
+    suggestions with fresh ids, so storing them never overwrites reviewed or
+    deleted ones. With a mirror index, translated mirror sections are not
+    analysed on their own: they get suggestions derived from the English
+    ones by translating the diff.
+    """
+
+    def __init__(
+        self,
+        doc_processor: Any,
+        ai_service: Any,
+        prefilter: Any = None,
+        max_suggestions: int = 3,
+        cache: Any = None,
+        mirror_index: Any = None,
+    ) -> None:
+        """Initialize the pipeline with the app's processor, AI service and optional pre-filter, cache and mirror index."""
+        self.doc_processor = doc_processor
+        self.ai_service = ai_service
+        self.prefilter = prefilter
+        self.cache = cache
+        self.mirror_index = mirror_index
+        self.max_suggestions = max_suggestions
+        self.single_flight: Optional[SingleFlight[GenerationResult]] = (
+            SingleFlight() if settings.coalesce_enabled else None
+        )
+        self._deadlines: Dict[Hashable, RunDeadline] = {}  # Deadline of each coalesced run
+
+    async def run(
+        self,
+        query: str,
+        progress: Optional[ProgressCallback] = None,
+        deadline: Optional[float] = None,
+    ) -> GenerationResult:
+        """Generate suggestions for a query, reporting progress by stage.
+
+        ``deadline`` is the time budget in seconds for the whole run; None
+        waits for every section. Callers that join an identical in-flight run
+        get the same suggestions, with ``metadata["coalesced"]`` set.
+        """
+        at = None if deadline is None else time.monotonic() + deadline
+        if self.single_flight is None:
+            return await self._run(query, progress, RunDeadline(at))
+        key = (
+            normalize_query(query),
+            self.max_suggestions,
+            getattr(self.doc_processor, "corpus_version", None),
+        )
+        # Registered before the run starts so callers joining it can move its deadline earlier
+        run_deadline = self._deadlines.get(key) if self.single_flight.in_flight_for(key) else None
+        if run_deadline is None:
+            run_deadline = self._deadlines[key] = RunDeadline()
+        run_deadline.tighten(at)
+
+        async def factory(fan_out: ProgressCallback) -> GenerationResult:
+            try:
+                return await self._run(query, fan_out, run_deadline)
+            finally:
+                if self._deadlines.get(key) is run_deadline:
+                    del self._deadlines[key]
+
+        try:
+            result, joined = await self.single_flight.run(key, factory, progress=progress)
+        finally:
+            if self._deadlines.get(key) is run_deadline and not self.single_flight.in_flight_for(key):
+                # Joined a finished run (or was cancelled before starting one); the deadline is unused
+                del self._deadlines[key]
+        if joined is None:
+            return await self._wait_pending(result, at)
+        ai_logger.debug(f"Coalesced query onto an identical run ({joined}): {query}")
+        metadata = {**result.metadata, "coalesced": True}
+        if joined == JOINED_IN_GRACE:
+            # Already returned to another caller; sections still generating land through that run
+            return replace(
+                result, suggestions=self._reissue(result.suggestions), pending={}, metadata=metadata
+            )
+        return await self._wait_pending(replace(result, metadata=metadata), at)
+
+    async def _wait_pending(self, result: GenerationResult, at: Optional[float]) -> GenerationResult:
+        """Keep waiting on a shared run's pending sections until this caller's own deadline."""
+        if not result.pending or (at is not None and at <= time.monotonic()):
+            return result
+        await RunDeadline(at).wait(result.pending.values())
+        late = [
+            task.result() for task in result.pending.values()
+            if task.done() and not task.cancelled() and task.exception() is None and task.result()
+        ]
+        pending = {section_id: task for section_id, task in result.pending.items() if not task.done()}
+        suggestions = result.suggestions + late
+        message = f"Generated {len(suggestions)} suggestions"
+        if pending:
+            message += f"; {len(pending)} sections still generating in the background"
+        return replace(result, suggestions=suggestions, pending=pending, message=message)
+
+    @staticmethod
+    def _reissue(suggestions: List[UpdateSuggestion]) -> List[UpdateSuggestion]:
+        """Copies of already handed out suggestions as new pending ones, with fresh ids."""
+        now = datetime.now()
+        return [
+            suggestion.model_copy(
+                update={
+                    "id": str(uuid.uuid4()),
+                    "status": SuggestionStatus.PENDING,
+                    "created_at": now,
+                    "updated_at": now,
+                    "reviewed_by": None,
+                    "reviewed_at": None,
+                },
+                deep=True,
+            )
+            for suggestion in suggestions
+        ]
+
+    async def _run(
+        self,
+        query: str,
+        progress: Optional[ProgressCallback] = None,
+        deadline: Optional[RunDeadline] = None,
+    ) -> GenerationResult:
+        """Search, pre-filter and generate suggestions for a query."""
+        if deadline is None:
+            deadline = RunDeadline()
+        def report(stage: str, fraction: float) -> None:
+            if progress:
+                progress(stage, fraction)
+
+        if self.cache:
+            hit = await self.cache.lookup(query)
+            if hit:
+                ai_logger.debug(f"Semantic cache hit ({hit.similarity:.3f}) for query: {query}")
+                report("done", 1.0)
+                return GenerationResult(
+                    query=query,
+                    # New suggestions for this request, not the ones handed out before
+                    suggestions=self._reissue(hit.batch.suggestions),
+                    sections_found=hit.batch.metadata.get("sections_found", 0),
+                    sections_skipped=hit.batch.metadata.get("sections_skipped", 0),
+                    message=f"Reused {len(hit.batch.suggestions)} suggestions from a similar query",
+                    metadata={
+                        "cache_hit": True,
+                        "cache_similarity": round(hit.similarity, 4),
+                        "cached_query": hit.batch.query,
+                        "cached_batch_id": hit.batch.id,
+                    }
+                )
+
+        report("searching", 0.05)
+        relevant_sections: List[DocumentSection] = await self.doc_processor.search_sections(
+            query=query,
+            limit=self.max_suggestions
+        )
+        symbol_sections = self._symbol_sections(query, relevant_sections)
+        if symbol_sections:
+            # Exact identifier matches are high precision; analyse them first
+            ai_logger.debug(f"Symbol index added {len(symbol_sections)} sections")
+            relevant_sections = symbol_sections + relevant_sections
+        ai_logger.debug(f"Found {len(relevant_sections)} relevant sections")
+        if not relevant_sections:
+            report("done", 1.0)
+            return GenerationResult(
+                query=query,
+                suggestions=[],
+                message="No relevant sections found for the query"
+            )
+        sections_found = len(relevant_sections)
+        searched_sections = list(relevant_sections)
+
+        # Skip LLM calls for sections the local pre-filter deems irrelevant
+        sections_skipped = 0
+        if self.prefilter:
+            report("filtering", 0.15)
+            prefilter_result = await self.prefilter.filter(query, relevant_sections)
+            relevant_sections = prefilter_result.kept
+            sections_skipped = len(prefilter_result.skipped)
+            ai_logger.debug(f"Pre-filter kept {len(relevant_sections)} sections, skipped {sections_skipped}")
+
+        if self.mirror_index:
+            # Mirrors of English sections in this run are derived, not analysed
+            relevant_sections, mirrored = self.mirror_index.split_mirrored(relevant_sections)
+            if mirrored:
+                ai_logger.debug(f"Deferring {len(mirrored)} mirror sections to diff translation")
+
+        section_contexts = self._assemble_contexts(relevant_sections)
+
+        report("generating", 0.2)
+        ai_logger.debug(f"Starting AI suggestion generation for {len(relevant_sections)} sections")
+        tasks = self.ai_service.start_section_suggestions(
+            query=query,
+            relevant_sections=relevant_sections,
+            progress_callback=lambda done, total: report("generating", 0.2 + 0.75 * done / max(total, 1)),
+            section_contexts=section_contexts
+        )
+        suggestions, pending = await self._wait_until_deadline(tasks, deadline)
+        ai_logger.debug(f"AI service returned {len(suggestions)} suggestions, {len(pending)} still pending")
+
+        # Only keep the first suggestions up to the cap for speed
+        suggestions = suggestions[:self.max_suggestions]
+
+        mirror_section_ids: List[str] = []
+        if self.mirror_index and suggestions:
+            report("translating", 0.95)
+            derive_tasks = {}
+            for suggestion in suggestions:
+                for mirror in self.mirror_index.mirrors_of(suggestion.section_id):
+                    mirror_section_ids.append(mirror.id)
+                    derive_tasks[mirror.id] = asyncio.ensure_future(
+                        self.ai_service.derive_mirror_suggestion(
+                            suggestion, mirror, self.mirror_index.language_of(mirror.id)
+                        )
+                    )
+            derived, derive_pending = await self._wait_until_deadline(derive_tasks, deadline)
+            ai_logger.debug(f"Derived {len(derived)} mirror suggestions, {len(derive_pending)} still pending")
+            suggestions = suggestions + derived
+            pending.update(derive_pending)
+
+        message = f"Generated {len(suggestions)} suggestions"
+        if pending:
+            message += f"; {len(pending)} sections still generating in the background"
+        elif self.cache:
+            # Only complete runs are reusable
+            await self.cache.store(
+                query,
+                suggestions,
+                section_ids=[section.id for section in searched_sections] + mirror_section_ids,
+                metadata={"sections_found": sections_found, "sections_skipped": sections_skipped}
+            )
+        report("done", 1.0)
+        return GenerationResult(
+            query=query,
+            suggestions=suggestions,
+            sections_found=sections_found,
+            sections_skipped=sections_skipped,
+            message=message,
+            pending=pending
+        )
+
+    def _symbol_sections(self, query: str, found: List[DocumentSection]) -> List[DocumentSection]:
+        """Sections that mention the query's identifiers and were not already found, best match first."""
+        symbol_index = getattr(self.doc_processor, "symbol_index", None)
+        if symbol_index is None or not settings.symbol_search_enabled:
+            return []
+        found_ids = {section.id for section in found}
+        sections = []
+        for match in symbol_index.search(query):
+            if match.section_id in found_ids:
+                continue
+            section = self.doc_processor.get_section_by_id(match.section_id)
+            if section is not None:
+                sections.append(section)
+            if len(sections) >= settings.symbol_search_max_sections:
+                break
+        return sections
+
+    def _assemble_contexts(self, sections: List[DocumentSection]) -> Dict[str, str]:
+        """Heading path and ancestor summaries for each section, within the context token budget."""
+        section_tree = getattr(self.doc_processor, "section_tree", None)
+        if section_tree is None or settings.section_context_max_tokens <= 0:
+            return {}
+        contexts = {}
+        for section in sections:
+            context = section_tree.assemble_context(
+                section, settings.section_context_max_tokens, self.ai_service.token_budget.count_tokens
+            )
+            if context.text:
+                contexts[section.id] = context.text
+        return contexts
+
+    async def _wait_until_deadline(
+        self,
+        tasks: Dict[str, "asyncio.Task[Optional[UpdateSuggestion]]"],
+        deadline: RunDeadline,
+    ) -> Tuple[List[UpdateSuggestion], Dict[str, "asyncio.Task[Optional[UpdateSuggestion]]"]]:
+        """Wait for tasks until the run's deadline; returns finished suggestions and still-running tasks."""
+        try:
+            await deadline.wait(tasks.values())
+        except asyncio.CancelledError:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        pending = {section_id: task for section_id, task in tasks.items() if not task.done()}
+        suggestions = [
+            task.result() for task in tasks.values()
+            if task.done() and not task.cancelled() and task.exception() is None and task.result()
+        ]
+        return suggestions, pending
@@ -0,0 +1,223 @@
+# Suggestion repository
+"""Durable suggestion store: an in-memory mapping persisted to SQLite by a background writer."""
+
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..models.suggestion import UpdateSuggestion
+from ..utils.content_store import content_store
+from ..utils.exceptions import StorageError
+from ..utils.logger import app_logger
+
+
+class SuggestionRepository(MutableMapping):
+    """Suggestions kept in memory and written behind to an SQLite database in WAL mode.
+
+    Reads and writes only touch the in-memory dict, so they cost what a dict
+    costs. Writes also queue the suggestion's JSON, serialized by the
+    writing caller so the writer thread never reads live objects; a writer
+    thread commits the queue in one transaction every ``flush_interval``
+    seconds, or sooner once ``flush_batch`` suggestions are waiting. A
+    suggestion changed in place must be stored again to be persisted.
+    Section content no suggestion references any more is deleted in the
+    same transaction. ``open`` recovers every committed suggestion (and the
+    section content it references) and ``close`` flushes what is left, so
+    only the last interval of writes is at risk if the process is killed.
+    """
+
+    def __init__(self, db_path: str, flush_interval: float = 0.5, flush_batch: int = 200) -> None:
+        """Initialize a closed repository for ``db_path``."""
+        self.db_path = Path(db_path)
+        self.flush_interval = flush_interval
+        self.flush_batch = max(flush_batch, 1)
+        self.cache: Dict[str, UpdateSuggestion] = {}
+        # Queued (JSON, original hash, original content) per suggestion; None marks a deletion
+        self.dirty: Dict[str, Optional[Tuple[str, str, str]]] = {}
+        self.orphans = False  # Whether a queued write may leave stored content unreferenced
+        self.saved_contents: set = set()  # Only touched by whoever holds ``flush_lock``
+        self.connection: Optional[sqlite3.Connection] = None
+        self.lock = threading.Lock()  # Guards ``dirty`` and ``orphans``
+        self.flush_lock = threading.Lock()  # One flush at a time
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.writer: Optional[threading.Thread] = None
+        self.stats = {
+            "flushes": 0, "rows_written": 0, "rows_deleted": 0, "contents_pruned": 0, "failed_flushes": 0, "recovered": 0
+        }
+        self.last_flush_ms = 0.0
+        self.last_error: Optional[str] = None
+
+    def open(self) -> None:
+        """Open the database, load every stored suggestion and start the writer."""
+        if self.connection is not None:
+            return
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # Used by the writer thread, and by open/close while it is not running
+            self.connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS suggestions (
+                    id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS contents (
+                    hash TEXT PRIMARY KEY,
+                    text TEXT NOT NULL
+                );
+                """
+            )
+            self._recover()
+        except sqlite3.Error as e:
+            raise StorageError(f"Failed to open suggestion database {self.db_path}: {str(e)}")
+
+        self.stopping.clear()
+        self.writer = threading.Thread(target=self._run, name="suggestion-writer", daemon=True)
+        self.writer.start()
+        app_logger.info(f"Suggestion repository opened with {len(self.cache)} suggestions from {self.db_path}")
+
+    def _recover(self) -> None:
+        """Load stored contents into the content store, then the suggestions that reference them."""
+        for key, text in self.connection.execute("SELECT hash, text FROM contents"):
+            content_store.put(text)
+            self.saved_contents.add(key)
+        for suggestion_id, data in self.connection.execute("SELECT id, data FROM suggestions"):
+            try:
+                self.cache[suggestion_id] = UpdateSuggestion.model_validate_json(data)
+            except Exception as e:
+                app_logger.error(f"Could not load stored suggestion {suggestion_id}: {e}")
+        self.stats["recovered"] = len(self.cache)
+
+    def close(self) -> None:
+        """Stop the writer, flush pending writes and close the database."""
+        if self.connection is None:
+            return
+        self.stopping.set()
+        self.wake.set()
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+        self.flush()
+        self.connection.close()
+        self.connection = None
+
+    def _run(self) -> None:
+        """Writer loop: flush on every interval or when woken by a full batch."""
+        while not self.stopping.is_set():
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            try:
+                self.flush()
+            except StorageError as e:
+                app_logger.error(str(e))
+
+    def flush(self) -> int:
+        """Commit pending writes in one transaction; returns the number of suggestions written or deleted.
+
+        On failure the writes are queued again (behind any newer ones) and
+        StorageError is raised.
+        """
+        with self.flush_lock:
+            with self.lock:
+                batch, self.dirty = self.dirty, {}
+                orphans, self.orphans = self.orphans, False
+            if not batch or self.connection is None:
+                return 0
+            started = time.perf_counter()
+            now = time.time()
+            upserts: List[Tuple[str, str, float]] = []
+            deletes: List[Tuple[str]] = []
+            contents: Dict[str, str] = {}
+            pruned: List[str] = []
+            for suggestion_id, entry in batch.items():
+                if entry is None:
+                    deletes.append((suggestion_id,))
+                    continue
+                data, key, text = entry
+                upserts.append((suggestion_id, data, now))
+                if key not in self.saved_contents:
+                    contents[key] = text
+            try:
+                with self.connection:
+                    self.connection.executemany(
+                        "INSERT OR IGNORE INTO contents (hash, text) VALUES (?, ?)", contents.items()
+                    )
+                    self.connection.executemany(
+                        "INSERT OR REPLACE INTO suggestions (id, data, updated_at) VALUES (?, ?, ?)", upserts
+                    )
+                    self.connection.executemany("DELETE FROM suggestions WHERE id = ?", deletes)
+                    if orphans:
+                        pruned = [key for key, in self.connection.execute(
+                            "DELETE FROM contents WHERE hash NOT IN "
+                            "(SELECT json_extract(data, '$.original_hash') FROM suggestions) RETURNING hash"
+                        )]
+            except Exception as e:
+                with self.lock:
+                    for suggestion_id, entry in batch.items():
+                        self.dirty.setdefault(suggestion_id, entry)
+                    self.orphans = self.orphans or orphans
+                self.stats["failed_flushes"] += 1
+                self.last_error = str(e)
+                raise StorageError(f"Failed to write {len(batch)} suggestions to {self.db_path}: {str(e)}")
+            self.saved_contents.update(contents)
+            self.saved_contents.difference_update(pruned)
+            self.stats["flushes"] += 1
+            self.stats["rows_written"] += len(upserts)
+            self.stats["rows_deleted"] += len(deletes)
+            self.stats["contents_pruned"] += len(pruned)
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            return len(batch)
+
+    def _mark(self, suggestion_id: str, entry: Optional[Tuple[str, str, str]], orphans: bool) -> None:
+        with self.lock:
+            self.dirty[suggestion_id] = entry
+            self.orphans = self.orphans or orphans
+            full = len(self.dirty) >= self.flush_batch
+        if full:
+            self.wake.set()
+
+    def __getitem__(self, suggestion_id: str) -> UpdateSuggestion:
+        return self.cache[suggestion_id]
+
+    def __setitem__(self, suggestion_id: str, suggestion: UpdateSuggestion) -> None:
+        previous = self.cache.get(suggestion_id)
+        self.cache[suggestion_id] = suggestion
+        entry = (
+            suggestion.model_dump_json(), suggestion.original_hash, content_store.get(suggestion.original_hash)
+        )
+        self._mark(suggestion_id, entry, previous is not None and previous.original_hash != suggestion.original_hash)
+
+    def __delitem__(self, suggestion_id: str) -> None:
+        del self.cache[suggestion_id]
+        self._mark(suggestion_id, None, True)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.cache)
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cached and pending suggestion counts, writer activity and database size."""
+        size = 0
+        for suffix in ("", "-wal"):
+            path = Path(f"{self.db_path}{suffix}")
+            if path.exists():
+                size += path.stat().st_size
+        return {
+            "path": str(self.db_path),
+            "open": self.connection is not None,
+            "suggestions": len(self.cache),
+            "pending_writes": len(self.dirty),
+            **self.stats,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "last_error": self.last_error,
+            "database_size_bytes": size,
+        }
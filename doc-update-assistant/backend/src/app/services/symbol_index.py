@@ -0,0 +1,203 @@
+# Symbol index service
+"""Identifier index over code blocks, inline code and headings for exact symbol retrieval."""
+
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..models.document import Document, DocumentSection
+from ..utils.helpers import extract_code_blocks, extract_identifiers
+
+
+# Where a symbol occurs in a section, strongest evidence first
+KIND_DEFINITION = "definition"
+KIND_HEADING = "heading"
+KIND_CODE = "code"
+KIND_INLINE = "inline"
+
+KIND_WEIGHTS: Dict[str, float] = {
+    KIND_DEFINITION: 4.0,
+    KIND_HEADING: 3.0,
+    KIND_CODE: 2.0,
+    KIND_INLINE: 1.0,
+}
+
+# Exact qualified-name matches rank above matches on a name's trailing part
+SUFFIX_MATCH_FACTOR = 0.8
+
+# Builtins and generic names that would link unrelated sections
+IGNORED_SYMBOLS = {
+    "print", "len", "str", "int", "float", "bool", "dict", "list", "set", "tuple", "range",
+    "isinstance", "super", "type", "none", "true", "false", "self", "cls", "async", "await",
+    "return", "import", "from", "class", "def", "asyncio.run", "json.dumps", "json.loads",
+    "__init__", "__name__", "__main__", "main",
+}
+
+_DEFINITION = re.compile(r"^(\s*)(?:async\s+)?(class|def)\s+([A-Za-z_]\w*)", re.MULTILINE)
+_FROM_IMPORT = re.compile(r"^\s*from\s+([\w.]+)\s+import\s+\(?([^)\n]+)", re.MULTILINE)
+_INLINE_CODE = re.compile(r"`([^`\n]+)`")
+_SOURCE_MODULE = re.compile(r"Source code in `src/([\w/]+)\.py`")
+
+
+def normalize_symbol(name: str) -> str:
+    """Case-insensitive form of a symbol without call parentheses or a ``self.`` prefix."""
+    name = name.strip().rstrip("()").strip()
+    if name.startswith(("self.", "cls.")):
+        name = name.split(".", 1)[1]
+    return name.lower()
+
+
+def _code_text(content: str) -> str:
+    """Content with API-reference table cells turned into ordinary fenced blocks."""
+    text = content.replace("<br>", "\n")
+    text = re.sub(r"\|\s*```", "\n```", text)
+    return re.sub(r"```\s*\|", "```\n|", text)
+
+
+def _definitions(code: str, module: Optional[str]) -> List[str]:
+    """Qualified names defined in a code block: classes, their methods and module-level functions."""
+    names = []
+    classes: List[Tuple[int, str]] = []  # (indent, class name) stack
+    for match in _DEFINITION.finditer(code):
+        indent, keyword, name = len(match.group(1)), match.group(2), match.group(3)
+        while classes and classes[-1][0] >= indent:
+            classes.pop()
+        qualified = ".".join([owner for _, owner in classes] + [name])
+        names.append(qualified)
+        if module:
+            names.append(f"{module}.{qualified}")
+        if keyword == "class":
+            classes.append((indent, name))
+    return names
+
+
+def extract_section_symbols(section: DocumentSection) -> Dict[str, str]:
+    """Map each symbol mentioned in a section to the strongest kind of mention."""
+    symbols: Dict[str, str] = {}
+
+    def add(name: str, kind: str) -> None:
+        key = normalize_symbol(name)
+        if len(key) < 3 or key in IGNORED_SYMBOLS:
+            return
+        current = symbols.get(key)
+        if current is None or KIND_WEIGHTS[kind] > KIND_WEIGHTS[current]:
+            symbols[key] = kind
+
+    for name in extract_identifiers(section.title.replace("\\_", "_")):
+        add(name, KIND_HEADING)
+
+    module_match = _SOURCE_MODULE.search(section.content)
+    module = module_match.group(1).replace("/", ".") if module_match else None
+    text = _code_text(section.content)
+    for block in extract_code_blocks(text):
+        code = block["content"]
+        for name in _definitions(code, module):
+            add(name, KIND_DEFINITION)
+        for package, imported in _FROM_IMPORT.findall(code):
+            for name in imported.split(","):
+                name = name.split(" as ")[0].strip()
+                if name:
+                    add(f"{package}.{name}", KIND_CODE)
+                    add(name, KIND_CODE)
+        for name in extract_identifiers(code):
+            add(name, KIND_CODE)
+
+    # Inline code outside fences
+    prose = re.sub(r"```.*?```", " ", text, flags=re.DOTALL)
+    for snippet in _INLINE_CODE.findall(prose):
+        for name in extract_identifiers(f"`{snippet}`"):
+            add(name, KIND_INLINE)
+    return symbols
+
+
+@dataclass
+class SymbolMatch:
+    """A section that mentions one or more of the queried symbols."""
+    section_id: str
+    score: float
+    symbols: List[str]
+
+
+class SymbolIndex:
+    """Symbol -> sections index with qualified-name matching, built at ingestion.
+
+    Every symbol is registered under its full dotted name and under each
+    dotted suffix, so ``Runner.run`` finds ``agents.run.Runner.run`` and
+    ``ModelSettings`` finds ``agents.ModelSettings``. A lookup is one
+    dictionary access per queried identifier plus a walk over its
+    postings; no section text is scanned at query time.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty index."""
+        self.postings: Dict[str, Dict[str, str]] = defaultdict(dict)  # symbol -> {section id: kind}
+        self.suffixes: Dict[str, Set[str]] = defaultdict(set)  # dotted suffix -> full symbols
+        self.section_symbols: Dict[str, Dict[str, str]] = {}
+        self.document_sections: Dict[str, List[str]] = {}
+
+    def add_document(self, document: Document) -> None:
+        """Index a document's sections, replacing any earlier version of it."""
+        self.remove_document(document.id)
+        self.document_sections[document.id] = [section.id for section in document.sections]
+        for section in document.sections:
+            symbols = extract_section_symbols(section)
+            self.section_symbols[section.id] = symbols
+            for symbol, kind in symbols.items():
+                self.postings[symbol][section.id] = kind
+                parts = symbol.split(".")
+                for start in range(len(parts)):
+                    self.suffixes[".".join(parts[start:])].add(symbol)
+
+    def remove_document(self, document_id: str) -> None:
+        """Drop a document's sections from the index."""
+        for section_id in self.document_sections.pop(document_id, []):
+            for symbol in self.section_symbols.pop(section_id, {}):
+                sections = self.postings.get(symbol)
+                if sections is None:
+                    continue
+                sections.pop(section_id, None)
+                if not sections:
+                    del self.postings[symbol]
+                    parts = symbol.split(".")
+                    for start in range(len(parts)):
+                        suffix = ".".join(parts[start:])
+                        self.suffixes[suffix].discard(symbol)
+                        if not self.suffixes[suffix]:
+                            del self.suffixes[suffix]
+
+    def resolve(self, identifier: str) -> List[str]:
+        """Indexed symbols an identifier refers to: the exact name and names it is a dotted suffix of."""
+        return sorted(self.suffixes.get(normalize_symbol(identifier), ()))
+
+    def lookup(self, identifier: str) -> Dict[str, Tuple[float, str]]:
+        """Sections mentioning an identifier, as {section id: (score, matched symbol)}."""
+        key = normalize_symbol(identifier)
+        hits: Dict[str, Tuple[float, str]] = {}
+        for symbol in self.suffixes.get(key, ()):
+            factor = 1.0 if symbol == key else SUFFIX_MATCH_FACTOR
+            for section_id, kind in self.postings[symbol].items():
+                score = KIND_WEIGHTS[kind] * factor
+                if score > hits.get(section_id, (0.0, ""))[0]:
+                    hits[section_id] = (score, symbol)
+        return hits
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[SymbolMatch]:
+        """Sections mentioning the identifiers in a query, best evidence first."""
+        matches: Dict[str, SymbolMatch] = {}
+        for identifier in extract_identifiers(query):
+            for section_id, (score, symbol) in self.lookup(identifier).items():
+                match = matches.setdefault(section_id, SymbolMatch(section_id, 0.0, []))
+                match.score += score
+                match.symbols.append(symbol)
+        ranked = sorted(matches.values(), key=lambda match: match.score, reverse=True)
+        return ranked[:limit] if limit is not None else ranked
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index size."""
+        return {
+            "documents": len(self.document_sections),
+            "sections": len(self.section_symbols),
+            "symbols": len(self.postings),
+            "postings": sum(len(sections) for sections in self.postings.values()),
+        }
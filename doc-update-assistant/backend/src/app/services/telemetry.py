@@ -0,0 +1,273 @@
+# LLM telemetry service
+"""Per-request LLM and embedding telemetry: tokens, latency histograms, retries and cost."""
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from ..config import settings
+from ..utils.logger import log_event, telemetry_logger
+from .usage import estimate_cost
+
+
+KIND_CHAT = "chat"
+KIND_EMBEDDING = "embedding"
+
+OUTCOME_OK = "ok"
+OUTCOME_ERROR = "error"
+OUTCOME_CANCELLED = "cancelled"
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_caller: ContextVar[Union[str, Callable[[], str]]] = ContextVar(
+    "telemetry_caller", default="unattributed"
+)
+
+
+def current_caller() -> str:
+    """Caller that LLM and embedding requests in this context are attributed to."""
+    caller = _current_caller.get()
+    return caller() if callable(caller) else caller
+
+
+@contextmanager
+def caller_scope(caller: Union[str, Callable[[], str]]) -> Iterator[None]:
+    """Attribute requests made in this context (and tasks spawned from it) to ``caller``.
+
+    ``caller`` may be a function, evaluated for every request.
+    """
+    token = _current_caller.set(caller)
+    try:
+        yield
+    finally:
+        _current_caller.reset(token)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with interpolated percentiles."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """Create an empty histogram over ``buckets`` plus an overflow bucket."""
+        self.buckets = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Add one sample."""
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Estimate a percentile by linear interpolation inside its bucket."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(upper bound, cumulative count) pairs, Prometheus style."""
+        pairs, running = [], 0
+        for bound, bucket_count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            running += bucket_count
+            pairs.append((bound, running))
+        return pairs
+
+
+@dataclass
+class SeriesStats:
+    """Counters for one (kind, model, template, caller) series."""
+    calls: int = 0
+    requests: int = 0
+    retries: int = 0
+    outcomes: Dict[str, int] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters, token totals, cost and latency percentiles."""
+        def rounded(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value, 3)
+
+        return {
+            "calls": self.calls,
+            "requests": self.requests,
+            "retries": self.retries,
+            "outcomes": dict(self.outcomes),
+            "errors": dict(self.errors),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "estimated_cost_usd": round(self.cost_usd, 6),
+            "latency_p50_s": rounded(self.latency.percentile(0.5)),
+            "latency_p95_s": rounded(self.latency.percentile(0.95)),
+            "latency_p99_s": rounded(self.latency.percentile(0.99)),
+            "latency_max_s": rounded(self.latency.max) if self.latency.count else None,
+        }
+
+
+SeriesKey = Tuple[str, str, str, str]
+
+
+class LLMTelemetry:
+    """Records every provider request and logical call, broken down by series.
+
+    A series is (kind, model, prompt template, caller). Each provider
+    request (including retries and hedges) is one ``observe_request`` with
+    its latency, token usage and outcome; each logical call, however many
+    requests it took, is one ``observe_call``, which is how retries are
+    counted. Requests are also written to the telemetry logger as
+    structured events when ``telemetry_log_requests`` is set.
+    """
+
+    def __init__(self) -> None:
+        """Initialize with no series."""
+        self.series: Dict[SeriesKey, SeriesStats] = {}
+        self.started_at = time.time()
+
+    def _series(self, kind: str, model: str, template: str) -> Tuple[SeriesKey, SeriesStats]:
+        """Get or create the stats for a series under the current caller."""
+        key = (kind, model, template, current_caller())
+        stats = self.series.get(key)
+        if stats is None:
+            stats = self.series[key] = SeriesStats()
+        return key, stats
+
+    def observe_request(
+        self,
+        kind: str,
+        model: str,
+        template: str,
+        latency_s: float,
+        usage: Any = None,
+        outcome: str = OUTCOME_OK,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """Record one provider request."""
+        key, stats = self._series(kind, model, template)
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        stats.requests += 1
+        stats.outcomes[outcome] = stats.outcomes.get(outcome, 0) + 1
+        if error is not None:
+            error_type = type(error).__name__
+            stats.errors[error_type] = stats.errors.get(error_type, 0) + 1
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+        stats.cost_usd += estimate_cost(model, prompt_tokens, completion_tokens)
+        stats.latency.observe(latency_s)
+        if settings.telemetry_log_requests:
+            log_event(
+                telemetry_logger,
+                "llm_request",
+                kind=key[0],
+                model=key[1],
+                template=key[2],
+                caller=key[3],
+                outcome=outcome,
+                error=type(error).__name__ if error is not None else None,
+                latency_ms=round(latency_s * 1000, 1),
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+            )
+
+    def observe_call(self, kind: str, model: str, template: str, requests: int) -> None:
+        """Record one logical call that took ``requests`` provider requests (extras are retries or hedges)."""
+        _, stats = self._series(kind, model, template)
+        stats.calls += 1
+        stats.retries += max(requests - 1, 0)
+
+    def reset(self) -> None:
+        """Drop all recorded series."""
+        self.series.clear()
+        self.started_at = time.time()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Totals plus per-series and per-model/template/caller breakdowns."""
+        totals = SeriesStats()
+        groups: Dict[str, Dict[str, SeriesStats]] = {"by_model": {}, "by_template": {}, "by_caller": {}}
+        for (kind, model, template, caller), stats in self.series.items():
+            for target in (
+                totals,
+                groups["by_model"].setdefault(model, SeriesStats()),
+                groups["by_template"].setdefault(template, SeriesStats()),
+                groups["by_caller"].setdefault(caller, SeriesStats()),
+            ):
+                _merge(target, stats)
+        return {
+            "since": self.started_at,
+            "totals": totals.summary(),
+            **{name: {label: stats.summary() for label, stats in group.items()} for name, group in groups.items()},
+            "series": [
+                {"kind": kind, "model": model, "template": template, "caller": caller, **stats.summary()}
+                for (kind, model, template, caller), stats in sorted(self.series.items())
+            ],
+        }
+
+    def render_prometheus(self) -> str:
+        """Render counters and latency histograms in the Prometheus text format."""
+        series = [
+            (f'kind="{kind}",model="{model}",template="{template}",caller="{caller}"', stats)
+            for (kind, model, template, caller), stats in sorted(self.series.items())
+        ]
+        lines = ["# TYPE llm_calls_total counter"]
+        lines += [f"llm_calls_total{{{labels}}} {stats.calls}" for labels, stats in series]
+        lines.append("# TYPE llm_retries_total counter")
+        lines += [f"llm_retries_total{{{labels}}} {stats.retries}" for labels, stats in series]
+        lines.append("# TYPE llm_requests_total counter")
+        lines += [
+            f'llm_requests_total{{{labels},outcome="{outcome}"}} {count}'
+            for labels, stats in series for outcome, count in sorted(stats.outcomes.items())
+        ]
+        lines.append("# TYPE llm_tokens_total counter")
+        for labels, stats in series:
+            lines.append(f'llm_tokens_total{{{labels},type="prompt"}} {stats.prompt_tokens}')
+            lines.append(f'llm_tokens_total{{{labels},type="completion"}} {stats.completion_tokens}')
+        lines.append("# TYPE llm_cost_usd_total counter")
+        lines += [f"llm_cost_usd_total{{{labels}}} {stats.cost_usd:.6f}" for labels, stats in series]
+        lines.append("# TYPE llm_request_duration_seconds histogram")
+        for labels, stats in series:
+            for bound, count in stats.latency.cumulative():
+                lines.append(f'llm_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"llm_request_duration_seconds_sum{{{labels}}} {stats.latency.sum:.6f}")
+            lines.append(f"llm_request_duration_seconds_count{{{labels}}} {stats.latency.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _merge(target: SeriesStats, source: SeriesStats) -> None:
+    """Fold one series into an aggregate."""
+    target.calls += source.calls
+    target.requests += source.requests
+    target.retries += source.retries
+    for outcome, count in source.outcomes.items():
+        target.outcomes[outcome] = target.outcomes.get(outcome, 0) + count
+    for error, count in source.errors.items():
+        target.errors[error] = target.errors.get(error, 0) + count
+    target.prompt_tokens += source.prompt_tokens
+    target.completion_tokens += source.completion_tokens
+    target.cost_usd += source.cost_usd
+    for index, count in enumerate(source.latency.counts):
+        target.latency.counts[index] += count
+    target.latency.count += source.latency.count
+    target.latency.sum += source.latency.sum
+    target.latency.max = max(target.latency.max, source.latency.max)
+
+
+# Process-wide telemetry shared by the AI service and document processor
+telemetry = LLMTelemetry()
@@ -0,0 +1,275 @@
+# Token budget service
+"""Token counting and per-call prompt budget allocation for LLM requests."""
+
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from ..config import settings
+from ..utils.exceptions import AIServiceError
+from ..utils.helpers import generate_hash
+from ..utils.logger import ai_logger
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken is a declared dependency
+    tiktoken = None
+
+
+# Known context windows (input + output tokens) per model family
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Chat format overhead: every message is wrapped in role/separator tokens and
+# the reply is primed with a few more.
+TOKENS_PER_MESSAGE = 4
+TOKENS_REPLY_PRIMING = 3
+
+# A rewrite echoes the section back inside a JSON envelope together with a
+# title, description and reasoning, so the output needs a little more room
+# than the content it rewrites.
+REWRITE_OUTPUT_RATIO = 1.3
+REWRITE_OUTPUT_OVERHEAD = 250
+
+
+@dataclass
+class PromptBudget:
+    """Token allocation for a single LLM call."""
+    content: str
+    remainder: str
+    content_tokens: int
+    input_tokens: int
+    max_output_tokens: int
+    truncated: bool
+
+
+class TokenBudgetManager:
+    """Counts prompt tokens and splits the model's context window between input and output."""
+
+    def __init__(
+        self,
+        model: str,
+        context_window: Optional[int] = None,
+        max_input_tokens: Optional[int] = None,
+        max_output_tokens: Optional[int] = None,
+        min_output_tokens: Optional[int] = None,
+        cache_size: Optional[int] = None,
+    ) -> None:
+        """Initialize the budget manager for a model, falling back to settings for limits."""
+        self.model = model
+        self.context_window = (
+            context_window
+            or settings.llm_context_window
+            or self._lookup_context_window(model)
+        )
+        self.max_input_tokens = max_input_tokens or settings.llm_max_input_tokens
+        self.max_output_tokens = max_output_tokens or settings.llm_max_output_tokens
+        self.min_output_tokens = min_output_tokens or settings.llm_min_output_tokens
+        self.cache_size = cache_size or settings.token_count_cache_size
+        self._encoding = self._load_encoding(model)
+        self._count_cache: "OrderedDict[str, int]" = OrderedDict()
+
+    @staticmethod
+    def _lookup_context_window(model: str) -> int:
+        """Return the context window for a model, matching on the longest known prefix."""
+        for name in sorted(MODEL_CONTEXT_WINDOWS, key=len, reverse=True):
+            if model.startswith(name):
+                return MODEL_CONTEXT_WINDOWS[name]
+        return DEFAULT_CONTEXT_WINDOW
+
+    @staticmethod
+    def _load_encoding(model: str):
+        """Load the tiktoken encoding for a model, or None if it is unavailable offline."""
+        if tiktoken is None:
+            return None
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            try:
+                return tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                return None
+        except Exception as e:
+            ai_logger.warning(f"Falling back to estimated token counts: {e}")
+            return None
+
+    def count_tokens(self, text: str) -> int:
+        """Count tokens in a text, estimating ~4 characters per token without an encoding."""
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / 4)
+
+    def count_content_tokens(self, content: str) -> int:
+        """Count tokens for section content, cached by content hash."""
+        key = generate_hash(content)
+        cached = self._count_cache.get(key)
+        if cached is not None:
+            self._count_cache.move_to_end(key)
+            return cached
+        count = self.count_tokens(content)
+        self._count_cache[key] = count
+        if len(self._count_cache) > self.cache_size:
+            self._count_cache.popitem(last=False)
+        return count
+
+    def count_messages(self, system_prompt: str, user_prompt: str) -> int:
+        """Count tokens for a system + user chat request including format overhead."""
+        return (
+            self.count_tokens(system_prompt)
+            + self.count_tokens(user_prompt)
+            + 2 * TOKENS_PER_MESSAGE
+            + TOKENS_REPLY_PRIMING
+        )
+
+    def allocate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        content: str,
+        max_content_tokens: Optional[int] = None,
+    ) -> PromptBudget:
+        """Allocate input/output tokens for a rewrite call and trim content to fit.
+
+        ``user_prompt`` is the user message rendered without the content; the
+        content is counted separately so its token count can be cached.
+        """
+        fixed_tokens = self.count_messages(system_prompt, user_prompt)
+        content_tokens = self.count_content_tokens(content)
+
+        # Content has to fit the input cap, leave room for its own rewrite in the
+        # context window, and not need more output than we allow.
+        input_room = self.max_input_tokens - fixed_tokens
+        window_room = int(
+            (self.context_window - fixed_tokens - REWRITE_OUTPUT_OVERHEAD)
+            / (1 + REWRITE_OUTPUT_RATIO)
+        )
+        output_room = int(
+            (self.max_output_tokens - REWRITE_OUTPUT_OVERHEAD) / REWRITE_OUTPUT_RATIO
+        )
+        content_budget = max(0, min(input_room, window_room, output_room))
+        if max_content_tokens is not None:
+            content_budget = min(content_budget, max_content_tokens)
+
+        if content_tokens <= content_budget:
+            kept, remainder, kept_tokens = content, "", content_tokens
+        else:
+            kept, remainder = self.trim_to_budget(content, content_budget)
+            if content and not kept.strip():
+                raise AIServiceError(
+                    f"No room for section content within the prompt budget ({content_budget} tokens)"
+                )
+            kept_tokens = self.count_tokens(kept)
+
+        input_tokens = fixed_tokens + kept_tokens
+        wanted_output = int(kept_tokens * REWRITE_OUTPUT_RATIO) + REWRITE_OUTPUT_OVERHEAD
+        max_output = min(
+            self.max_output_tokens,
+            self.context_window - input_tokens,
+            max(wanted_output, self.min_output_tokens),
+        )
+        return PromptBudget(
+            content=kept,
+            remainder=remainder,
+            content_tokens=kept_tokens,
+            input_tokens=input_tokens,
+            max_output_tokens=max(max_output, 1),
+            truncated=bool(remainder),
+        )
+
+    def trim_to_budget(self, content: str, budget: int) -> Tuple[str, str]:
+        """Split content into a leading part within budget and the untouched remainder.
+
+        Cuts only between paragraphs or whole fenced code blocks. If the first
+        block alone is over budget it is cut between lines instead, and if
+        its first line is, that line is cut between words (or tokens). The
+        remainder starts right after the kept part, with the whitespace that
+        separated them, so ``kept + remainder == content``.
+        """
+        kept_end: Optional[int] = None
+        used = 0
+        for start, end in self.semantic_block_spans(content):
+            block_tokens = self.count_tokens(content[kept_end or 0:end])
+            if used + block_tokens > budget:
+                if kept_end is None:
+                    return self._trim_block_by_lines(content, end, budget)
+                return content[:kept_end], content[kept_end:]
+            kept_end = end
+            used += block_tokens
+        return content, ""
+
+    def _trim_block_by_lines(self, content: str, block_end: int, budget: int) -> Tuple[str, str]:
+        """Cut an oversized leading block, ending at ``block_end``, between lines."""
+        kept_end = 0
+        used = 0
+        line_start = 0
+        while line_start < block_end:
+            line_end = content.find("\n", line_start, block_end)
+            if line_end == -1:
+                line_end = block_end
+            used += self.count_tokens(content[line_start:line_end]) + 1
+            if used > budget:
+                if not kept_end:
+                    kept_end = self._trim_line_by_tokens(content, line_end, budget)
+                break
+            kept_end = line_end
+            line_start = line_end + 1
+        return content[:kept_end], content[kept_end:]
+
+    def _trim_line_by_tokens(self, content: str, line_end: int, budget: int) -> int:
+        """End of the longest prefix of an oversized first line within budget, backed off to a word break."""
+        low, high = 0, line_end
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count_tokens(content[:middle]) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        word_break = content.rfind(" ", 0, low)
+        return word_break if word_break > 0 and content[:word_break].strip() else low
+
+    @staticmethod
+    def semantic_block_spans(content: str) -> List[Tuple[int, int]]:
+        """Character spans of markdown paragraphs, keeping fenced code blocks whole."""
+        spans: List[Tuple[int, int]] = []
+        start: Optional[int] = None
+        end = 0
+        in_fence = False
+        offset = 0
+        for line in content.split("\n"):
+            line_start, line_end = offset, offset + len(line)
+            offset = line_end + 1
+            if line.strip().startswith("```"):
+                if not in_fence and start is not None:
+                    spans.append((start, end))
+                    start = None
+                if start is None:
+                    start = line_start
+                end = line_end
+                if in_fence:
+                    spans.append((start, end))
+                    start = None
+                in_fence = not in_fence
+            elif in_fence or line.strip():
+                if start is None:
+                    start = line_start
+                end = line_end
+            elif start is not None:
+                spans.append((start, end))
+                start = None
+        if start is not None:
+            spans.append((start, end))
+        return spans
+
+    @classmethod
+    def split_semantic_blocks(cls, content: str) -> List[str]:
+        """Split markdown into paragraphs, keeping fenced code blocks whole."""
+        return [content[start:end] for start, end in cls.semantic_block_spans(content)]
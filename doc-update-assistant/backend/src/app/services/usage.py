@@ -0,0 +1,120 @@
+# Usage tracking service
+"""Scoped token usage, latency and cost accounting for LLM calls."""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+# USD per 1K (prompt, completion) tokens
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4": (0.03, 0.06),
+    "text-embedding-ada-002": (0.0001, 0.0),
+    "text-embedding-3-small": (0.00002, 0.0),
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimate the USD cost of a call, matching the model on the longest known prefix."""
+    for name in sorted(MODEL_PRICING, key=len, reverse=True):
+        if model.startswith(name):
+            prompt_price, completion_price = MODEL_PRICING[name]
+            return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+    return 0.0
+
+
+@dataclass
+class UsageAccumulator:
+    """Totals for the LLM calls made inside a ``track_usage`` scope."""
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    queue_waits: List[float] = field(default_factory=list)
+    started_at: float = field(default_factory=time.monotonic)
+
+    def add(self, model: str, prompt_tokens: int, completion_tokens: int, latency_s: float) -> None:
+        """Record one call."""
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cost_usd += estimate_cost(model, prompt_tokens, completion_tokens)
+        self.latencies.append(latency_s)
+
+    def add_queue_wait(self, wait_s: float) -> None:
+        """Record time a call spent waiting for scheduler admission."""
+        self.queue_waits.append(wait_s)
+
+    def merge(self, other: "UsageAccumulator") -> None:
+        """Fold another accumulator's totals into this one."""
+        self.calls += other.calls
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cost_usd += other.cost_usd
+        self.latencies.extend(other.latencies)
+        self.queue_waits.extend(other.queue_waits)
+
+    def summary(self) -> Dict[str, Any]:
+        """Return totals, provider latency and queue wait percentiles."""
+        ordered = sorted(self.latencies)
+        waits = sorted(self.queue_waits)
+
+        def percentile(fraction: float, values: Optional[List[float]] = None) -> Optional[float]:
+            values = ordered if values is None else values
+            if not values:
+                return None
+            return round(values[min(len(values) - 1, int(fraction * len(values)))], 3)
+
+        return {
+            "llm_calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "estimated_cost_usd": round(self.cost_usd, 6),
+            "latency_p50_s": percentile(0.5),
+            "latency_p95_s": percentile(0.95),
+            "latency_max_s": round(ordered[-1], 3) if ordered else None,
+            "queue_wait_p50_s": percentile(0.5, waits),
+            "queue_wait_p95_s": percentile(0.95, waits),
+        }
+
+
+# Active scopes, innermost last; nested scopes all see a call
+_active_scopes: ContextVar[Tuple[UsageAccumulator, ...]] = ContextVar("active_usage_scopes", default=())
+
+
+@contextmanager
+def track_usage() -> Iterator[UsageAccumulator]:
+    """Collect usage for LLM calls made in this context (and tasks spawned from it).
+
+    Scopes nest: a call is recorded in every enclosing scope.
+    """
+    accumulator = UsageAccumulator()
+    token = _active_scopes.set(_active_scopes.get() + (accumulator,))
+    try:
+        yield accumulator
+    finally:
+        _active_scopes.reset(token)
+
+
+def record_usage(model: str, usage: Any, latency_s: float) -> None:
+    """Record an API response's ``usage`` in the active tracking scopes, if any."""
+    scopes = _active_scopes.get()
+    if not scopes or usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    for accumulator in scopes:
+        accumulator.add(model, prompt_tokens, completion_tokens, latency_s)
+
+
+def record_queue_wait(wait_s: float) -> None:
+    """Record scheduler queue wait in the active tracking scopes, if any."""
+    for accumulator in _active_scopes.get():
+        accumulator.add_queue_wait(wait_s)
@@ -2,16 +2,22 @@
 
 from .exceptions import (
     AIServiceError,
+    CircuitOpenError,
     DocumentProcessingError,
     DocumentUpdateException,
+    JobQueueFullError,
+    PatchConflictError,
     StorageError,
     ValidationError,
 )
 
 __all__ = [
     "AIServiceError",
+    "CircuitOpenError",
     "DocumentProcessingError", 
     "DocumentUpdateException",
+    "JobQueueFullError",
+    "PatchConflictError",
     "StorageError",
     "ValidationError",
 ]
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""Content-addressed text store shared by suggestions."""
+
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from ..config import settings
+from .exceptions import StorageError
+from .helpers import generate_hash
+
+
+class ContentStore:
+    """Texts keyed by their content hash.
+
+    Suggestions reference the section content they were generated from by
+    hash instead of carrying their own copy. Storing the section's own
+    string object means every suggestion for that section, and the section
+    itself, share one copy in memory.
+
+    Stored suggestions hold a reference on their hash (see ``retain`` and
+    ``release``), as do the suggestions listed in jobs and impact batches,
+    which are kept for as long as the process runs. A text nothing references, because its last suggestion was
+    deleted or because its suggestions were never stored, is evicted once
+    it has gone unreferenced for ``unreferenced_ttl`` seconds; the delay
+    covers suggestions still being generated or handed out.
+    """
+
+    def __init__(self, unreferenced_ttl: Optional[float] = None) -> None:
+        """Initialize an empty store (the eviction delay defaults to settings)."""
+        self.unreferenced_ttl = (
+            settings.content_store_unreferenced_ttl if unreferenced_ttl is None else unreferenced_ttl
+        )
+        self.texts: Dict[str, str] = {}
+        self.refs: Dict[str, int] = {}
+        self.unreferenced: Dict[str, float] = {}  # Hash -> when it was last put or released
+        self.evicted = 0
+        self._last_prune = time.monotonic()
+        self._lock = threading.Lock()
+
+    def put(self, text: str) -> str:
+        """Add a text (if new) and return its hash."""
+        self._prune_if_due()
+        key = generate_hash(text)
+        with self._lock:
+            self.texts.setdefault(key, text)
+            if key not in self.refs:
+                self.unreferenced[key] = time.monotonic()
+        return key
+
+    def get(self, key: str) -> str:
+        """The text for a hash, raising StorageError if it was never added or loaded."""
+        text = self.texts.get(key)
+        if text is None:
+            raise StorageError(f"Content {key} is not in the content store")
+        return text
+
+    def retain(self, key: str) -> None:
+        """Take a reference on a hash for a stored suggestion."""
+        with self._lock:
+            self.refs[key] = self.refs.get(key, 0) + 1
+            self.unreferenced.pop(key, None)
+
+    def retain_all(self, keys: Iterable[str]) -> None:
+        """Take a reference on each hash in ``keys``."""
+        for key in keys:
+            self.retain(key)
+
+    def release(self, key: str) -> None:
+        """Drop a reference taken by ``retain``; the text becomes evictable after the last one."""
+        with self._lock:
+            count = self.refs.get(key, 0) - 1
+            if count > 0:
+                self.refs[key] = count
+                return
+            self.refs.pop(key, None)
+            if key in self.texts:
+                self.unreferenced[key] = time.monotonic()
+        self._prune_if_due()
+
+    def prune(self, max_age: Optional[float] = None) -> int:
+        """Evict texts unreferenced for longer than ``max_age`` (default ``unreferenced_ttl``); returns how many."""
+        with self._lock:
+            cutoff = time.monotonic() - (self.unreferenced_ttl if max_age is None else max_age)
+            expired = [key for key, since in self.unreferenced.items() if since <= cutoff]
+            for key in expired:
+                del self.unreferenced[key]
+                self.texts.pop(key, None)
+            self.evicted += len(expired)
+            self._last_prune = time.monotonic()
+        return len(expired)
+
+    def _prune_if_due(self) -> None:
+        """Prune at most once per ``unreferenced_ttl``, so texts go within twice that."""
+        if time.monotonic() - self._last_prune >= self.unreferenced_ttl:
+            self.prune()
+
+    def __contains__(self, key: str) -> bool:
+        """Whether a hash is present."""
+        return key in self.texts
+
+    def missing(self, keys: Iterable[str]) -> set:
+        """Hashes from ``keys`` that are not present."""
+        return {key for key in keys if key and key not in self.texts}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Entry counts and total characters held."""
+        return {
+            "entries": len(self.texts),
+            "referenced": len(self.refs),
+            "unreferenced": len(self.unreferenced),
+            "evicted": self.evicted,
+            "characters": sum(len(text) for text in list(self.texts.values())),
+        }
+
+
+# Process-wide store referenced by UpdateSuggestion.original_hash
+content_store = ContentStore()
@@ -16,6 +16,24 @@ class AIServiceError(DocumentUpdateException):
     pass
 
 
+class CircuitOpenError(AIServiceError):
+    """Raised when LLM calls are short-circuited because the provider is unhealthy."""
+    pass
+
+
+class JobQueueFullError(DocumentUpdateException):
+    """Raised when the background job queue is at capacity."""
+    pass
+
+
+class PatchConflictError(DocumentUpdateException):
+    """Raised when diff hunks do not apply to the current content."""
+    
+    def __init__(self, message: str, conflicts: list | None = None) -> None:
+        super().__init__(message)
+        self.conflicts = conflicts or []
+
+
 class StorageError(DocumentUpdateException):
     """Raised when storage operations fail."""
     pass
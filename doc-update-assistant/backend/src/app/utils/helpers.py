@@ -72,6 +72,32 @@ def extract_code_blocks(content: str) -> List[Dict[str, Any]]:
     return code_blocks
 
 
+IDENTIFIER_PATTERNS = [
+    re.compile(r'\b[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)+\b'),      # Dotted names: Runner.run
+    re.compile(r'\b([A-Za-z_]\w*)\('),                        # Calls: handoff()
+    re.compile(r'\b[A-Z][a-z0-9]+(?:[A-Z][a-z0-9]*)+\b'),      # CamelCase: ModelSettings
+    re.compile(r'\b[a-z][a-z0-9]*(?:_[a-z0-9]+)+\b'),          # snake_case: function_tool
+]
+
+
+def extract_identifiers(text: str) -> List[str]:
+    """Extract code identifiers (dotted, called, CamelCase, snake_case, inline code) from text."""
+    identifiers: Dict[str, None] = {}
+    candidates = re.findall(r'`([^`\n]+)`', text)
+    for pattern in IDENTIFIER_PATTERNS:
+        for match in pattern.finditer(text):
+            candidates.append(match.group(1) if match.groups() else match.group(0))
+    for candidate in candidates:
+        candidate = candidate.strip().rstrip('()').strip()
+        if not re.fullmatch(r'[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*', candidate):
+            continue
+        # Skip abbreviations such as "e.g" and "i.e"
+        if any(len(part) < 2 for part in candidate.split('.')):
+            continue
+        identifiers[candidate] = None
+    return list(identifiers)
+
+
 def validate_json_structure(data: Dict[str, Any], required_fields: List[str]) -> bool:
     """Validate JSON data has required fields."""
     return all(field in data for field in required_fields)
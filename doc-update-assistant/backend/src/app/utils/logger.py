@@ -1,8 +1,12 @@
 """Centralized logging configuration for the application."""
 
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
 import sys
-from typing import Optional
+from typing import Any, Dict, Optional
 
 
 def setup_logger(name: str, level: Optional[str] = None) -> logging.Logger:
@@ -41,8 +45,43 @@ def setup_logger(name: str, level: Optional[str] = None) -> logging.Logger:
     return logger
 
 
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields: Any) -> None:
+    """Log a structured event as its name followed by a JSON object of fields."""
+    if logger.isEnabledFor(level):
+        payload = {key: value for key, value in fields.items() if value is not None}
+        logger.log(level, f"{event} {json.dumps(payload, default=str, sort_keys=True)}")
+
+
+_line_loggers: Dict[str, logging.Logger] = {}
+
+
+def line_file_logger(path: str) -> logging.Logger:
+    """Logger that appends each message as one line to ``path``.
+
+    Records are handed to a queue and written by a background listener
+    thread, so logging from the event loop never waits on the file.
+    """
+    logger = _line_loggers.get(path)
+    if logger is not None:
+        return logger
+    file_handler = logging.FileHandler(path, encoding='utf-8', delay=True)
+    file_handler.setFormatter(logging.Formatter('%(message)s'))
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, file_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger = logging.getLogger(f"docs_assistant.lines.{len(_line_loggers)}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    _line_loggers[path] = logger
+    return logger
+
+
 # App-wide loggers
 app_logger = setup_logger("docs_assistant.app", "INFO")
 api_logger = setup_logger("docs_assistant.api", "INFO")
 processor_logger = setup_logger("docs_assistant.processor", "INFO")
-ai_logger = setup_logger("docs_assistant.ai", "INFO")
\ No newline at end of file
+ai_logger = setup_logger("docs_assistant.ai", "INFO")
+telemetry_logger = setup_logger("docs_assistant.telemetry")
\ No newline at end of file
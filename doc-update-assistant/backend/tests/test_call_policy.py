@@ -0,0 +1,157 @@
+"""Tests for the LLM call policy against the local OpenAI stub."""
+
+import asyncio
+
+import httpx
+import openai
+import pytest
+from openai import AsyncOpenAI
+
+from src.app.devtools.openai_stub import StubConfig, create_stub_app
+from src.app.services.call_policy import CircuitBreaker, LLMCallPolicy, RetryPolicy
+from src.app.utils.exceptions import CircuitOpenError
+
+
+def make_client(config: StubConfig):
+    """OpenAI client talking to an in-process stub app."""
+    stub = create_stub_app(config)
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub), base_url="http://stub")
+    client = AsyncOpenAI(api_key="sk-test", base_url="http://stub/v1", http_client=http_client, max_retries=0)
+    return stub, client
+
+
+def chat_request(client: AsyncOpenAI):
+    """Fresh provider call factory, as AIService passes to the policy."""
+    return lambda: client.chat.completions.create(
+        model="gpt-4o-mini", messages=[{"role": "user", "content": "ping"}]
+    )
+
+
+def make_policy(**overrides) -> LLMCallPolicy:
+    """Policy with fast retries and no hedging unless overridden."""
+    options = {
+        "retry": RetryPolicy(max_attempts=3, base_delay=0.0, max_delay=0.0),
+        "breaker": CircuitBreaker(failure_threshold=5, recovery_timeout=60),
+        "timeout": 5.0,
+        "hedging_enabled": False,
+    }
+    options.update(overrides)
+    return LLMCallPolicy(**options)
+
+
+def test_call_succeeds_against_stub():
+    async def scenario():
+        stub, client = make_client(StubConfig(latency_ms=0))
+        policy = make_policy()
+        response = await policy.call(chat_request(client))
+        assert response.choices[0].message.content
+        assert policy.stats["attempts"] == 1
+        assert stub.state.request_count == 1
+
+    asyncio.run(scenario())
+
+
+def test_transient_errors_are_retried_then_raised():
+    async def scenario():
+        stub, client = make_client(StubConfig(latency_ms=0, error_rate=1.0, error_status=503))
+        policy = make_policy()
+        with pytest.raises(openai.APIStatusError):
+            await policy.call(chat_request(client))
+        assert stub.state.request_count == 3
+        assert policy.stats["retries"] == 2
+        assert policy.stats["failures"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_client_errors_are_not_retried():
+    async def scenario():
+        stub, client = make_client(StubConfig(latency_ms=0, error_rate=1.0, error_status=400))
+        policy = make_policy()
+        with pytest.raises(openai.BadRequestError):
+            await policy.call(chat_request(client))
+        assert stub.state.request_count == 1
+        assert policy.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_circuit_opens_and_fails_fast():
+    async def scenario():
+        stub, client = make_client(StubConfig(latency_ms=0, error_rate=1.0))
+        policy = make_policy(
+            retry=RetryPolicy(max_attempts=1, base_delay=0.0),
+            breaker=CircuitBreaker(failure_threshold=2, recovery_timeout=60),
+        )
+        for _ in range(2):
+            with pytest.raises(openai.APIStatusError):
+                await policy.call(chat_request(client))
+        with pytest.raises(CircuitOpenError):
+            await policy.call(chat_request(client))
+        assert stub.state.request_count == 2
+        assert policy.stats["short_circuited"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_half_open_trial_releases_the_slot():
+    async def scenario():
+        stub, client = make_client(StubConfig(latency_ms=0, error_rate=1.0))
+        policy = make_policy(
+            retry=RetryPolicy(max_attempts=1, base_delay=0.0),
+            breaker=CircuitBreaker(failure_threshold=1, recovery_timeout=0),
+        )
+        with pytest.raises(openai.APIStatusError):
+            await policy.call(chat_request(client))
+        assert policy.breaker.state == CircuitBreaker.OPEN
+
+        # The trial call hangs and its caller gives up on it
+        stub.state.config.error_rate = 0.0
+        stub.state.config.latency_ms = 10_000
+        trial = asyncio.ensure_future(policy.call(chat_request(client)))
+        await asyncio.sleep(0.05)
+        assert policy.breaker.state == CircuitBreaker.HALF_OPEN
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        # The next call becomes the trial instead of failing fast forever
+        stub.state.config.latency_ms = 0
+        await policy.call(chat_request(client))
+        assert policy.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_hedge_sent_for_slow_request_and_both_failures_raise_provider_error():
+    async def scenario():
+        stub, client = make_client(StubConfig(latency_ms=100, latency_distribution="constant", error_rate=1.0))
+        policy = make_policy(
+            retry=RetryPolicy(max_attempts=1, base_delay=0.0),
+            hedging_enabled=True,
+            hedging_min_samples=1,
+        )
+        policy.latencies.record(0.01)
+        with pytest.raises(openai.APIStatusError):
+            await policy.call(chat_request(client))
+        assert policy.stats["hedges_sent"] == 1
+        assert stub.state.request_count == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_a_hedged_call_cancels_its_requests():
+    async def scenario():
+        _, client = make_client(StubConfig(latency_ms=10_000, latency_distribution="constant"))
+        policy = make_policy(hedging_enabled=True, hedging_min_samples=1)
+        policy.latencies.record(0.01)
+        call = asyncio.ensure_future(policy.call(chat_request(client)))
+        await asyncio.sleep(0.05)
+        assert policy.stats["hedges_sent"] == 1
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        await asyncio.sleep(0.1)
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+    asyncio.run(scenario())
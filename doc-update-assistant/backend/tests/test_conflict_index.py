@@ -0,0 +1,127 @@
+"""Tests for the interval tree and the pending-suggestion conflict index."""
+
+import asyncio
+import random
+from datetime import datetime
+from pathlib import Path
+
+from src.app.models.suggestion import ContentEdit, UpdateSuggestion
+from src.app.services.conflict_index import (
+    ConflictIndex,
+    IndexedSuggestionStore,
+    IntervalTree,
+    change_ranges,
+    edit_ranges,
+)
+from src.app.services.diff_service import DiffService
+from src.app.services.document_processor import DocumentProcessor
+
+
+def make_suggestion(suggestion_id, original, suggested, section_id="s", document_id="docs/page.md"):
+    now = datetime.now()
+    return UpdateSuggestion(
+        id=suggestion_id, document_id=document_id, section_id=section_id, title="t", description="d",
+        original_content=original, suggested_content=suggested, suggestion_type="update",
+        created_at=now, updated_at=now, reasoning="r"
+    )
+
+
+def edit_lines(lines, start, end, replacement):
+    """Content of ``lines`` with lines ``start..end`` (1-based, inclusive) replaced."""
+    return "\n".join(lines[:start - 1] + replacement + lines[end:])
+
+
+def test_interval_tree_matches_brute_force():
+    rng = random.Random("interval-tree")
+    tree = IntervalTree()
+    intervals = {}
+    for step in range(2000):
+        key = rng.randrange(200)
+        if rng.random() < 0.3:
+            assert tree.remove(key) == (key in intervals)
+            intervals.pop(key, None)
+        else:
+            low = rng.randrange(500)
+            high = low + rng.randrange(20)
+            tree.insert(key, low, high)
+            intervals[key] = (low, high)
+        if step % 50 == 0:
+            low = rng.randrange(500)
+            high = low + rng.randrange(30)
+            found = {key for key, _, _ in tree.overlapping(low, high)}
+            expected = {key for key, (start, end) in intervals.items() if start <= high and end >= low}
+            assert found == expected
+    assert len(tree) == len(intervals)
+    starts = [low for _, low, _ in tree.items()]
+    assert starts == sorted(starts)
+
+
+def test_interval_tree_treats_touching_ends_as_overlapping():
+    tree = IntervalTree()
+    tree.insert("a", 2, 4)
+    assert [key for key, _, _ in tree.overlapping(4, 6)] == ["a"]
+    assert tree.overlapping(5, 6) == []
+    assert tree.overlapping(0, 1) == []
+
+
+def test_edit_ranges_match_single_block_diffs():
+    rng = random.Random("edit-ranges")
+    for _ in range(300):
+        # Distinct, newline-terminated lines, so the diff and the edit agree on which lines changed
+        lines = [f"line {n}" for n in range(rng.randint(1, 10))]
+        original = "".join(f"{line}\n" for line in lines)
+        start = rng.randint(1, len(lines) + 1)
+        end = rng.randint(start - 1, len(lines))
+        replacement = [f"new {n}" for n in range(rng.randint(0, 3))]
+        suggested = "".join(f"{line}\n" for line in lines[:start - 1] + replacement + lines[end:])
+        hunks = DiffService.generate_diff_hunks(original, suggested, context_lines=0, algorithm="myers")
+        edit = ContentEdit.between(original, suggested)
+        assert edit_ranges(original, edit) == change_ranges(hunks), (original, suggested)
+
+
+def test_conflict_groups_join_overlaps_but_not_adjacent_changes():
+    lines = [f"line {n}" for n in range(1, 11)]
+    original = "\n".join(lines)
+    index = ConflictIndex()
+    index.update(make_suggestion("a", original, edit_lines(lines, 2, 3, ["A"])))
+    index.update(make_suggestion("b", original, edit_lines(lines, 3, 4, ["B"])))
+    index.update(make_suggestion("c", original, edit_lines(lines, 5, 5, ["C"])))  # Next to b only
+    index.update(make_suggestion("d", original, edit_lines(lines, 9, 8, ["inserted"])))  # Before line 9
+    index.update(make_suggestion("e", original, edit_lines(lines, 9, 9, ["E"])))  # Next to d's insertion
+
+    groups = index.conflict_groups()
+    assert [group["suggestion_ids"] for group in groups] == [["a", "b"]]
+    assert set(index.conflicts_for("a")) == {"b"}
+    assert index.conflicts_for("c") == {}
+    assert index.conflicts_for("d") == {}
+    assert index.conflict_groups(document_id="docs/other.md") == []
+
+
+def test_indexing_does_not_compute_diffs():
+    DiffService._hunk_cache.clear()
+    store = IndexedSuggestionStore(ConflictIndex())
+    store["a"] = make_suggestion("a", "one\ntwo", "one\n2")
+    store.reindex()
+    assert not DiffService._hunk_cache
+    assert store["a"].diff_stats is None
+
+
+def test_ranges_follow_sections_moved_by_an_update():
+    async def scenario():
+        processor = DocumentProcessor()
+        processor.generate_section_embeddings = lambda *args, **kwargs: asyncio.sleep(0)
+        content = "# One\n\nfirst\n\n# Two\n\nsecond\nthird\n"
+        document = await processor._process_json_document(Path("docs/page.md"), content, {})
+        processor._store_document(document)
+        one, two = document.sections
+
+        index = ConflictIndex()
+        index.bind(processor)
+        index.update(make_suggestion("later", two.content, "second\nchanged", two.id, one.file_path))
+        before = index.ranges_of("later")[0].start_line
+        await processor.update_section_content(one.id, "first\nadded\nmore")
+        after = index.ranges_of("later")[0]
+        assert after.start_line == before + 2
+        assert processor.documents[document.id].content.split("\n")[after.start_line - 1] == "third"
+
+    asyncio.run(scenario())
@@ -0,0 +1,69 @@
+"""Tests for content store reference counting and eviction."""
+
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from src.app.models.suggestion import UpdateSuggestion
+from src.app.schemas.suggestion import SuggestionJobResponse
+from src.app.services.conflict_index import ConflictIndex, IndexedSuggestionStore
+from src.app.services.job_service import SuggestionJobManager
+from src.app.utils.content_store import ContentStore, content_store
+
+
+def test_unreferenced_content_is_evicted():
+    store = ContentStore(unreferenced_ttl=60)
+    kept = store.put("kept")
+    dropped = store.put("dropped")
+    store.retain(kept)
+    assert store.prune(max_age=0) == 1
+    assert kept in store and dropped not in store
+
+
+def test_content_stays_until_last_reference_is_released():
+    store = ContentStore(unreferenced_ttl=60)
+    key = store.put("shared")
+    store.retain(key)
+    store.retain(key)
+    store.release(key)
+    store.prune(max_age=0)
+    assert store.get(key) == "shared"
+    store.release(key)
+    store.prune(max_age=0)
+    assert key not in store
+    assert store.get_stats()["evicted"] == 1
+
+
+def test_recently_unreferenced_content_is_kept():
+    store = ContentStore(unreferenced_ttl=60)
+    key = store.put("in flight")
+    assert store.prune() == 0
+    assert key in store
+
+
+def test_job_suggestions_keep_their_content_after_deletion():
+    suggestion = UpdateSuggestion(
+        id="job-suggestion", document_id="docs/a.md", section_id="a", title="t", description="d",
+        original_content="content only a job keeps", suggested_content="changed", suggestion_type="update",
+        created_at=datetime.now(), updated_at=datetime.now(), reasoning="r"
+    )
+
+    class Pipeline:
+        async def run(self, query, progress=None):
+            return SimpleNamespace(suggestions=[suggestion], sections_found=1, sections_skipped=0, message="done")
+
+    async def scenario():
+        store = IndexedSuggestionStore(ConflictIndex())
+        manager = SuggestionJobManager(Pipeline(), store, workers=1)
+        await manager.start()
+        job = await manager.submit("query")
+        while not job.is_finished:
+            await asyncio.sleep(0.01)
+        await manager.stop()
+        return store, job
+
+    store, job = asyncio.run(scenario())
+    del store[suggestion.id]
+    content_store.prune(max_age=0)
+    response = SuggestionJobResponse.from_job(job)
+    assert response.suggestions[0].original_content == "content only a job keeps"
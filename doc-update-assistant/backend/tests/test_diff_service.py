@@ -0,0 +1,147 @@
+"""Round-trip tests for diff hunk generation and patching."""
+
+import asyncio
+import random
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from src.app.models.suggestion import DiffHunk, UpdateSuggestion
+from src.app.services.diff_engine import DIFF_ALGORITHMS
+from src.app.services.diff_service import NO_NEWLINE_MARKER, DiffService
+from src.app.services.document_processor import DocumentProcessor
+
+
+# A small vocabulary so random documents share lines and produce real hunks
+LINES = ["", "# Title", "alpha", "beta", "gamma", "```python", "```", "print(1)", "  indented", "- item"]
+ALGORITHMS = sorted(DIFF_ALGORITHMS)
+CASES = 300
+
+
+def random_text(rng: random.Random) -> str:
+    """Random document, sometimes empty and with or without trailing newlines."""
+    lines = [rng.choice(LINES) for _ in range(rng.randint(0, 12))]
+    return "\n".join(lines) + rng.choice(["", "", "\n", "\n\n"])
+
+
+def random_edit(rng: random.Random, text: str) -> str:
+    """Variant of ``text`` with a few lines replaced, inserted or deleted."""
+    lines = text.split("\n")
+    for _ in range(rng.randint(0, 4)):
+        position = rng.randint(0, len(lines))
+        action = rng.choice(["insert", "delete", "replace"])
+        if action == "insert" or position == len(lines):
+            lines.insert(position, rng.choice(LINES))
+        elif action == "delete":
+            del lines[position]
+        else:
+            lines[position] = rng.choice(LINES)
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_hunks_round_trip(algorithm):
+    rng = random.Random(f"round-trip-{algorithm}")
+    for _ in range(CASES):
+        original = random_text(rng)
+        suggested = random_edit(rng, original) if rng.random() < 0.7 else random_text(rng)
+        context = rng.randint(0, 3)
+        hunks = DiffService.generate_diff_hunks(original, suggested, context_lines=context, algorithm=algorithm)
+        assert DiffService.apply_diff_hunks(original, hunks) == suggested, (original, suggested)
+        assert DiffService.combine_changes(original, [hunks]) == suggested, (original, suggested)
+        assert not hunks or original != suggested
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+@pytest.mark.parametrize("original, suggested", [
+    ("x\ny", "x\ny\n\n"),
+    ("x\ny\n", "x\ny"),
+    ("x\ny", "x\ny\n"),
+    ("", "\n"),
+    ("\n", ""),
+    ("a", ""),
+    ("", "a"),
+])
+def test_trailing_newline_changes_round_trip(algorithm, original, suggested):
+    hunks = DiffService.generate_diff_hunks(original, suggested, algorithm=algorithm)
+    assert hunks
+    assert DiffService.apply_diff_hunks(original, hunks) == suggested
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_independent_diffs_combine(algorithm):
+    rng = random.Random(f"combine-{algorithm}")
+    for _ in range(CASES):
+        head = random_text(rng).rstrip("\n")
+        tail = random_text(rng)
+        original = f"{head}\n# Separator one\n# Separator two\n{tail}"
+        first = f"{random_edit(rng, head)}\n# Separator one\n# Separator two\n{tail}"
+        second = f"{head}\n# Separator one\n# Separator two\n{random_edit(rng, tail)}"
+        hunk_sets = [
+            DiffService.generate_diff_hunks(original, first, context_lines=0, algorithm=algorithm),
+            DiffService.generate_diff_hunks(original, second, context_lines=0, algorithm=algorithm),
+        ]
+        expected = first.split("# Separator two\n")[0] + "# Separator two\n" + second.split("# Separator two\n", 1)[1]
+        assert DiffService.combine_changes(original, hunk_sets) == expected, (original, first, second)
+
+
+def test_unified_text_marks_missing_final_newline():
+    hunks = DiffService.generate_diff_hunks("a\nb", "a\nb\n")
+    assert DiffService.format_unified(hunks).splitlines() == [
+        "@@ -1,2 +1,2 @@", " a", "-b", NO_NEWLINE_MARKER, "+b"
+    ]
+
+
+def test_rebased_hunks_drop_end_of_file_state():
+    hunks = DiffService.generate_diff_hunks("a\nb", "a\nc")
+    rebased = DiffService.rebase_hunks(hunks, 10, 10)
+    assert hunks[0].new_eof_newline is False
+    assert rebased[0].old_eof_newline is None and rebased[0].new_eof_newline is None
+    assert rebased[0].old_start == hunks[0].old_start + 10
+
+
+def test_document_diff_rebases_suggestions_across_sections():
+    async def load():
+        processor = DocumentProcessor()
+        processor.generate_section_embeddings = lambda *args, **kwargs: asyncio.sleep(0)
+        content = "# One\n\na\nb\nc\n\n# Two\n\nd\ne\nf\n\n# Three\n\ng\nh\n"
+        document = await processor._process_json_document(Path("docs/page.md"), content, {})
+        processor._store_document(document)
+        return processor, document
+
+    processor, document = asyncio.run(load())
+    one, two, three = document.sections
+    now = datetime.now()
+
+    def suggest(suggestion_id, section, suggested):
+        return UpdateSuggestion(
+            id=suggestion_id, document_id=section.file_path, section_id=section.id, title="t", description="d",
+            original_content=section.content, suggested_content=suggested, suggestion_type="update",
+            created_at=now, updated_at=now, reasoning="r"
+        )
+
+    suggestions = [
+        suggest("three", three, "g\nh\ni"),
+        suggest("one", one, "a\nB\nextra\nc"),
+        suggest("clash", one, "a\nb2\nc"),
+        suggest("two", two, "d\nf"),
+        suggest("gone", one, "x").model_copy(update={"section_id": "missing"}),
+    ]
+
+    DiffService._hunk_cache.clear()
+    records = DiffService.document_diff(suggestions, processor)
+    assert next(records) == {"type": "skipped", "suggestion_id": "gone", "reason": "section_not_found"}
+    assert not DiffService._hunk_cache  # Nothing diffed before the first record
+    records = list(records)
+
+    assert [record["suggestion_id"] for record in records if record["type"] == "suggestion"] == ["one", "two", "three"]
+    assert [record for record in records if record["type"] == "skipped"] == [
+        {"type": "skipped", "suggestion_id": "clash", "reason": "overlaps", "conflicts_with": "one"}
+    ]
+    assert records[-1]["suggestions"] == 3 and records[-1]["skipped"] == 2
+
+    # The rebased hunks patch the whole document into all included suggestions at once
+    hunks = [DiffHunk(**record) for record in records if record["type"] == "hunk"]
+    expected = "# One\n\na\nB\nextra\nc\n\n# Two\n\nd\nf\n\n# Three\n\ng\nh\ni\n"
+    assert DiffService.apply_diff_hunks(document.content, hunks) == expected
@@ -0,0 +1,168 @@
+"""Tests for the storage service's atomic and batched writes and incremental stats."""
+
+import asyncio
+import os
+from datetime import datetime
+
+import pytest
+
+from src.app.models.suggestion import UpdateSuggestion
+from src.app.services.storage_service import StorageService
+from src.app.utils.exceptions import StorageError
+
+
+def scanned_counters(storage: StorageService):
+    """Counters from a fresh scan of the tree."""
+    sizes, _ = storage._scan_storage()
+    return {name: {"files": len(files), "bytes": sum(files.values())} for name, files in sizes.items()}
+
+
+def make_suggestion(n, original):
+    now = datetime.now()
+    return UpdateSuggestion(
+        id=f"s{n}", document_id="docs/page.md", section_id="s", title="t", description="d",
+        original_content=original, suggested_content=f"{original}changed\n", suggestion_type="update",
+        created_at=now, updated_at=now, reasoning="r"
+    )
+
+
+def test_concurrent_first_writes_of_one_path_count_once(tmp_path):
+    async def scenario():
+        storage = StorageService(str(tmp_path), reconcile_interval=3600)
+        path = storage.batches_path / "same.json"
+        await asyncio.gather(*(storage._save_json_file(path, {"n": n}) for n in range(20)))
+        assert storage._counters == scanned_counters(storage)
+
+    asyncio.run(scenario())
+
+
+def change_out_of_order(storage: StorageService, path, payloads, record=True):
+    """Write (bytes) or delete (None) ``path`` in turn, then record the changes newest first.
+
+    Stands in for threads that finish in the opposite order to their changes.
+    Returns the changes when ``record`` is False, for the caller to record.
+    """
+    changes = []
+    for payload in payloads:
+        if payload is None:
+            size, sequence = StorageService._remove(path)
+            changes.append((path, size, None, sequence))
+        else:
+            changes.extend(StorageService._write_atomic([(path, payload)]))
+    changes.reverse()
+    if record:
+        for change in changes:
+            storage._record_change(*change)
+    return changes
+
+
+def test_changes_recorded_out_of_order_keep_the_newest_state(tmp_path):
+    async def scenario():
+        storage = StorageService(str(tmp_path), reconcile_interval=3600)
+        await storage._listing(storage.batches_path)
+        path = storage.batches_path / "b0.json"
+        storage._begin_changes([path, path])
+        change_out_of_order(storage, path, [b"{}", None])  # The delete is recorded before the save
+        storage._end_changes([path, path])
+        assert "b0" not in storage._listings[storage.batches_path]
+        assert storage._counters == scanned_counters(storage)
+        assert not storage._applied
+
+    asyncio.run(scenario())
+
+
+def test_reconcile_applies_changes_made_during_the_scan(tmp_path):
+    async def scenario():
+        storage = StorageService(str(tmp_path), reconcile_interval=3600)
+        for n in range(3):
+            await storage._save_json_file(storage.batches_path / f"b{n}.json", {"n": n})
+        b0, b1, b2 = (storage.batches_path / f"b{n}.json" for n in range(3))
+        loop = asyncio.get_running_loop()
+        scan_storage, stat_paths = storage._scan_storage, storage._stat_paths
+        late = []
+
+        async def on_loop(path, payloads):
+            storage._begin_changes([path] * len(payloads))
+            change_out_of_order(storage, path, payloads)
+            storage._end_changes([path] * len(payloads))
+
+        def scanning():
+            # Recorded while scanning: journaled, then covered by the restat
+            asyncio.run_coroutine_threadsafe(on_loop(b2, [b"[1, 2, 3]", None, b"[]"]), loop).result()
+            # Started before the reconcile and recorded after it
+            late.extend(change_out_of_order(storage, b0, [b'{"n": 10}', None], record=False))
+            return scan_storage()
+
+        def restating(paths):
+            restated = stat_paths(paths)
+            # Made after the restat: replayed on top of the scan
+            asyncio.run_coroutine_threadsafe(on_loop(b1, [None, b'{"n": 11}']), loop).result()
+            return restated
+
+        storage._scan_storage, storage._stat_paths = scanning, restating
+        storage._begin_changes([b0, b0])
+        await storage.reconcile_stats()
+        for change in late:
+            storage._record_change(*change)
+        storage._end_changes([b0, b0])
+        del storage._scan_storage, storage._stat_paths
+
+        assert storage._reconciled_at is not None
+        assert storage._listings[storage.batches_path] == {"b1", "b2"}
+        assert storage._counters == scanned_counters(storage)
+        assert not storage._in_flight and not storage._stale and not storage._applied
+
+    asyncio.run(scenario())
+
+
+def test_batched_saves_are_split_across_executor_calls(tmp_path, monkeypatch):
+    async def scenario():
+        storage = StorageService(str(tmp_path), write_parallelism=4, reconcile_interval=3600)
+        assert await storage.list_suggestions() == []
+        chunks = []
+        write_atomic = StorageService._write_atomic.__func__
+
+        def recording_write_atomic(cls, entries):
+            chunks.append(len(entries))
+            return write_atomic(cls, entries)
+
+        monkeypatch.setattr(StorageService, "_write_atomic", classmethod(recording_write_atomic))
+        suggestions = [make_suggestion(n, f"original {n % 3}\n") for n in range(50)]
+        assert await storage.save_suggestions(suggestions) == 50
+        # The three distinct contents first, then the suggestions in four chunks
+        assert chunks[0] == 3 and sorted(chunks[1:]) == [11, 13, 13, 13]
+
+        assert await storage.list_suggestions() == sorted(suggestion.id for suggestion in suggestions)
+        assert len(await storage._listing(storage.contents_path)) == 3
+        assert storage._counters == scanned_counters(storage)
+        loaded = await storage.load_suggestion("s7")
+        assert loaded.original_content == "original 1\n"
+
+        chunks.clear()
+        await storage.save_suggestions(suggestions[:5])
+        assert chunks == [5]  # Contents already on disk are not written again
+
+    asyncio.run(scenario())
+
+
+def test_failed_writes_keep_the_previous_file(tmp_path, monkeypatch):
+    async def scenario():
+        storage = StorageService(str(tmp_path), reconcile_interval=3600)
+        path = storage.jobs_path / "job.json"
+        await storage._save_json_file(path, {"version": 1})
+        counters = scanned_counters(storage)
+
+        def failing_replace(source, target):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(os, "replace", failing_replace)
+        with pytest.raises(StorageError):
+            await storage._save_json_file(path, {"version": 2})
+        monkeypatch.undo()
+
+        assert await storage._load_json_file(path) == {"version": 1}
+        assert [name.name for name in storage.jobs_path.iterdir()] == ["job.json"]  # No temporary file left
+        assert storage._counters == counters == scanned_counters(storage)
+        assert not storage._in_flight
+
+    asyncio.run(scenario())
@@ -0,0 +1,103 @@
+"""Tests for the sorted listing indexes and page cursors."""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.app.models.suggestion import SuggestionStatus, UpdateSuggestion
+from src.app.services.suggestion_index import SortedKeys, SuggestionIndex, decode_cursor, encode_cursor
+from src.app.utils.exceptions import ValidationError
+
+
+START = datetime(2024, 1, 1)
+
+
+def make_suggestion(n, document_id="docs/page.md", status=SuggestionStatus.PENDING):
+    created = START + timedelta(seconds=n // 2, microseconds=n % 7)  # Some creation times are shared
+    return UpdateSuggestion(
+        id=f"s{n:04d}", document_id=document_id, section_id="s", title="t", description="d",
+        original_content="a\n", suggested_content="b\n", suggestion_type="update", status=status,
+        created_at=created, updated_at=created, reasoning="r"
+    )
+
+
+def test_sorted_keys_match_a_sorted_list():
+    rng = random.Random("sorted-keys")
+    keys = SortedKeys(load=4)  # Small sublists, so they split and empty often
+    expected = []
+    for _ in range(3000):
+        key = (float(rng.randrange(100)), f"id{rng.randrange(50)}")
+        if key in expected:
+            keys.remove(key)
+            expected.remove(key)
+        else:
+            keys.add(key)
+            expected.append(key)
+        expected.sort()
+        assert len(keys) == len(expected)
+        start = rng.choice(expected + [None, (50.5, "x"), (-1.0, ""), (1000.0, "")])
+        forward = list(keys.iter_after(start))
+        backward = list(keys.iter_after(start, reverse=True))
+        assert forward == [key for key in expected if start is None or key > start]
+        assert backward == [key for key in reversed(expected) if start is None or key < start]
+    with pytest.raises(KeyError):
+        keys.remove((1000.0, "missing"))
+
+
+def test_cursor_round_trip():
+    for key in [(0.0, "a"), (1704067200.123456, "id|with|bars"), (-3.5e-7, "")]:
+        assert decode_cursor(encode_cursor(key)) == key
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm8tc2VwYXJhdG9y", "YWJjfGlk", "__79"])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(ValidationError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("descending", [True, False])
+def test_pages_stay_stable_under_concurrent_inserts(descending):
+    rng = random.Random(f"pages-{descending}")
+    index = SuggestionIndex()
+    existing = [make_suggestion(n, status=rng.choice(list(SuggestionStatus))) for n in range(0, 400, 2)]
+    for suggestion in existing:
+        index.update(suggestion)
+    filters = {"status": SuggestionStatus.PENDING, "document_id": "docs/page.md"}
+    matching = {suggestion.id for suggestion in existing if suggestion.status == SuggestionStatus.PENDING}
+
+    seen = []
+    cursor = None
+    inserted = iter(range(1, 400, 2))
+    while True:
+        ids, next_key = index.page(filters, 7, decode_cursor(encode_cursor(cursor)) if cursor else None, descending)
+        seen.extend(ids)
+        if next_key is None:
+            break
+        cursor = next_key
+        # Suggestions added between requests land on either side of the cursor
+        for n in (next(inserted, None) for _ in range(3)):
+            if n is not None:
+                index.update(make_suggestion(n, status=SuggestionStatus.PENDING))
+
+    assert len(seen) == len(set(seen))
+    assert matching <= set(seen)
+    keys = [index.entries[suggestion_id][0] for suggestion_id in seen]
+    assert keys == sorted(keys, reverse=descending)
+
+
+def test_matching_and_counts_follow_updates():
+    index = SuggestionIndex()
+    suggestions = [make_suggestion(n, document_id=f"docs/{n % 3}.md") for n in range(30)]
+    for suggestion in suggestions:
+        index.update(suggestion)
+    suggestions[3].status = SuggestionStatus.APPROVED
+    index.update(suggestions[3])
+    index.remove(suggestions[6].id)
+
+    assert list(index.matching({"document_id": "docs/0.md", "status": SuggestionStatus.PENDING})) == [
+        suggestion.id for suggestion in suggestions if suggestion.id not in ("s0003", "s0006") and suggestion.document_id == "docs/0.md"
+    ]
+    assert list(index.matching({"document_id": "docs/missing.md"})) == []
+    assert index.count("status", SuggestionStatus.APPROVED) == 1
+    assert index.count("status", SuggestionStatus.PENDING) == 28
@@ -0,0 +1,86 @@
+"""Tests for the write-behind SQLite suggestion repository."""
+
+import sqlite3
+from datetime import datetime
+
+from src.app.models.suggestion import UpdateSuggestion
+from src.app.services.suggestion_repository import SuggestionRepository
+
+
+def make_suggestion(suggestion_id, original, suggested="changed"):
+    now = datetime.now()
+    return UpdateSuggestion(
+        id=suggestion_id, document_id="docs/page.md", section_id="s", title="t", description="d",
+        original_content=original, suggested_content=suggested, suggestion_type="update",
+        created_at=now, updated_at=now, reasoning="r"
+    )
+
+
+def stored_contents(db_path):
+    with sqlite3.connect(str(db_path)) as connection:
+        return {key for key, in connection.execute("SELECT hash FROM contents")}
+
+
+def test_flushed_suggestions_are_recovered_after_reopen(tmp_path):
+    db_path = tmp_path / "suggestions.db"
+    repository = SuggestionRepository(str(db_path), flush_interval=60)
+    repository.open()
+    for n in range(3):
+        repository[f"s{n}"] = make_suggestion(f"s{n}", f"original {n}\n", f"suggested {n}\n")
+    assert repository.flush() == 3
+    repository["s1"] = make_suggestion("s1", "original 1\n", "second try\n")
+    del repository["s2"]
+    repository.close()  # Flushes what is still queued
+
+    reopened = SuggestionRepository(str(db_path))
+    reopened.open()
+    try:
+        assert sorted(reopened) == ["s0", "s1"]
+        assert reopened["s1"].suggested_content == "second try\n"
+        assert reopened["s0"].original_content == "original 0\n"
+        assert reopened.get_stats()["recovered"] == 2
+    finally:
+        reopened.close()
+
+
+def test_writes_are_serialized_when_stored(tmp_path):
+    db_path = tmp_path / "suggestions.db"
+    repository = SuggestionRepository(str(db_path), flush_interval=60)
+    repository.open()
+    suggestion = make_suggestion("a", "text\n")
+    repository["a"] = suggestion
+    suggestion.title = "changed in place"
+    repository.close()
+
+    reopened = SuggestionRepository(str(db_path))
+    reopened.open()
+    try:
+        assert reopened["a"].title == "t"
+    finally:
+        reopened.close()
+
+
+def test_unreferenced_contents_are_deleted(tmp_path):
+    db_path = tmp_path / "suggestions.db"
+    repository = SuggestionRepository(str(db_path), flush_interval=60)
+    repository.open()
+    try:
+        first, second = make_suggestion("a", "first\n"), make_suggestion("b", "second\n")
+        shared = make_suggestion("c", "first\n")
+        for suggestion in (first, second, shared):
+            repository[suggestion.id] = suggestion
+        repository.flush()
+        assert stored_contents(db_path) == {first.original_hash, second.original_hash}
+
+        del repository["a"]
+        del repository["b"]
+        repository.flush()
+        assert stored_contents(db_path) == {first.original_hash}  # Still referenced by "c"
+        assert repository.get_stats()["contents_pruned"] == 1
+
+        # Content stored again after being pruned is written again
+        repository["b"] = make_suggestion("b", "second\n")
+        repository.flush()
+        assert stored_contents(db_path) == {first.original_hash, second.original_hash}
+    finally:
+        repository.close()
@@ -0,0 +1,31 @@
+"""Tests for prompt budget trimming."""
+
+import pytest
+
+from src.app.services.token_budget import TokenBudgetManager
+from src.app.utils.exceptions import AIServiceError
+
+
+@pytest.fixture(scope="module")
+def manager():
+    return TokenBudgetManager("gpt-4o-mini")
+
+
+def test_oversized_first_line_is_cut_between_words(manager):
+    content = " ".join(f"word{i}" for i in range(400)) + "\nsecond line\n\nnext paragraph"
+    kept, remainder = manager.trim_to_budget(content, 50)
+    assert kept and kept + remainder == content
+    assert manager.count_tokens(kept) <= 50
+    assert remainder.startswith(" ")
+
+
+def test_paragraphs_are_kept_whole_when_they_fit(manager):
+    content = "first paragraph\n\n" + "long " * 500
+    kept, remainder = manager.trim_to_budget(content, 20)
+    assert kept == "first paragraph"
+    assert remainder == content[len(kept):]
+
+
+def test_no_room_for_content_is_refused(manager):
+    with pytest.raises(AIServiceError):
+        manager.allocate("system", "user", "some section content", max_content_tokens=0)